@@ -0,0 +1,341 @@
+'''
+Headless rendering benchmark: loads every model under models/ into an
+offscreen OpenGL context, replays fixed camera paths through
+RedactorEngine and writes the results as JSON.
+
+    python benchmark.py --platform egl --output results.json
+    python benchmark.py --baseline results.json
+
+benchmark_llvmpipe.json holds a run on Mesa llvmpipe, a software
+renderer, as a reference for machines without a GPU.
+
+With --baseline the run fails (exit code 1) if any frame time or load
+time percentile got slower than the threshold.
+'''
+import argparse
+import ctypes
+import json
+import math
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from pathlib import Path
+
+PATHS = ('orbit', 'dolly')
+# compared with --baseline, per model and per camera path of a model
+MODEL_METRICS = ('load_cold_ms', 'load_warm_ms', 'pick_p50_ms',
+                 'pick_p99_ms')
+PATH_METRICS = ('frame_p50_ms', 'frame_p90_ms', 'frame_p99_ms')
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--platform', choices=('egl', 'osmesa'),
+                        default='egl',
+                        help='offscreen context, osmesa runs without a GPU')
+    parser.add_argument('--models', type=Path,
+                        default=Path(__file__).parent / 'models')
+    parser.add_argument('--frames', type=int, default=240,
+                        help='frames per camera path')
+    parser.add_argument('--size', type=int, nargs=2, default=(1280, 720),
+                        metavar=('WIDTH', 'HEIGHT'))
+    parser.add_argument('--output', type=Path,
+                        help='results file, printed if not given')
+    parser.add_argument('--baseline', type=Path,
+                        help='results of a previous run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='allowed slowdown against the baseline')
+    return parser.parse_args()
+
+
+def _create_egl_context(width: int, height: int):
+    from OpenGL import EGL
+
+    display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    major, minor = EGL.EGLint(), EGL.EGLint()
+    if not EGL.eglInitialize(display, ctypes.pointer(major),
+                             ctypes.pointer(minor)):
+        raise RuntimeError('EGL initialization failed')
+
+    config = EGL.EGLConfig()
+    n_configs = EGL.EGLint()
+    config_attributes = (EGL.EGLint * 13)(
+        EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+        EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8,
+        EGL.EGL_DEPTH_SIZE, 24,
+        EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+        EGL.EGL_NONE)
+    EGL.eglChooseConfig(display, config_attributes, ctypes.pointer(config),
+                        1, ctypes.pointer(n_configs))
+    if n_configs.value == 0:
+        raise RuntimeError('no EGL config with OpenGL and pbuffers')
+
+    surface = EGL.eglCreatePbufferSurface(display, config, (EGL.EGLint * 5)(
+        EGL.EGL_WIDTH, width, EGL.EGL_HEIGHT, height, EGL.EGL_NONE))
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context = EGL.eglCreateContext(
+        display, config, EGL.EGL_NO_CONTEXT, (EGL.EGLint * 7)(
+            EGL.EGL_CONTEXT_MAJOR_VERSION, 3,
+            EGL.EGL_CONTEXT_MINOR_VERSION, 3,
+            EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK,
+            EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT,
+            EGL.EGL_NONE))
+    if not EGL.eglMakeCurrent(display, surface, surface, context):
+        raise RuntimeError('could not make the EGL context current')
+    return display, surface, context
+
+
+def _create_osmesa_context(width: int, height: int):
+    from OpenGL import GL, arrays, osmesa
+
+    context = osmesa.OSMesaCreateContextAttribs([
+        osmesa.OSMESA_FORMAT, osmesa.OSMESA_RGBA,
+        osmesa.OSMESA_DEPTH_BITS, 24,
+        osmesa.OSMESA_PROFILE, osmesa.OSMESA_CORE_PROFILE,
+        osmesa.OSMESA_CONTEXT_MAJOR_VERSION, 3,
+        osmesa.OSMESA_CONTEXT_MINOR_VERSION, 3,
+        0], None)
+    if not context:
+        raise RuntimeError('OSMesa context creation failed')
+    # the color buffer has to outlive the context
+    buffer = arrays.GLubyteArray.zeros((height, width, 4))
+    if not osmesa.OSMesaMakeCurrent(context, buffer, GL.GL_UNSIGNED_BYTE,
+                                    width, height):
+        raise RuntimeError('could not make the OSMesa context current')
+    return context, buffer
+
+
+def _get_camera_path(name: str, center, radius: float, frames: int) -> list:
+    # [(camera position, target), ...]
+    positions = []
+    for i in range(frames):
+        t = i / max(frames - 1, 1)
+        if name == 'orbit':
+            angle = t * 2 * math.pi
+            offset = (math.cos(angle) * radius * 2.5, radius * 0.5,
+                      math.sin(angle) * radius * 2.5)
+        else:
+            # from far away, where the coarse LODs are used, to close up
+            distance = radius * (40 * (1 - t) + 1.5 * t)
+            offset = (0, radius * 0.2, distance)
+        positions.append(([center[i] + offset[i] for i in range(3)],
+                          center))
+    return positions
+
+
+def _percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(q / 100 *
+                                                   len(ordered)) - 1))
+    return ordered[index]
+
+
+def _get_peak_rss_mb() -> float:
+    # peak resident set of the whole process so far, in KB on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+class Benchmark:
+    def __init__(self, width: int, height: int, frames: int):
+        from OpenGL.GL import glEnable, glViewport, GL_DEPTH_TEST
+        from engine import RedactorEngine
+        from object.model import Model
+        from utilities.model_cache import ModelCache
+
+        self.width = width
+        self.height = height
+        self.frames = frames
+        # cold loads are measured with an empty cache that is thrown away
+        self._cache_location = tempfile.TemporaryDirectory()
+        Model.cache = ModelCache(Path(self._cache_location.name))
+
+        self.engine = RedactorEngine()
+        self.engine.init_gl()
+        glViewport(0, 0, width, height)
+        glEnable(GL_DEPTH_TEST)
+        self.engine.update_projection_matrix(width / height)
+        self.engine.obj_handler.create_light()
+
+    def run(self, model_paths: list) -> dict:
+        from OpenGL.GL import glGetString, GL_RENDERER, GL_VERSION
+
+        return {
+            'renderer': glGetString(GL_RENDERER).decode(),
+            'gl_version': glGetString(GL_VERSION).decode(),
+            'size': [self.width, self.height],
+            'frames_per_path': self.frames,
+            'models': {path.name: self.run_model(path)
+                       for path in model_paths}
+        }
+
+    def run_model(self, path: Path) -> dict:
+        from object.model import Model
+
+        handler = self.engine.obj_handler
+        rss_before = _get_peak_rss_mb()
+        start = time.perf_counter()
+        model = Model(path, [0, 0, 0], handler.model_shader)
+        load_cold = time.perf_counter() - start
+        model.release()
+
+        # the second load hits the model cache
+        start = time.perf_counter()
+        model = Model(path, [0, 0, 0], handler.model_shader)
+        load_warm = time.perf_counter() - start
+        handler.objects.append(model)
+
+        center, radius = self._get_model_sphere(model)
+        result = {'load_cold_ms': load_cold * 1000,
+                  'load_warm_ms': load_warm * 1000,
+                  'gpu_bytes': sum(m.gpu_nbytes for m in model.meshes),
+                  'host_bytes_uploaded': model.get_host_memory()[0],
+                  'host_bytes_kept': model.get_host_memory()[1],
+                  'paths': {}}
+        for name in PATHS:
+            result['paths'][name] = self._replay(
+                _get_camera_path(name, center, radius, self.frames))
+        result.update(self._pick(
+            _get_camera_path('orbit', center, radius, self.frames)))
+        # the peak only grows, models after a bigger one add nothing
+        result['process_peak_rss_mb'] = _get_peak_rss_mb()
+        result['peak_rss_growth_mb'] = result['process_peak_rss_mb'] - \
+            rss_before
+
+        handler.objects.remove(model)
+        model.release()
+        return result
+
+    def _replay(self, path: list) -> dict:
+        from OpenGL.GL import glClear, glFinish, GL_COLOR_BUFFER_BIT, \
+            GL_DEPTH_BUFFER_BIT
+
+        engine = self.engine
+        keys = [False] * 1024
+        frame_times = []
+        draw_calls = []
+        for position, target in path:
+            engine.camera.look_at(position, target)
+            start = time.perf_counter()
+            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            engine.on_tick(keys)
+            engine.draw_scene()
+            # wait for the GPU so the frame time includes the rendering
+            glFinish()
+            frame_times.append((time.perf_counter() - start) * 1000)
+            draw_calls.append(engine.obj_handler.render_queue.stats[
+                'draw_calls'])
+
+        return {'frame_mean_ms': sum(frame_times) / len(frame_times),
+                'frame_p50_ms': _percentile(frame_times, 50),
+                'frame_p90_ms': _percentile(frame_times, 90),
+                'frame_p99_ms': _percentile(frame_times, 99),
+                'frame_max_ms': max(frame_times),
+                'draw_calls_mean': sum(draw_calls) / len(draw_calls),
+                'culled_last_frame': engine.obj_handler.culler.culled}
+
+    def _pick(self, path: list) -> dict:
+        # rays from the camera positions to points scattered around the
+        # target, the scene BVH is built by a query before the timed ones
+        import numpy as np
+
+        handler = self.engine.obj_handler
+        start = time.perf_counter()
+        handler.cast_ray(path[0][0], [0, 0, 1])
+        build_time = time.perf_counter() - start
+
+        rng = np.random.default_rng(0)
+        pick_times = []
+        hits = 0
+        for position, target in path:
+            direction = np.array(target) - np.array(position)
+            direction += rng.normal(0, 0.05, 3) * np.linalg.norm(direction)
+            start = time.perf_counter()
+            hit = handler.cast_ray(position,
+                                   direction / np.linalg.norm(direction))
+            pick_times.append((time.perf_counter() - start) * 1000)
+            hits += hit is not None
+        return {'pick_build_ms': build_time * 1000,
+                'pick_p50_ms': _percentile(pick_times, 50),
+                'pick_p99_ms': _percentile(pick_times, 99),
+                'pick_hits': hits}
+
+    @staticmethod
+    def _get_model_sphere(model) -> tuple:
+        import numpy as np
+
+        bounds = [mesh.bounds for mesh in model.meshes
+                  if mesh.bounds is not None]
+        if not bounds:
+            return [0, 0, 0], 1
+        minimum = np.min([b.min for b in bounds], axis=0)
+        maximum = np.max([b.max for b in bounds], axis=0)
+        center = (minimum + maximum) / 2
+        return center.tolist(), float(np.linalg.norm(maximum - minimum) / 2)
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    # returns [(model, metric, baseline, current), ...] of regressions
+    regressions = []
+    for name, current in results['models'].items():
+        previous = baseline.get('models', {}).get(name)
+        if previous is None:
+            continue
+        pairs = [(metric, previous.get(metric), current.get(metric))
+                 for metric in MODEL_METRICS]
+        for path, stats in current['paths'].items():
+            old_stats = previous.get('paths', {}).get(path, {})
+            pairs += [(f'{path}.{metric}', old_stats.get(metric),
+                       stats.get(metric)) for metric in PATH_METRICS]
+
+        for metric, old, new in pairs:
+            if old is None or new is None:
+                continue
+            print(f'{name[:24]:<24} {metric:<22} {old:10.2f} {new:10.2f}'
+                  f' {(new - old) / old * 100 if old else 0:+7.1f}%')
+            if old > 0 and new > old * (1 + threshold):
+                regressions.append((name, metric, old, new))
+    return regressions
+
+
+def main() -> int:
+    args = _parse_args()
+    # PyOpenGL picks its platform at import time
+    os.environ['PYOPENGL_PLATFORM'] = args.platform
+    if 'DISPLAY' not in os.environ and 'WAYLAND_DISPLAY' not in os.environ:
+        # Mesa's default EGL display needs a display server,
+        # its surfaceless platform doesn't
+        os.environ.setdefault('EGL_PLATFORM', 'surfaceless')
+    width, height = args.size
+    if args.platform == 'egl':
+        context = _create_egl_context(width, height)
+    else:
+        context = _create_osmesa_context(width, height)
+
+    model_paths = sorted(args.models.glob('**/*.obj'))
+    results = Benchmark(width, height, args.frames).run(model_paths)
+    results['platform'] = args.platform
+
+    text = json.dumps(results, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        args.output.write_text(text, encoding='UTF-8')
+
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text(encoding='UTF-8'))
+        regressions = compare(results, baseline, args.threshold)
+        for name, metric, old, new in regressions:
+            print(f'regression: {name} {metric} {old:.2f} -> {new:.2f}',
+                  file=sys.stderr)
+        if regressions:
+            return 1
+    del context
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,6 +9,9 @@ from PyQt5.QtCore import Qt
 
 
 class _MovementSystem:
+    # below this speed the camera is considered stopped
+    STOP_SPEED = 1e-3
+
     def __init__(self, resistance_force=0.05, mass=80, speed=20):
         self._mass = mass
         self._resistance = resistance_force
@@ -18,6 +21,10 @@ class _MovementSystem:
     def get_velocity(self, view_dir: np.ndarray, active_keys) -> np.ndarray:
         force = self._get_force_direction(view_dir, active_keys) / self._mass
         self.velocity = (self.velocity + force) * (1 - self._resistance)
+        # the resistance only decays the velocity, snap it to zero so a
+        # resting camera stops producing changes
+        if np.dot(self.velocity, self.velocity) < self.STOP_SPEED ** 2:
+            self.velocity[:] = 0
         return self.velocity
 
     def _get_force_direction(self, view_dir, active_keys) -> np.ndarray:
@@ -64,6 +71,8 @@ class Camera:
         self.wheel_sensitivity = 3
         self.movement = _MovementSystem()
         self._fov = 45
+        # incremented on every change of pos, view_dir or fov
+        self.revision = 0
 
     @property
     def fov(self) -> float:
@@ -71,7 +80,10 @@ class Camera:
 
     @fov.setter
     def fov(self, value: float) -> None:
-        self._fov = self._clamp(value, self.FOV_MIN, self.FOV_MAX)
+        value = self._clamp(value, self.FOV_MIN, self.FOV_MAX)
+        if value != self._fov:
+            self._fov = value
+            self.revision += 1
 
     def get_view_matrix(self) -> np.ndarray:
         return Matrix44.look_at(self.pos, self.pos + self.view_dir, self.up,
@@ -83,8 +95,38 @@ class Camera:
             self.fov, int(aspect), min_distance, max_distance, 'f4')
 
     def do_movement(self, active_keys, delta_time: float):
-        self.pos += self.movement.get_velocity(
-            self.view_dir, active_keys) * delta_time
+        velocity = self.movement.get_velocity(self.view_dir, active_keys)
+        if velocity.any() and delta_time:
+            self.pos += velocity * delta_time
+            self.revision += 1
+
+    def look_at(self, pos, target) -> None:
+        direction = matrices.normalize_vec(
+            np.array(target, dtype=np.float32) -
+            np.array(pos, dtype=np.float32))
+        self.pos = np.array(pos, dtype=np.float32)
+        self.pitch = math.degrees(math.asin(float(direction[1])))
+        self.yaw = math.degrees(math.atan2(float(direction[2]),
+                                           float(direction[0])))
+
+        self._angle_normalized()
+        self._update_view_vectors()
+        self.revision += 1
+
+    def get_state(self) -> dict:
+        return {'pos': [float(i) for i in self.pos], 'yaw': self.yaw,
+                'pitch': self.pitch, 'fov': self.fov}
+
+    def set_state(self, state: dict) -> None:
+        self.pos = np.array(state['pos'], dtype=np.float32)
+        self.yaw = state['yaw']
+        self.pitch = state['pitch']
+        self.fov = state['fov']
+        self.movement.velocity[:] = 0
+
+        self._angle_normalized()
+        self._update_view_vectors()
+        self.revision += 1
 
     def do_mouse_movement(self, x_offset, y_offset) -> None:
         x_offset *= self.mouse_sensitivity
@@ -95,6 +137,7 @@ class Camera:
 
         self._angle_normalized()
         self._update_view_vectors()
+        self.revision += 1
 
     def _update_view_vectors(self) -> None:
         yaw_radians = math.radians(self.yaw)
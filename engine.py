@@ -3,16 +3,27 @@ import wx
 from camera import Camera
 from threading import Lock
 from models_handler import ModelsHandler
+from object.base_object import BaseObject
+from utilities.profiler import Profiler
 
 
 class RedactorEngine:
+    MAX_DELTA_TIME = 0.1
+
     def __init__(self):
         self.camera = Camera()
-        self.obj_handler = ModelsHandler(self.camera)
+        self.profiler = Profiler()
+        self.obj_handler = ModelsHandler(self.camera, self.profiler)
         self.delta_time = 0
         self._time = wx.StopWatch()
         self._last_frame = 0
+        self.aspect_ratio = 1
         self._draw_mutex = Lock()
+        # frames are drawn at most max_fps times a second, and only while
+        # the scene changes or something animates
+        self.max_fps = 144
+        self.changes = BaseObject.changes
+        self._drawn_state = None
 
     def init_gl(self):
         self.obj_handler.init_shaders()
@@ -21,38 +32,65 @@ class RedactorEngine:
         self._draw_mutex.acquire()
 
     def on_tick(self, active_keys: list) -> None:
-        self._calculate_delta_time()
-        self.camera.do_movement(active_keys, self.delta_time)
-        self.update_view_matrices()
+        with self.profiler.section('on_tick'):
+            self._calculate_delta_time()
+            self.camera.do_movement(active_keys, self.delta_time)
+            with self.profiler.section('process_imports'):
+                self.obj_handler.process_imports()
+            self.update_view_matrices()
 
     def draw_scene(self):
-        self.obj_handler.draw_all_objects()
+        with self.profiler.section('draw_scene'), \
+                self.profiler.gpu_section('scene'):
+            self.obj_handler.draw_all_objects()
+        self._drawn_state = self._get_scene_state()
+
+    def mark_dirty(self) -> None:
+        self.changes.mark()
+
+    def needs_redraw(self, active_keys: list) -> bool:
+        return self._get_scene_state() != self._drawn_state or \
+            self.is_animating(active_keys)
+
+    def is_animating(self, active_keys: list) -> bool:
+        # held keys and a moving camera change the view every frame,
+        # pending imports have to be picked up by on_tick
+        return any(active_keys) or \
+            self.camera.movement.velocity.any() or \
+            self.obj_handler.importer.pending > 0
+
+    def _get_scene_state(self) -> tuple:
+        return self.changes.revision, self.camera.revision, self.aspect_ratio
 
     def end_game_cycle(self) -> None:
         self._draw_mutex.release()
 
     def set_mouse_pos(self, offset: tuple):
         self.camera.do_mouse_movement(offset[0], offset[1])
+        self.mark_dirty()
 
     def change_fov(self, offset: int):
         self.camera.fov -= offset * self.camera.wheel_sensitivity // 120
+        self.mark_dirty()
 
     def _calculate_delta_time(self) -> None:
         current_frame = self._time.Time()
-        self.delta_time = (current_frame - self._last_frame) / 1000
+        # frames stop while idle, don't move the camera by the idle time
+        self.delta_time = min((current_frame - self._last_frame) / 1000,
+                              self.MAX_DELTA_TIME)
         self._last_frame = current_frame
-        # if self.delta_time != 0:
-        #     print(1 / self.delta_time)
 
     def update_view_matrices(self) -> None:
-        matrix = self.camera.get_view_matrix()
-        for shader in self.obj_handler.all_shaders:
-            shader.set_uniforms(view=matrix, viewPos=self.camera.pos)
-        self.obj_handler.axes.set_rotation(self.camera.pitch,
-                                           -self.camera.yaw,
-                                           self.camera.roll)
+        # the camera uniform block is shared by all shaders and only
+        # uploaded when the camera changed
+        with self.profiler.section('update_view_matrices'):
+            if not self.obj_handler.camera_buffer.update(self.camera,
+                                                         self.aspect_ratio):
+                return
+            self.obj_handler.axes.set_rotation(self.camera.pitch,
+                                               -self.camera.yaw,
+                                               self.camera.roll)
 
     def update_projection_matrix(self, aspect_ratio) -> None:
-        matrix = self.camera.get_projection(aspect_ratio)
-        for shader in self.obj_handler.all_shaders:
-            shader.set_uniforms(projection=matrix)
+        self.aspect_ratio = aspect_ratio
+        self.update_view_matrices()
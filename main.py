@@ -1,6 +1,25 @@
+import argparse
+
 from ui.app_window import MyApp
 
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description='3D scene editor')
+    parser.add_argument('--max-fps', type=float,
+                        help='frame rate limit while the scene changes, '
+                             'the engine default if not given')
+    parser.add_argument('--decode-workers', type=int,
+                        help='threads decoding textures, '
+                             'the number of CPUs if not given')
+    args = parser.parse_args()
+    if args.max_fps is not None and args.max_fps <= 0:
+        parser.error('--max-fps has to be positive')
+    if args.decode_workers is not None and args.decode_workers < 1:
+        parser.error('--decode-workers has to be at least 1')
+    return args
+
+
 if __name__ == '__main__':
-    app = MyApp()
+    args = _parse_args()
+    app = MyApp(max_fps=args.max_fps, decode_workers=args.decode_workers)
     app.MainLoop()
-
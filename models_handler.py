@@ -1,18 +1,32 @@
+import numpy as np
 import wx
 
 from pathlib import Path
 from camera import Camera
 from object.axes import Axes
+from object.base_object import BaseObject
 from object.custom import CustomObject
 from object.light_sphere import LightSphere
 from object.model import Model
+from object.scene_node import SceneNode
 from object.sphere import Sphere, ColorSphere
 from utilities.shader import Shader
+from utilities.mesh import Texture
+from utilities.geometry import Geometry
+from utilities.mesh_data import MaterialData, MeshData
+from utilities.project_file import ProjectFile
+from utilities.camera_buffer import CameraBuffer
+from utilities.model_importer import ModelImporter
+from utilities.render_queue import RenderQueue
+from utilities.frustum_culler import FrustumCuller
+from utilities.picker import RayHit, ScenePicker
+from utilities.profiler import Profiler
 from collections import deque
 
 
 class ModelsHandler:
-    def __init__(self, camera: Camera):
+    def __init__(self, camera: Camera, profiler: Profiler = None):
+        # roots of the scene graph, children are drawn with their parents
         self.objects = []
         self.temple_objects = deque()
         self.camera = camera
@@ -21,9 +35,15 @@ class ModelsHandler:
         self.light_shader = None
         self.custom_shader = None
         self.axis_shader = None
+        self.camera_buffer = None
         self._active_custom_obj = None
         self.light = None
         self.axes = None
+        self.importer = ModelImporter()
+        self.render_queue = RenderQueue()
+        self.culler = FrustumCuller()
+        self.picker = ScenePicker()
+        self.profiler = profiler or Profiler()
 
     def init_shaders(self) -> None:
         shaders_location = Path(__file__).parent / 'opengl_shaders'
@@ -39,18 +59,36 @@ class ModelsHandler:
         self.all_shaders += [self.model_shader, self.light_shader,
                              self.custom_shader, self.axis_shader]
 
+        self.camera_buffer = CameraBuffer()
+        for shader in self.all_shaders:
+            self.camera_buffer.attach(shader)
+
         self.axes = Axes(self.axis_shader)
 
     def create_light(self) -> LightSphere:
         self.light = LightSphere([0, 0, 0], self.light_shader, [255, 255, 255])
         return self.light
 
-    def open_new_model(self, path: Path) -> Model:
+    def open_new_model(self, path: Path, on_finished=None) -> Model:
+        '''
+        Returns the model right away in the 'loading' state,
+        on_finished(model) is called after upload, failure or cancel
+        '''
         start_pos = self.camera.pos + self.camera.view_dir * 5
-        model = Model(path, start_pos, self.model_shader)
+        model = Model(path, start_pos, self.model_shader, defer_loading=True)
         self.objects.append(model)
+        self.importer.submit(model, on_finished)
+        # keeps the render loop polling until the import is done
+        BaseObject.changes.mark()
         return model
 
+    def process_imports(self) -> None:
+        for model in self.importer.process_ready():
+            # models of a replaced scene aren't listed anymore
+            if model.state == 'cancelled' and model in self.objects:
+                self.objects.remove(model)
+                BaseObject.changes.mark()
+
     def create_new_sphere(self, texture: Path) -> Sphere:
         start_pos = self.camera.pos + self.camera.view_dir * 10
         sphere = Sphere(5, 50, 50, start_pos, self.model_shader, texture)
@@ -77,29 +115,279 @@ class ModelsHandler:
                                                          colour.green,
                                                          colour.blue]))
         if len(self.temple_objects) > 2:
-            self.temple_objects.popleft()
+            # gives the shared unit sphere back to the registry
+            self.temple_objects.popleft().release()
+        BaseObject.changes.mark()
 
     def finish_object_creation(self) -> CustomObject:
         if self._active_custom_obj is None:
             raise Exception()
         obj = self._active_custom_obj
         self._active_custom_obj = None
+        for mark in self.temple_objects:
+            mark.release()
         self.temple_objects.clear()
+        BaseObject.changes.mark()
+        return obj
+
+    def create_group(self, objects: list) -> SceneNode:
+        # the objects become children of a new node at their center,
+        # moving the node moves all of them
+        center = np.mean([obj.transform[3, :3] for obj in objects], axis=0)
+        group = SceneNode(center)
+        for obj in objects:
+            if obj in self.objects:
+                self.objects.remove(obj)
+            group.add_child(obj)
+        self.objects.append(group)
+        BaseObject.changes.mark()
+        return group
+
+    def ungroup(self, group: SceneNode) -> list:
+        # the children take the place of the group in the graph
+        children = list(group.children)
+        parent = group.parent
+        for child in children:
+            group.remove_child(child)
+            if parent is not None:
+                parent.add_child(child)
+        if parent is None:
+            self.objects.remove(group)
+            self.objects += children
+        else:
+            parent.remove_child(group)
+        BaseObject.changes.mark()
+        return children
+
+    def save_project(self, path: Path) -> None:
+        '''
+        Writes the scene graph, camera and light to a single file,
+        the geometry and the texture files of models are packed into it
+        '''
+        project = ProjectFile({
+            'camera': self.camera.get_state(),
+            'light': {'pos': self.light.pos.tolist(),
+                      'colour': [c * 255 for c in self.light.colour]},
+            'geometry': []})
+        # model geometry key -> index in the manifest 'geometry'
+        geometry = {}
+        objects = [self._save_object(obj, project, geometry)
+                   for obj in self.objects]
+        project.manifest['objects'] = [obj for obj in objects
+                                       if obj is not None]
+        project.save(path)
+
+    def open_project(self, path: Path) -> list:
+        '''
+        Replaces the scene with a saved one and returns the new roots,
+        the geometry is uploaded from the memory-mapped file
+        '''
+        project = ProjectFile.open(path)
+        manifest = project.manifest
+        self.importer.cancel_all()
+        for root in self.objects + list(self.temple_objects):
+            for node in root.iter_subtree():
+                node.release()
+        self._active_custom_obj = None
+        self.temple_objects.clear()
+
+        self.camera.set_state(manifest['camera'])
+        self.light.set_pos(*manifest['light']['pos'])
+        self.light.colour = manifest['light']['colour']
+        self.objects = [self._load_object(entry, project,
+                                          manifest['geometry'])
+                        for entry in manifest['objects']]
+        BaseObject.changes.mark()
+        return list(self.objects)
+
+    def _save_object(self, obj: SceneNode, project: ProjectFile,
+                     geometry: dict):
+        entry = {'pos': obj.pos.tolist(),
+                 'angles': [obj.yaw, obj.pitch, obj.roll],
+                 'scale': obj.scale}
+        if isinstance(obj, Model):
+            if obj.state != 'loaded':
+                return None
+            entry.update(type='model', path=str(obj.path), loader=obj.loader,
+                         geometry=self._save_geometry(obj, project, geometry))
+        elif isinstance(obj, Sphere):
+            entry.update(type='sphere', radius=obj.radius,
+                         sectors=obj.n_sectors, stacks=obj.n_stacks,
+                         texture=str(obj.texture.name or ''),
+                         flip=obj.texture.should_flip)
+        elif isinstance(obj, CustomObject):
+            entry.update(type='custom', vertices=project.add_blob(
+                obj.main_mesh.get_geometry().floats))
+        else:
+            entry['type'] = 'group'
+
+        children = [self._save_object(child, project, geometry)
+                    for child in obj.children]
+        entry['children'] = [child for child in children
+                             if child is not None]
+        return entry
+
+    @staticmethod
+    def _save_geometry(model: Model, project: ProjectFile,
+                       geometry: dict) -> int:
+        # models sharing their meshes share the stored geometry too
+        key = model._geometry_key
+        if key in geometry:
+            return geometry[key]
+
+        meshes = []
+        names = []
+        for mesh in model.meshes:
+            materials = []
+            for material in mesh.materials:
+                texture = ''
+                if material.texture.texture is not None:
+                    texture = Path(material.texture.name).relative_to(
+                        model.path.parent).as_posix()
+                    if texture not in names:
+                        names.append(texture)
+                first, count = material.index_range
+                materials.append({'texture': texture, 'first': int(first),
+                                  'count': int(count),
+                                  'lods': [[int(i) for i in lod]
+                                           for lod in material.lods]})
+            # read back from the GPU, meshes don't keep host copies
+            mesh_geometry = mesh.get_geometry()
+            meshes.append({'vertices': project.add_blob(mesh_geometry.floats),
+                           'indices': project.add_blob(mesh_geometry.indices),
+                           'materials': materials})
+
+        # the image files as they are, decoded again on open
+        textures = {name: project.add_blob(np.fromfile(
+            model.path.parent / name, dtype=np.uint8)) for name in names}
+        geometry[key] = len(project.manifest['geometry'])
+        project.manifest['geometry'].append({'meshes': meshes,
+                                             'textures': textures})
+        return geometry[key]
+
+    def _load_object(self, entry: dict, project: ProjectFile,
+                     geometry: list) -> SceneNode:
+        kind = entry['type']
+        if kind == 'model':
+            obj = Model(Path(entry['path']), entry['pos'], self.model_shader,
+                        loader=entry['loader'], defer_loading=True)
+            obj.upload(self._load_geometry(project,
+                                           geometry[entry['geometry']]))
+        elif kind == 'sphere':
+            obj = Sphere(entry['radius'], entry['sectors'], entry['stacks'],
+                         entry['pos'], self.model_shader, entry['texture'],
+                         should_flip_texture=entry['flip'])
+        elif kind == 'custom':
+            obj = CustomObject(entry['pos'], self.custom_shader)
+            obj.add_vertices(Geometry.from_floats(
+                obj.main_mesh.LAYOUT, project.get_blob(entry['vertices'])))
+        else:
+            obj = SceneNode(entry['pos'])
+
+        obj.set_pos(*entry['pos'])
+        obj.set_x_rotation(entry['angles'][0])
+        obj.set_y_rotation(entry['angles'][1])
+        obj.set_z_rotation(entry['angles'][2])
+        obj.set_scale(entry['scale'])
+        for child in entry['children']:
+            obj.add_child(self._load_object(child, project, geometry),
+                          keep_world=False)
         return obj
 
+    @staticmethod
+    def _load_geometry(project: ProjectFile, entry: dict) -> tuple:
+        # the (meshes, images) Model.upload() takes, arrays are views
+        # into the project file
+        meshes = []
+        for mesh in entry['meshes']:
+            materials = [MaterialData('', m['texture'], m['first'],
+                                      m['count'],
+                                      [tuple(lod) for lod in m['lods']])
+                         for m in mesh['materials']]
+            meshes.append(MeshData(project.get_blob(mesh['vertices']),
+                                   materials,
+                                   project.get_blob(mesh['indices'])))
+        names = list(entry['textures'])
+        images = Texture.decoder.decode_all(names, encoded={
+            name: project.get_blob(entry['textures'][name])
+            for name in names})
+        return meshes, images
+
+    def get_mouse_ray(self, x: int, y: int, width: int,
+                      height: int) -> tuple:
+        # world space (origin on the near plane, unit direction) through
+        # the pixel (x, y) of the viewport
+        ndc_x = 2 * (x + 0.5) / width - 1
+        ndc_y = 1 - 2 * (y + 0.5) / height
+        inverse = np.linalg.inv(self.camera_buffer.view_projection.astype(
+            np.float64))
+        near = np.array([ndc_x, ndc_y, -1, 1]) @ inverse
+        far = np.array([ndc_x, ndc_y, 1, 1]) @ inverse
+        near = near[:3] / near[3]
+        direction = far[:3] / far[3] - near
+        return near, direction / np.linalg.norm(direction)
+
+    def cast_ray(self, origin, direction, max_distance=np.inf) -> RayHit:
+        # closest hit with the listed objects and the light, or None
+        roots = self.objects + ([self.light] if self.light else [])
+        with self.profiler.section('pick'):
+            return self.picker.cast(roots, origin, direction, max_distance,
+                                    BaseObject.changes.revision)
+
+    def pick(self, x: int, y: int, width: int, height: int) -> RayHit:
+        return self.cast_ray(*self.get_mouse_ray(x, y, width, height))
+
     def draw_all_objects(self) -> None:
+        # uniform uploads of the frame stay in the shaders' counters
+        for shader in self.all_shaders:
+            shader.reset_counters()
         self.model_shader.set_uniforms(lightColor=self.light.colour,
                                        lightPos=self.light.pos)
-        for obj in self.objects:
-            obj.draw()
-        for obj in self.temple_objects:
-            obj.draw()
         if self.light.shader is None:
             self.light.shader = self.light_shader
             self.light.colour = [255, 255, 255]
-        self.light.draw()
+        # culled and drawn mesh counts of the frame stay in self.culler
+        roots = self.objects + list(self.temple_objects) + [self.light]
+        with self.profiler.section('cull'):
+            for root in roots:
+                root.update_world()
+            visible = self.culler.cull(
+                self.culler.collect(roots, self.camera_buffer.view_projection),
+                self.camera_buffer.view_projection)
+        # only queues the draws, the GL calls are timed in render_queue
+        with self.profiler.section('enqueue'):
+            for obj, meshes in visible:
+                label = 'enqueue ' + obj.get_obj_name() \
+                    if self.profiler.enabled else ''
+                with self.profiler.section(label):
+                    if meshes:
+                        obj.update_lod(self.camera)
+                    obj.submit(self.render_queue, meshes)
         if self.axes is not None:
-            self.axes.draw()
+            self.axes.submit(self.render_queue)
+        # state change counters of the frame stay in render_queue.stats
+        with self.profiler.section('render_queue'):
+            self.render_queue.flush()
+
+    def get_memory_report(self, max_lines=None) -> str:
+        # host memory per object before (uploaded) and after upload (host),
+        # objects after max_lines are only counted in the total
+        lines = [f'{"object":<40}{"uploaded KB":>14}{"host KB":>10}'
+                 f'{"GPU KB":>10}']
+        total = [0, 0, 0]
+        for root in self.objects:
+            for obj in root.iter_subtree():
+                uploaded, host = obj.get_host_memory()
+                gpu = sum(mesh.gpu_nbytes for mesh in obj.meshes)
+                if max_lines is None or len(lines) <= max_lines:
+                    lines.append(f'{obj.get_obj_name()[:39]:<40}'
+                                 f'{uploaded / 1024:>14.1f}'
+                                 f'{host / 1024:>10.1f}{gpu / 1024:>10.1f}')
+                total = [total[0] + uploaded, total[1] + host,
+                         total[2] + gpu]
+        lines.append(f'{"total":<40}{total[0] / 1024:>14.1f}'
+                     f'{total[1] / 1024:>10.1f}{total[2] / 1024:>10.1f}')
+        return '\n'.join(lines)
 
     def get_objs_names(self) -> list:
         return [i.get_obj_name() for i in self.objects]
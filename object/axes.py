@@ -3,6 +3,7 @@ import numpy as np
 from object.uiline import UiLine
 from utilities import matrix_functions as matrices
 from utilities.shader import Shader
+from utilities.render_queue import RenderQueue
 
 
 class Axes:
@@ -25,6 +26,6 @@ class Axes:
             matrices.rotate_y(y) @ \
             matrices.rotate_x(x)
 
-    def draw(self) -> None:
+    def submit(self, queue: RenderQueue) -> None:
         for line in self.lines:
-            line.draw(self.transform)
+            line.submit(queue, self.transform)
@@ -1,8 +1,13 @@
+import weakref
+
 import numpy as np
 import wx
 
-from utilities import matrix_functions as matrices
 from utilities.shader import Shader
+from utilities.geometry_registry import GeometryRegistry
+from utilities.render_queue import RenderQueue
+from utilities.scene_tracker import SceneTracker
+from utilities.transform_store import TransformStore
 from ui.obj_panels.panels_creator import ObjectPanelsCreator
 
 
@@ -15,61 +20,138 @@ def _compute_transform(change_func):
 
 
 class BaseObject:
+    geometry = GeometryRegistry()
+    # marked on every visible change of any object
+    changes = SceneTracker()
+    # position, rotation, scale and model matrix of every object,
+    # the object only keeps its row
+    transforms = TransformStore()
+
     def __init__(self, pos: list, shader: Shader, scale=1):
         self.meshes = []
-        self.wireframe = False
-        self.scale = scale
+        # mesh -> level of detail drawn, meshes can be shared by objects
+        self.mesh_lods = {}
+        self._wireframe = False
         self.shader = shader
-        self.pos = np.array(pos, dtype=np.float32)
-        self.yaw = 0
-        self.pitch = 0
-        self.roll = 0
-        self.transform = None
-        self._calculate_transform_matrix()
-
-    def draw(self):
-        if self.wireframe:
-            self.shader.enable_wireframe()
-        else:
-            self.shader.disable_wireframe()
-        self.shader.set_uniforms(model=self.transform)
+        self.row = self.transforms.allocate(pos, scale=scale)
+        # the row is reused once the object is garbage collected
+        weakref.finalize(self, self.transforms.free, self.row)
+        self.changes.mark()
+
+    @classmethod
+    def set_group_positions(cls, objects: list, positions) -> None:
+        # moves many objects with one store update, positions: (n, 3)
+        rows = np.fromiter((obj.row for obj in objects), dtype=np.intp,
+                           count=len(objects))
+        cls.transforms.set_positions(rows, positions)
+        for obj in objects:
+            obj._invalidate_transform()
+        cls.changes.mark()
+
+    @property
+    def pos(self) -> np.ndarray:
+        # view into the store, changed through the setters only
+        return self.transforms.positions[self.row]
+
+    @property
+    def yaw(self) -> float:
+        return float(self.transforms.angles[self.row, 0])
+
+    @property
+    def pitch(self) -> float:
+        return float(self.transforms.angles[self.row, 1])
+
+    @property
+    def roll(self) -> float:
+        return float(self.transforms.angles[self.row, 2])
+
+    @property
+    def scale(self) -> float:
+        return float(self.transforms.scales[self.row])
+
+    @property
+    def transform(self) -> np.ndarray:
+        return self.transforms.get_transform(self.row)
+
+    @property
+    def wireframe(self) -> bool:
+        return self._wireframe
+
+    @wireframe.setter
+    def wireframe(self, value: bool) -> None:
+        self._wireframe = value
+        self.changes.mark()
+
+    def submit(self, queue: RenderQueue, meshes: list = None) -> None:
+        # adds the draw calls of the object to this frame's render queue,
+        # meshes: the visible subset of self.meshes
+        uniforms = self._get_uniforms()
+        texture = self._get_texture()
+        for mesh in self.meshes if meshes is None else meshes:
+            mesh.submit(queue, self.shader, self.wireframe, uniforms,
+                        texture, self.transform, self.mesh_lods.get(mesh, 0))
+
+    def get_host_memory(self) -> tuple:
+        # (bytes given to the meshes, bytes still held by them) of the
+        # geometry in host memory, shared meshes are counted for all users
+        return (sum(mesh.uploaded_nbytes for mesh in self.meshes),
+                sum(mesh.host_nbytes for mesh in self.meshes))
+
+    def update_lod(self, camera) -> None:
+        # picks the level of detail of the meshes for this frame
+        pass
+
+    def _get_uniforms(self) -> dict:
+        # uniforms besides the model matrix, objects with any aren't
+        # drawn instanced
+        return {}
+
+    def _get_texture(self):
+        # Texture drawn instead of the mesh materials' ones, if any
+        return None
+
+    def release(self) -> None:
+        # frees GPU buffers and textures, the object can't be drawn after
         for mesh in self.meshes:
-            mesh.draw(self.shader)
+            mesh.release()
+        self.meshes = []
+        self.changes.mark()
 
     def _calculate_transform_matrix(self):
-        self.transform = \
-            matrices.scale(self.scale) @ \
-            matrices.rotate_z(self.roll) @ \
-            matrices.rotate_y(self.pitch) @ \
-            matrices.rotate_x(self.yaw) @ \
-            matrices.translate(self.pos[0], self.pos[1], self.pos[2])
+        # composed lazily together with the other changed objects
+        self.transforms.dirty[self.row] = True
+        self.changes.mark()
+
+    def _invalidate_transform(self) -> None:
+        # called after the row was changed in the store directly
+        pass
 
     def get_obj_name(self):
         return "Unknown"
 
     @_compute_transform
     def translate(self, tx, ty, tz):
-        self.pos += np.array([tx, ty, tz], dtype=np.float32)
+        self.transforms.positions[self.row] += (tx, ty, tz)
 
     @_compute_transform
     def set_pos(self, x, y, z):
-        self.pos = np.array([x, y, z], dtype=np.float32)
+        self.transforms.positions[self.row] = (x, y, z)
 
     @_compute_transform
     def set_x_rotation(self, degree):
-        self.yaw = degree
+        self.transforms.angles[self.row, 0] = degree
 
     @_compute_transform
     def set_y_rotation(self, degree):
-        self.pitch = degree
+        self.transforms.angles[self.row, 1] = degree
 
     @_compute_transform
     def set_z_rotation(self, degree):
-        self.roll = degree
+        self.transforms.angles[self.row, 2] = degree
 
     @_compute_transform
     def set_scale(self, value):
-        self.scale = value
+        self.transforms.scales[self.row] = value
 
     def get_settings_panels(self, panel: wx, sizer: wx.BoxSizer) -> list:
         base_panels = ObjectPanelsCreator(self).get_obj_gui_panels(panel,
@@ -1,34 +1,42 @@
 import wx
 from utilities import matrix_functions as matrices
 
-from utilities.mesh import Material, MeshCustomObject
-from object.base_object import BaseObject
+from utilities.geometry import Geometry
+from utilities.mesh import Material, MeshGrowingObject
+from object.scene_node import SceneNode
 from utilities.shader import Shader
 
 
-class CustomObject(BaseObject):
+class CustomObject(SceneNode):
     def __init__(self, start_pos: list, shader: Shader):
         super().__init__([0, 0, 0], shader)
-        self.main_material = Material([], 0)
-        self.main_mesh = MeshCustomObject(self.main_material)
+        self.main_material = Material(0)
+        self.main_mesh = MeshGrowingObject(self.main_material)
         self.meshes.append(self.main_mesh)
-        self.n_vertices = 0
+
+    @property
+    def n_vertices(self) -> int:
+        return self.main_mesh.n_vertices
 
     def add_new_vertex(self, pos: list, colour: wx.Colour) -> None:
-        # vertices: format 'C3F_N3F_V3F'
-        self.n_vertices += 1
-        new_vertex = [colour[0], colour[1], colour[2],
-                      0, 0, 0,
-                      pos[0], pos[1], pos[2]]
-        if self.n_vertices > 3:
-            new_triangle = self.main_material.vertices[-18:] + new_vertex
-            self.main_material.vertices += new_triangle
-        else:
-            self.main_material.vertices += new_vertex
+        vertex = Geometry.empty(MeshGrowingObject.LAYOUT, 1)
+        vertex.vertices['color'] = [colour[0], colour[1], colour[2]]
+        vertex.vertices['position'] = pos[:3]
+        self.add_vertices(vertex)
 
+    def add_vertices(self, geometry: Geometry) -> None:
+        # geometry: format 'C3F_N3F_V3F', e.g. of a saved object
+        self.main_mesh.add_vertices(geometry)
         if self.n_vertices >= 3:
             self.main_mesh.update_buffers()
+            self.invalidate_bounds()
+        self.changes.mark()
+
+    def _get_uniforms(self) -> dict:
+        uniforms = super()._get_uniforms()
+        # shares the shader with the colour marks, use the vertex colours
+        uniforms['overrideColor'] = [0, 0, 0, 0]
+        return uniforms
 
     def get_obj_name(self):
         return "custom object"
-
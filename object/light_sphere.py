@@ -3,11 +3,14 @@ import numpy as np
 
 from object.sphere import Sphere
 from ui.obj_panels.light_sphere_panel import LightSpherePanelsCreator
+from utilities.geometry import Geometry
 from utilities.mesh import Material, MeshLightObject
 from utilities.shader import Shader
 
 
 class LightSphere(Sphere):
+    LAYOUT = 'V3F'
+
     def __init__(self, start_pos: list, shader: Shader, color: list):
         super().__init__(1.5, 20, 20, start_pos, shader)
         self._colour = color
@@ -22,16 +25,11 @@ class LightSphere(Sphere):
     def colour(self, value):
         self._colour = value
         self.shader.set_uniforms(lightColor=np.array(self._colour) / 255)
+        self.changes.mark()
 
-    def _add_mesh(self, material: Material):
-        self.meshes.append(MeshLightObject([material], np.array([])))
-
-    def _add_vertex_by_idx(self, vertices, idx1, idx2, idx3):
-        if max(idx1, idx2, idx3) >= len(vertices):
-            return
-        self.vertices += vertices[idx1].to_opengl_coord_format()
-        self.vertices += vertices[idx2].to_opengl_coord_format()
-        self.vertices += vertices[idx3].to_opengl_coord_format()
+    def _add_mesh(self, material: Material,
+                  geometry: Geometry) -> MeshLightObject:
+        return MeshLightObject([material], geometry)
 
     def get_settings_panels(self, panel: wx, sizer: wx.BoxSizer) -> list:
         panels = LightSpherePanelsCreator(self).get_obj_gui_panels(panel,
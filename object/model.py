@@ -1,38 +1,187 @@
 from pywavefront import *
 
 from utilities.mesh import *
-from object.base_object import BaseObject
-from utilities.matrix_functions import concatenate
+from utilities.geometry import Geometry
+from utilities.mesh_data import MaterialData, MeshData
+from utilities.model_cache import ModelCache
+from utilities.obj_loader import load_obj
+from utilities.lod import get_screen_size, select_lod
+from utilities.model_importer import ImportCancelled
+from ui.obj_panels.model_panel import ModelPanelsCreator
+from object.scene_node import SceneNode
 
+import threading
 import numpy as np
+import wx
 from pathlib import Path
 
 
-class Model(BaseObject):
-    def __init__(self, path: Path, start_pos: list, shader: Shader, scale=1):
+class Model(SceneNode):
+    LOADERS = ('numpy', 'pywavefront')
+    cache = ModelCache()
+
+    def __init__(self, path: Path, start_pos: list, shader: Shader, scale=1,
+                 loader='numpy', defer_loading=False):
+        # defer_loading: read() and upload() are called by the owner,
+        # e.g. ModelImporter, instead of loading in the constructor
         super().__init__(start_pos, shader, scale)
+        if loader not in self.LOADERS:
+            raise ValueError(f'Unknown model loader: {loader}')
         self.path = path
-        self.scene = None
-        self._load_model()
+        self.loader = loader
+        self.state = 'loading'
+        self._cancel_event = threading.Event()
+        # models of the same file share their meshes through
+        # BaseObject.geometry and are drawn instanced
+        self._geometry_key = ('model', str(Path(path).resolve()), loader)
+        self._acquired = False
+        if not defer_loading:
+            self.upload(self.read())
+
+    @property
+    def loading(self) -> bool:
+        return self.state == 'loading'
+
+    def read(self) -> tuple:
+        '''
+        CPU stage, safe to run outside of the OpenGL thread:
+        parses the geometry, builds its BVHs and decodes the textures
+        '''
+        self._check_cancelled()
+        if self._geometry_key in self.geometry:
+            # uploaded by another model already, checked again in upload()
+            return None, {}
+
+        meshes = self.cache.load(self.path, self.loader)
+        if meshes is None:
+            if self.loader == 'numpy':
+                meshes = load_obj(self.path)
+            else:
+                # the parsed scene is dropped once converted to arrays
+                meshes = self._get_scene_meshes(Wavefront(
+                    self.path, collect_faces=True, create_materials=True))
+            meshes = [mesh.weld().build_lods() for mesh in meshes]
+            self.cache.store(self.path, meshes, self.loader)
+        # built on the loading thread, so picking never waits for it
+        self._check_cancelled()
+        meshes = [mesh.build_bvh() for mesh in meshes]
+
+        names = []
+        for mesh in meshes:
+            for material in mesh.materials:
+                if material.texture == '' or material.texture in names:
+                    continue
+                path = self.path.parent / material.texture
+                # textures already on the GPU don't need decoding
+                if not Texture.registry.contains(path, False):
+                    names.append(material.texture)
+
+        self._check_cancelled()
+        images = Texture.decoder.decode_all(
+            [self.path.parent / name for name in names])
+        return meshes, {name: images[self.path.parent / name]
+                        for name in names}
+
+    def upload(self, data: tuple) -> None:
+        # GL stage, must run on the thread owning the OpenGL context
+        self._check_cancelled()
+        meshes, images = data
+        if meshes is None and self._geometry_key not in self.geometry:
+            # the shared geometry was released in the meantime
+            meshes, images = self.read()
+        self.meshes = list(self.geometry.acquire(
+            self._geometry_key, lambda: self._load_meshes(meshes, images)))
+        self._acquired = True
+        self.state = 'loaded'
+        self.invalidate_bounds()
+        self.changes.mark()
+
+    def release(self) -> None:
+        if self.state == 'loading':
+            # finishes as cancelled instead of uploading into a scene
+            # which doesn't hold the model anymore
+            self.cancel_loading()
+        if self._acquired:
+            self.geometry.release(self._geometry_key)
+            self._acquired = False
+        self.meshes = []
+        self.invalidate_bounds()
+        self.changes.mark()
+
+    def cancel_loading(self) -> None:
+        self._cancel_event.set()
 
-    def _load_model(self):
-        self.scene = Wavefront(self.path, collect_faces=True,
-                               create_materials=True)
-        self._load_meshes()
+    def fail(self, error: Exception) -> None:
+        if isinstance(error, ImportCancelled):
+            self.state = 'cancelled'
+        else:
+            self.state = 'failed'
 
-    def _load_meshes(self):
-        for mesh in self.scene.mesh_list:
+    def _check_cancelled(self) -> None:
+        if self._cancel_event.is_set():
+            raise ImportCancelled(str(self.path))
+
+    @staticmethod
+    def _get_scene_meshes(scene: Wavefront) -> list:
+        meshes = []
+        for mesh in scene.mesh_list:
             materials = []
-            for i, material in enumerate(mesh.materials):
+            vertices = []
+            first = 0
+            for material in mesh.materials:
                 texture_name = ''
                 if material.texture is not None:
-                    texture_name = self.path.parent / material.texture.file_name
-                mat = Material(material.vertices, i, texture_name)
+                    texture_name = material.texture.file_name
+                # converted one material at a time, the float lists are
+                # never joined
+                material_vertices = np.array(material.vertices,
+                                             dtype=np.float32).reshape(-1, 8)
+                materials.append(MaterialData(material.name, texture_name,
+                                              first, len(material_vertices)))
+                vertices.append(material_vertices)
+                first += len(material_vertices)
+
+            meshes.append(MeshData(
+                np.concatenate(vertices) if vertices
+                else np.empty((0, 8), dtype=np.float32), materials))
+        return meshes
+
+    def _load_meshes(self, meshes: list, images: dict) -> list:
+        loaded = []
+        for mesh in meshes:
+            materials = []
+            for i, material in enumerate(mesh.materials):
+                texture_name = ''
+                if material.texture != '':
+                    texture_name = self.path.parent / material.texture
+                mat = Material(i, texture_name,
+                               index_range=(material.first, material.count),
+                               texture_data=images.get(material.texture),
+                               lods=material.lods)
                 materials.append(mat)
 
-            self.meshes.append(
-                Mesh(materials,
-                     concatenate(np.array(mesh.faces, dtype=np.uint32))))
+            # a view, the vertices are already laid out like the buffer
+            loaded.append(Mesh(materials, Geometry.from_floats(
+                Mesh.LAYOUT, mesh.vertices, mesh.indices), mesh.bvh))
+        return loaded
+
+    def update_lod(self, camera) -> None:
+        scale = np.linalg.norm(self.transform[:3, :3], axis=1).max()
+        for mesh in self.meshes:
+            if mesh.bounds is None or mesh.lod_count == 1:
+                continue
+            center = np.append(mesh.bounds.center, 1) @ self.transform
+            size = get_screen_size(center[:3], mesh.bounds.radius * scale,
+                                   camera)
+            self.mesh_lods[mesh] = select_lod(self.mesh_lods.get(mesh, 0),
+                                              size, mesh.lod_count)
 
     def get_obj_name(self):
-        return str(self.path.relative_to(self.path.parent.parent.parent))
+        name = str(self.path.relative_to(self.path.parent.parent.parent))
+        if self.state != 'loaded':
+            name += f' ({self.state})'
+        return name
+
+    def get_settings_panels(self, panel: wx, sizer: wx.BoxSizer) -> list:
+        panels = ModelPanelsCreator(self).get_obj_gui_panels(panel, sizer)
+        return panels
@@ -0,0 +1,175 @@
+import numpy as np
+
+from utilities.bounds import Bounds
+from utilities.shader import Shader
+from object.base_object import BaseObject
+
+
+class SceneNode(BaseObject):
+    '''
+    Object with a parent and children. Position, rotation and scale are
+    relative to the parent, transform is the world matrix.
+    World matrices are cached and only recomputed for the subtree below
+    a changed node, world bounds (meshes of the node and of all its
+    descendants) are cached until the node or a descendant changes.
+    '''
+    def __init__(self, pos: list, shader: Shader = None, scale=1):
+        self.parent = None
+        self.children = []
+        self._world = None
+        self._world_bounds = None
+        # a dirty node has only dirty descendants, bounds: ancestors
+        self._world_dirty = True
+        self._bounds_dirty = True
+        super().__init__(pos, shader, scale)
+
+    def get_obj_name(self):
+        return "group"
+
+    @property
+    def transform(self) -> np.ndarray:
+        if self._world_dirty:
+            self._update_world()
+        return self._world
+
+    @property
+    def local_transform(self) -> np.ndarray:
+        return self.transforms.get_transform(self.row)
+
+    @property
+    def world_bounds(self):
+        # Bounds in world space, None if nothing in the subtree has any
+        if self._bounds_dirty:
+            self._world_bounds = self._get_world_bounds()
+            self._bounds_dirty = False
+        return self._world_bounds
+
+    def add_child(self, node, keep_world=True) -> None:
+        # keep_world: the node stays where it is in the world
+        ancestor = self
+        while ancestor is not None:
+            if ancestor is node:
+                raise ValueError('A node can\'t be a child of itself')
+            ancestor = ancestor.parent
+        world = node.transform.copy()
+        if node.parent is not None:
+            node.parent.remove_child(node, keep_world=False)
+        node.parent = self
+        self.children.append(node)
+        if keep_world:
+            node.set_world_pos(*world[3, :3])
+        node._invalidate_transform()
+        self.invalidate_bounds()
+
+    def remove_child(self, node, keep_world=True) -> None:
+        world = node.transform.copy()
+        self.children.remove(node)
+        node.parent = None
+        if keep_world:
+            node.set_pos(*world[3, :3])
+        node._invalidate_transform()
+        self.invalidate_bounds()
+
+    def set_world_pos(self, x, y, z) -> None:
+        # only the translation is converted, the parent's rotation and
+        # scale still apply to the local rotation and scale
+        pos = np.array([x, y, z, 1], dtype=np.float32)
+        if self.parent is not None:
+            pos = pos @ np.linalg.inv(self.parent.transform)
+        self.set_pos(pos[0], pos[1], pos[2])
+
+    def iter_subtree(self):
+        # the node and all its descendants, parents first
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack += reversed(node.children)
+
+    def update_world(self) -> None:
+        '''
+        composes the world matrices of all dirty nodes of the subtree,
+        one batched product per tree level
+        '''
+        if not self._world_dirty:
+            return
+        self._update_world()
+        level = [self]
+        while True:
+            # children of dirty nodes are dirty too
+            children = [child for node in level for child in node.children]
+            if not children:
+                return
+            self.transforms.update()
+            rows = [child.row for child in children]
+            parents = np.array([child.parent._world for child in children])
+            worlds = np.matmul(self.transforms.transforms[rows], parents)
+            for child, world in zip(children, worlds):
+                child._world = world
+                child._world_dirty = False
+            level = children
+
+    def invalidate_bounds(self) -> None:
+        # call when the meshes of the node change
+        node = self
+        while node is not None and not node._bounds_dirty:
+            node._bounds_dirty = True
+            node = node.parent
+
+    def _invalidate_transform(self) -> None:
+        if self._world_dirty:
+            self.invalidate_bounds()
+            return
+        for node in self.iter_subtree():
+            node._world_dirty = True
+            node._bounds_dirty = True
+        if self.parent is not None:
+            self.parent.invalidate_bounds()
+
+    def release(self) -> None:
+        super().release()
+        self.invalidate_bounds()
+
+    def _calculate_transform_matrix(self):
+        super()._calculate_transform_matrix()
+        self._invalidate_transform()
+
+    def _update_world(self) -> None:
+        local = self.transforms.get_transform(self.row)
+        if self.parent is None:
+            self._world = local.copy()
+        else:
+            self._world = local @ self.parent.transform
+        self._world_dirty = False
+
+    def get_mesh_bounds(self):
+        # Bounds of the node's own meshes in world space, None if none
+        bounds = [mesh.bounds for mesh in self.meshes
+                  if mesh.bounds is not None]
+        if not bounds:
+            return None
+        # box of the transformed boxes, like in FrustumCuller
+        world = self.transform
+        centers = np.array([b.center for b in bounds]) @ world[:3, :3] + \
+            world[3, :3]
+        extents = np.array([b.extent for b in bounds]) @ \
+            np.abs(world[:3, :3])
+        return Bounds((centers - extents).min(axis=0),
+                      (centers + extents).max(axis=0))
+
+    def _get_world_bounds(self):
+        minimums, maximums = [], []
+        mesh_bounds = self.get_mesh_bounds()
+        if mesh_bounds is not None:
+            minimums.append(mesh_bounds.min[None])
+            maximums.append(mesh_bounds.max[None])
+
+        for child in self.children:
+            child_bounds = child.world_bounds
+            if child_bounds is not None:
+                minimums.append(child_bounds.min[None])
+                maximums.append(child_bounds.max[None])
+        if not minimums:
+            return None
+        return Bounds(np.concatenate(minimums).min(axis=0),
+                      np.concatenate(maximums).max(axis=0))
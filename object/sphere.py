@@ -1,92 +1,74 @@
-import math
-import numpy as np
 import wx
 
+from utilities.geometry import Geometry
 from utilities.shader import Shader
-from object.vertex import Vertex
+from utilities.shapes import get_sphere
 from utilities.mesh import Material, Mesh, Texture, MeshCustomObject
-from object.base_object import BaseObject
+from object.scene_node import SceneNode
 from ui.obj_panels.sphere_panel import SpherePanelsCreator
 
 
-class Sphere(BaseObject):
+class Sphere(SceneNode):
+    LAYOUT = 'T2F_N3F_V3F'
+
     def __init__(self, radius: float, sector_count: int, stack_count: int,
                  start_pos: list, shader: Shader, texture_name='', scale=1,
                  should_flip_texture=False):
         super().__init__(start_pos, shader, scale)
-        self.radius = radius
+        # radius is applied by the transform, the mesh is a shared
+        # unit sphere from BaseObject.geometry
+        self.transforms.base_scales[self.row] = radius
         self.n_sectors = sector_count
         self.n_stacks = stack_count
-        self.vertices = []
-        self.texture = Texture(0, texture_name, should_flip_texture)
+        self.texture = Texture(texture_name, should_flip_texture)
+        self._geometry_key = None
         self.generate()
 
     def get_obj_name(self):
         return "sphere"
 
     def generate(self):
-        sector_step = 2 * math.pi / self.n_sectors
-        stack_step = math.pi / self.n_stacks
-        vertices = []
-        self.vertices = []
+        key = ('sphere', self.n_sectors, self.n_stacks, self.LAYOUT)
+        if key == self._geometry_key:
+            return
+        self._release_geometry()
+
+        self._geometry_key = key
+        self.meshes = [self.geometry.acquire(key, self._create_mesh)]
+        self.invalidate_bounds()
+        self.changes.mark()
+
+    @property
+    def radius(self) -> float:
+        return float(self.transforms.base_scales[self.row])
+
+    def set_radius(self, radius: float) -> None:
+        self.transforms.base_scales[self.row] = radius
+        self._calculate_transform_matrix()
+
+    def _get_texture(self) -> Texture:
+        return self.texture
+
+    def _create_mesh(self) -> Mesh:
+        geometry = get_sphere(self.n_sectors, self.n_stacks, 1,
+                              self.LAYOUT, (255, 255, 255))
+        material = Material(0, index_range=(0, len(geometry.indices)))
+        return self._add_mesh(material, geometry)
+
+    def _add_mesh(self, material: Material, geometry: Geometry) -> Mesh:
+        return Mesh([material], geometry)
+
+    def _release_geometry(self) -> None:
+        if self._geometry_key is not None:
+            self.geometry.release(self._geometry_key)
+        self._geometry_key = None
         self.meshes = []
+        self.invalidate_bounds()
+        self.changes.mark()
 
-        for st in range(self.n_stacks + 1):
-            stack_angle = math.pi / 2 - st * stack_step
-            xy = self.radius * math.cos(stack_angle)
-            z = self.radius * math.sin(stack_angle)
-            for sec in range(self.n_sectors + 1):
-                sector_angle = sec * sector_step
-
-                x = xy * math.cos(sector_angle)
-                y = xy * math.sin(sector_angle)
-
-                vertices.append(self._get_vertex(x, y, z, sec, st))
-
-        self._vertices_to_triangles(vertices)
-
-    def _get_vertex(self, x, y, z, sec, st) -> Vertex:
-        # T2F_N3F_V3F
-        vert = Vertex()
-        vert.s = sec / self.n_sectors
-        vert.t = st / self.n_stacks
-
-        vert.x = x
-        vert.y = y
-        vert.z = z
-
-        vert.n1 = x / self.radius
-        vert.n2 = y / self.radius
-        vert.n3 = z / self.radius
-
-        return vert
-
-    def _vertices_to_triangles(self, vertices: list):
-        for i in range(self.n_stacks + 1):
-            for j in range(self.n_sectors + 1):
-                idx1 = i * self.n_sectors + j
-                idx2 = idx1 + self.n_sectors
-                idx3 = idx2 + 1
-                if i == 0:
-                    self._add_vertex_by_idx(vertices, idx1, idx2, idx3)
-                if i == self.n_stacks:
-                    self._add_vertex_by_idx(vertices, idx1 - 1, idx1, idx2)
-                else:
-                    self._add_vertex_by_idx(vertices, idx1, idx2, idx3)
-                    self._add_vertex_by_idx(vertices, idx1, idx1 + 1, idx3)
-
-        material = Material(self.vertices, 0, texture=self.texture)
-        self._add_mesh(material)
-
-    def _add_mesh(self, material: Material):
-        self.meshes.append(Mesh([material], np.array([])))
-
-    def _add_vertex_by_idx(self, vertices, idx1, idx2, idx3):
-        if max(idx1, idx2, idx3) >= len(vertices):
-            return
-        self.vertices += vertices[idx1].to_opengl_texture_format()
-        self.vertices += vertices[idx2].to_opengl_texture_format()
-        self.vertices += vertices[idx3].to_opengl_texture_format()
+    def release(self) -> None:
+        self._release_geometry()
+        self.texture.release()
 
     def get_settings_panels(self, panel: wx, sizer: wx.BoxSizer) -> list:
         panels = SpherePanelsCreator(self).get_obj_gui_panels(panel, sizer)
@@ -94,28 +76,20 @@ class Sphere(BaseObject):
 
 
 class ColorSphere(Sphere):
+    LAYOUT = 'C3F_N3F_V3F'
+
     def __init__(self, radius: float, sector_count: int, stack_count: int,
                  start_pos: list, shader: Shader, color: list):
-        # color: RGB 0-255
+        # color: RGB 0-255, set through the 'overrideColor' uniform
         self.color = color
         super().__init__(radius, sector_count, stack_count, start_pos, shader)
         self.wireframe = True
 
-    def _get_vertex(self, x, y, z, sec, st) -> Vertex:
-        vert = super(ColorSphere, self)._get_vertex(x, y, z, sec, st)
-        vert.red = self.color[0]
-        vert.green = self.color[1]
-        vert.blue = self.color[2]
-        return vert
-
-    def _add_mesh(self, material: Material):
-        mesh = MeshCustomObject(material)
-        self.meshes.append(mesh)
-        mesh.update_buffers()
+    def _get_uniforms(self) -> dict:
+        uniforms = super()._get_uniforms()
+        uniforms['overrideColor'] = [self.color[0], self.color[1],
+                                     self.color[2], 1]
+        return uniforms
 
-    def _add_vertex_by_idx(self, vertices, idx1, idx2, idx3):
-        if max(idx1, idx2, idx3) >= len(vertices):
-            return
-        self.vertices += vertices[idx1].to_opengl_color_format()
-        self.vertices += vertices[idx2].to_opengl_color_format()
-        self.vertices += vertices[idx3].to_opengl_color_format()
+    def _add_mesh(self, material: Material, geometry: Geometry) -> Mesh:
+        return MeshCustomObject(material, geometry)
@@ -1,7 +1,9 @@
 import numpy as np
 
+from utilities.geometry import Geometry
 from utilities.mesh import Material, MeshLine
 from utilities.shader import Shader
+from utilities.render_queue import RenderQueue
 
 
 class UiLine:
@@ -14,15 +16,13 @@ class UiLine:
         self._init_meshes()
 
     def _init_meshes(self) -> None:
-        vertices = [self.start[0], self.start[1], self.start[2],
-                        self.color[0], self.color[1], self.color[2],
-                    self.end[0], self.end[1], self.end[2],
-                        self.color[0], self.color[1], self.color[2]]
+        geometry = Geometry.empty('V3F_C3F', 2)
+        geometry.vertices['position'] = [self.start, self.end]
+        geometry.vertices['color'] = self.color[:3]
 
-        material = Material(vertices, 0)
-        self.meshes += [MeshLine([material])]
+        material = Material(0, index_range=(0, 2))
+        self.meshes += [MeshLine([material], geometry)]
 
-    def draw(self, transform: np.ndarray) -> None:
-        self.shader.set_uniforms(model=transform)
+    def submit(self, queue: RenderQueue, transform: np.ndarray) -> None:
         for mesh in self.meshes:
-            mesh.draw(self.shader)
+            mesh.submit(queue, self.shader, None, transform=transform)
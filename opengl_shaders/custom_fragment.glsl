@@ -8,10 +8,20 @@ in vec3 worldFragPos;
 
 uniform vec3 lightColor;
 uniform vec3 lightPos;
-uniform vec3 viewPos;
+layout (std140) uniform Camera
+{
+    mat4 view;
+    mat4 projection;
+    mat4 viewProjection;
+    vec4 viewPos;
+};
+// rgb 0-255, used instead of the vertex colours when alpha > 0
+uniform vec4 overrideColor;
 
 void main()
 {
+    vec3 baseColor = overrideColor.a > 0.0f ? overrideColor.rgb : ourColors;
+
     float ambientStrength = 0.6f;
     vec3 ambient = ambientStrength * lightColor;
 
@@ -21,13 +31,13 @@ void main()
     vec3 diffuse = cosAngle * lightColor;
 
     float specularStrength = 0.4;
-    vec3 viewDir = normalize(viewPos - worldFragPos);
+    vec3 viewDir = normalize(viewPos.xyz - worldFragPos);
     vec3 reflectDir = reflect(-lightDirection, norm);
     float spec = pow(max(dot(viewDir, reflectDir), 0), 32);
     vec3 specular = specularStrength * spec * lightColor;
 
-    vec4 objectColor = vec4(ourColors, 1.0f);
+    vec4 objectColor = vec4(baseColor, 1.0f);
 
     color = objectColor * vec4(ambient + diffuse + specular, 1.0f);
-    color = vec4(ourColors[0] / 255.0f, ourColors[1] / 255.0f, ourColors[2] / 255.0f, 1.0f);
+    color = vec4(baseColor[0] / 255.0f, baseColor[1] / 255.0f, baseColor[2] / 255.0f, 1.0f);
 }
\ No newline at end of file
@@ -10,12 +10,17 @@ out vec3 worldFragPos;
 
 uniform mat4 model;
 uniform mat4 normModel;
-uniform mat4 view;
-uniform mat4 projection;
+layout (std140) uniform Camera
+{
+    mat4 view;
+    mat4 projection;
+    mat4 viewProjection;
+    vec4 viewPos;
+};
 
 void main()
 {
-    gl_Position = projection * view * model * vec4(position, 1);
+    gl_Position = viewProjection * model * vec4(position, 1);
     ourColors = colors;
     ourNormals = mat3(normModel) * normals;
     worldFragPos = vec3(model * vec4(position, 1));
@@ -13,7 +13,13 @@ uniform vec2 resolution;
 uniform float time;
 uniform vec3 lightColor;
 uniform vec3 lightPos;
-uniform vec3 viewPos;
+layout (std140) uniform Camera
+{
+    mat4 view;
+    mat4 projection;
+    mat4 viewProjection;
+    vec4 viewPos;
+};
 
 void main()
 {
@@ -28,7 +34,7 @@ void main()
     vec3 diffuse = cosAngle * lightColor;
 
     float specularStrength = 0.4;
-    vec3 viewDir = normalize(viewPos - worldFragPos);
+    vec3 viewDir = normalize(viewPos.xyz - worldFragPos);
     vec3 reflectDir = reflect(-lightDirection, norm);
     float spec = pow(max(dot(viewDir, reflectDir), 0), 32);
     vec3 specular = specularStrength * spec * lightColor;
@@ -3,10 +3,15 @@
 layout (location = 0) in vec3 position;
 
 uniform mat4 model;
-uniform mat4 view;
-uniform mat4 projection;
+layout (std140) uniform Camera
+{
+    mat4 view;
+    mat4 projection;
+    mat4 viewProjection;
+    vec4 viewPos;
+};
 
 void main()
 {
-    gl_Position = projection * view * model * vec4(position, 1);
+    gl_Position = viewProjection * model * vec4(position, 1);
 }
\ No newline at end of file
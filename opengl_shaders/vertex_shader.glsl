@@ -3,6 +3,9 @@
 layout (location = 0) in vec2 textureCoord;
 layout (location = 1) in vec3 normals;
 layout (location = 2) in vec3 position;
+// per-instance matrices, used instead of the uniforms when instanced
+layout (location = 3) in mat4 instanceModel;
+layout (location = 7) in mat4 instanceNormModel;
 
 out vec2 ourTextureCoord;
 out vec3 ourNormals;
@@ -10,13 +13,22 @@ out vec3 worldFragPos;
 
 uniform mat4 model;
 uniform mat4 normModel;
-uniform mat4 view;
-uniform mat4 projection;
+uniform bool instanced;
+layout (std140) uniform Camera
+{
+    mat4 view;
+    mat4 projection;
+    mat4 viewProjection;
+    vec4 viewPos;
+};
 
 void main()
 {
-    gl_Position = projection * view * model * vec4(position, 1);
+    mat4 objectModel = instanced ? instanceModel : model;
+    mat4 objectNormModel = instanced ? instanceNormModel : normModel;
+
+    gl_Position = viewProjection * objectModel * vec4(position, 1);
     ourTextureCoord = textureCoord;
-    ourNormals = mat3(normModel) * normals;
-    worldFragPos = vec3(model * vec4(position, 1));
+    ourNormals = mat3(objectNormModel) * normals;
+    worldFragPos = vec3(objectModel * vec4(position, 1));
 }
\ No newline at end of file
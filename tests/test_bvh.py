@@ -0,0 +1,55 @@
+import numpy as np
+
+from utilities.bvh import TriangleBVH, intersect_triangles
+
+
+def _get_grid(n: int) -> tuple:
+    # (n - 1)^2 * 2 triangles of a bumpy unit sphere
+    theta, phi = np.meshgrid(np.linspace(0, np.pi, n),
+                             np.linspace(0, 2 * np.pi, n), indexing='ij')
+    positions = np.stack([np.sin(theta) * np.cos(phi),
+                          np.sin(theta) * np.sin(phi),
+                          np.cos(theta)], axis=-1).reshape(-1, 3)
+    positions += np.random.default_rng(0).normal(0, 0.003, positions.shape)
+    i = np.arange(n - 1)[:, None] * n + np.arange(n - 1)[None]
+    triangles = np.concatenate([
+        np.stack([i, i + n, i + 1], axis=-1).reshape(-1, 3),
+        np.stack([i + 1, i + n, i + n + 1], axis=-1).reshape(-1, 3)])
+    return positions.astype(np.float32), triangles
+
+
+def _brute_force(positions, triangles, origin, direction):
+    corners = positions[triangles]
+    distances = intersect_triangles(origin, direction, corners[:, 0],
+                                    corners[:, 1], corners[:, 2])
+    best = distances.argmin()
+    return None if not np.isfinite(distances[best]) else distances[best]
+
+
+def test_miss_inside_leaf_box():
+    # crosses the box of the single triangle but not the triangle
+    positions = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0]],
+                         dtype=np.float32)
+    bvh = TriangleBVH(positions, [[0, 1, 2]])
+    origin, direction = [0.9, 0.9, 1], [0, 0, -1]
+    assert len(bvh.bvh.query_ray(origin, direction)[0]) == 1
+    assert _brute_force(positions, np.array([[0, 1, 2]]), origin,
+                        direction) is None
+    assert bvh.intersect(origin, direction) is None
+    assert bvh.intersect([0.2, 0.2, 1], direction)[1] == 1
+
+
+def test_matches_brute_force():
+    positions, triangles = _get_grid(40)
+    bvh = TriangleBVH(positions, triangles)
+    rng = np.random.default_rng(1)
+    for _ in range(300):
+        origin = rng.normal(0, 1, 3) * 3
+        direction = -origin + rng.normal(0, 1, 3)
+        direction /= np.linalg.norm(direction)
+        expected = _brute_force(positions, triangles, origin, direction)
+        hit = bvh.intersect(origin, direction)
+        if expected is None:
+            assert hit is None
+        else:
+            assert hit is not None and abs(hit[1] - expected) < 1e-5
@@ -0,0 +1,19 @@
+import numpy as np
+
+from utilities.mesh_data import MaterialData, MeshData
+from utilities.model_cache import ModelCache
+
+
+def test_variants_are_cached_apart(tmp_path):
+    path = tmp_path / 'mesh.obj'
+    path.write_text('v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n')
+    cache = ModelCache(tmp_path / 'cache')
+    mesh = MeshData(np.zeros((3, 8), dtype=np.float32),
+                    [MaterialData('default', 'a.jpg', 0, 3)],
+                    np.arange(3, dtype=np.uint16))
+
+    cache.store(path, [mesh], 'numpy')
+    assert cache.load(path, 'pywavefront') is None
+    loaded = cache.load(path, 'numpy')
+    assert loaded[0].materials[0].texture == 'a.jpg'
+    assert np.array_equal(loaded[0].indices, mesh.indices)
@@ -0,0 +1,42 @@
+import numpy as np
+
+from utilities.obj_loader import load_obj
+
+
+def _load(tmp_path, text: str) -> np.ndarray:
+    path = tmp_path / 'mesh.obj'
+    path.write_text(text)
+    meshes = load_obj(path)
+    assert len(meshes) == 1
+    return np.asarray(meshes[0].vertices)
+
+
+def test_negative_indices_per_group(tmp_path):
+    # both faces refer to the three vertices declared right before them
+    vertices = _load(tmp_path, '\n'.join([
+        'g a', 'v 0 0 0', 'v 1 0 0', 'v 0 1 0', 'f -3 -2 -1',
+        'g b', 'v 5 5 5', 'v 6 5 5', 'v 5 6 5', 'f -3 -2 -1']))
+    assert np.array_equal(vertices[:, 5:8], [
+        [0, 0, 0], [1, 0, 0], [0, 1, 0], [5, 5, 5], [6, 5, 5], [5, 6, 5]])
+
+
+def test_mixed_formats(tmp_path):
+    vertices = _load(tmp_path, '\n'.join([
+        'v 0 0 0 1', 'v 1 0 0', 'v 0 1 0 0.5 0.5 0.5', 'v 1 1 0',
+        'vt 0.25', 'vt 0.5 0.75 0', 'vn 0 0 -1',
+        'f 1/1/1 2/2/1 3/2/1',
+        'f 2//1 4//1 3//1',
+        'f 1/2 2/1 4/2',
+        'f 1 2 3']))
+    assert np.array_equal(vertices[:, 5:8], [
+        [0, 0, 0], [1, 0, 0], [0, 1, 0],
+        [1, 0, 0], [1, 1, 0], [0, 1, 0],
+        [0, 0, 0], [1, 0, 0], [1, 1, 0],
+        [0, 0, 0], [1, 0, 0], [0, 1, 0]])
+    assert np.array_equal(vertices[:9, 0:2], [
+        [0.25, 0], [0.5, 0.75], [0.5, 0.75],
+        [0, 0], [0, 0], [0, 0],
+        [0.5, 0.75], [0.25, 0], [0.5, 0.75]])
+    # given normals are kept, missing ones are computed per face
+    assert np.array_equal(vertices[:6, 2:5], np.tile([0, 0, -1], (6, 1)))
+    assert np.allclose(vertices[6:, 2:5], np.tile([0, 0, 1], (6, 1)))
@@ -8,6 +8,7 @@ from engine import RedactorEngine
 from models_handler import ModelsHandler
 from ui.opengl_canvas import OpenGLCanvas
 from ui.settings_panel import ObjSettingsPanel
+from utilities.mesh import Texture
 
 
 class MyFrame(wx.Frame):
@@ -26,17 +27,29 @@ class MyFrame(wx.Frame):
         self.gl_panel = OpenGLCanvas(splitter, self, self.engine)
         self.settings_panel = ObjSettingsPanel(splitter,
                                                self.engine.obj_handler)
+        self.gl_panel.on_object_picked = self.settings_panel.select_obj
 
         splitter.SplitVertically(self.gl_panel, self.settings_panel,
                                  sashPosition=self.window_size[1] * 3 // 4)
 
     def on_close(self, event):
+        self.engine.obj_handler.importer.shutdown()
         self.Destroy()
         sys.exit(0)
 
 
 class MyApp(wx.App):
+    def __init__(self, max_fps: float = None, decode_workers: int = None):
+        # set before wx.App.__init__, which calls OnInit
+        self.max_fps = max_fps
+        self.decode_workers = decode_workers
+        wx.App.__init__(self)
+
     def OnInit(self):
+        if self.decode_workers is not None:
+            Texture.decoder.set_max_workers(self.decode_workers)
         frame = MyFrame()
+        if self.max_fps is not None:
+            frame.gl_panel.set_max_fps(self.max_fps)
         frame.Show()
         return True
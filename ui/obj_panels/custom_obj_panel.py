@@ -3,6 +3,7 @@ from wx import CommandEvent
 from wx.lib import scrolledpanel
 from pathlib import Path
 from models_handler import ModelsHandler
+from utilities.project_file import ProjectFile
 
 
 class NewObjectPanelsCreator:
@@ -15,6 +16,8 @@ class NewObjectPanelsCreator:
         self.new_vertex_button = None
         self.finish_creation_button = None
         self.custom_colour_picker = None
+        self.save_project_button = None
+        self.open_project_button = None
 
         self.sizer = None
 
@@ -41,12 +44,20 @@ class NewObjectPanelsCreator:
         self.custom_colour_picker = wx.ColourPickerCtrl(
             panel, wx.ID_ANY, style=wx.CLRP_USE_TEXTCTRL)
 
+        self.save_project_button = wx.Button(panel, wx.ID_ANY, "save project")
+        self.save_project_button.Bind(wx.EVT_BUTTON, self._save_project)
+
+        self.open_project_button = wx.Button(panel, wx.ID_ANY, "open project")
+        self.open_project_button.Bind(wx.EVT_BUTTON, self._open_project)
+
         sizer.Add(self.new_model_button, 0, wx.ALL | wx.EXPAND, 5)
         sizer.Add(self.new_sphere_button, 0, wx.ALL | wx.EXPAND, 5)
         sizer.Add(self.new_custom_button, 0, wx.ALL | wx.EXPAND, 5)
         sizer.Add(self.new_vertex_button, 0, wx.ALL | wx.EXPAND, 5)
         sizer.Add(self.finish_creation_button, 0, wx.ALL | wx.EXPAND, 5)
         sizer.Add(self.custom_colour_picker, 0, wx.ALL | wx.EXPAND, 5)
+        sizer.Add(self.save_project_button, 0, wx.ALL | wx.EXPAND, 5)
+        sizer.Add(self.open_project_button, 0, wx.ALL | wx.EXPAND, 5)
 
         sizer.Hide(self.new_vertex_button)
         sizer.Hide(self.finish_creation_button)
@@ -54,7 +65,8 @@ class NewObjectPanelsCreator:
 
         panels += [self.new_model_button, self.new_sphere_button,
                    self.new_custom_button, self.new_vertex_button,
-                   self.finish_creation_button, self.custom_colour_picker]
+                   self.finish_creation_button, self.custom_colour_picker,
+                   self.save_project_button, self.open_project_button]
 
         return panels
 
@@ -70,9 +82,40 @@ class NewObjectPanelsCreator:
         dialog.Destroy()
 
         if path is not None:
-            model = self.obj_handler.open_new_model(path)
+            model = self.obj_handler.open_new_model(
+                path, self.parent.on_obj_loaded)
             self.parent.add_obj(model)
 
+    def _save_project(self, event: CommandEvent) -> None:
+        caller = event.GetEventObject()
+        style = wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT
+        dialog = wx.FileDialog(caller, 'Save project',
+                               wildcard='*' + ProjectFile.EXTENSION,
+                               style=style)
+        if dialog.ShowModal() == wx.ID_OK:
+            path = Path(dialog.GetPath()).with_suffix(ProjectFile.EXTENSION)
+        else:
+            path = None
+        dialog.Destroy()
+
+        if path is not None:
+            self.obj_handler.save_project(path)
+
+    def _open_project(self, event: CommandEvent) -> None:
+        caller = event.GetEventObject()
+        style = wx.FD_OPEN | wx.FD_FILE_MUST_EXIST
+        dialog = wx.FileDialog(caller, 'Open project',
+                               wildcard='*' + ProjectFile.EXTENSION,
+                               style=style)
+        if dialog.ShowModal() == wx.ID_OK:
+            path = Path(dialog.GetPath())
+        else:
+            path = None
+        dialog.Destroy()
+
+        if path is not None:
+            self.parent.set_objs(self.obj_handler.open_project(path))
+
     def _new_sphere_create(self, event):
         caller = event.GetEventObject()
 
@@ -107,6 +150,8 @@ class NewObjectPanelsCreator:
         self.sizer.Hide(self.new_model_button)
         self.sizer.Hide(self.new_sphere_button)
         self.sizer.Hide(self.new_custom_button)
+        self.sizer.Hide(self.save_project_button)
+        self.sizer.Hide(self.open_project_button)
 
         self.sizer.Show(self.new_vertex_button)
         self.sizer.Show(self.finish_creation_button)
@@ -122,5 +167,7 @@ class NewObjectPanelsCreator:
         self.sizer.Show(self.new_model_button)
         self.sizer.Show(self.new_sphere_button)
         self.sizer.Show(self.new_custom_button)
+        self.sizer.Show(self.save_project_button)
+        self.sizer.Show(self.open_project_button)
 
         self.sizer.Layout()
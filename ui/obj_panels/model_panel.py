@@ -0,0 +1,28 @@
+import wx
+from wx.lib import scrolledpanel
+from ui.obj_panels.panels_creator import ObjectPanelsCreator
+
+
+class ModelPanelsCreator(ObjectPanelsCreator):
+    def __init__(self, obj):
+        super().__init__(obj)
+        self.obj = obj
+        self.cancel_button = None
+
+    def get_obj_gui_panels(self, panel: wx.lib.scrolledpanel,
+                           sizer: wx.BoxSizer) -> list:
+        panels = super(ModelPanelsCreator, self).get_obj_gui_panels(panel,
+                                                                   sizer)
+        if not self.obj.loading:
+            return panels
+
+        self.cancel_button = wx.Button(panel, wx.ID_ANY, "cancel loading")
+        self.cancel_button.Bind(wx.EVT_BUTTON, self._cancel_loading)
+        sizer.Add(self.cancel_button, 0, wx.ALL | wx.EXPAND, 5)
+
+        panels.append(self.cancel_button)
+        return panels
+
+    def _cancel_loading(self, event) -> None:
+        self.obj.cancel_loading()
+        self.cancel_button.Disable()
@@ -1,19 +1,21 @@
+import numpy as np
 import wx
 from wx.lib.agw import floatspin
 from wx.lib import scrolledpanel
 
 from ui.obj_panels.panels_creator import ObjectPanelsCreator
+from object.base_object import BaseObject
 
 
 class MultiObjectsPanel:
-    class LocationObject:
-        def __init__(self, obj):
-            self.obj = obj
-            self.start_pos = [obj.pos[0], obj.pos[1], obj.pos[2]]
-
-    def __init__(self, objs: list):
+    def __init__(self, objs: list, on_group=None):
+        # on_group(objs): called by the "group" button
         self.font = None
-        self.objs = [MultiObjectsPanel.LocationObject(i) for i in objs]
+        self.objs = objs
+        self.on_group = on_group
+        # the whole group is moved with one store update
+        self.rows = np.array([obj.row for obj in objs], dtype=np.intp)
+        self.start_positions = BaseObject.transforms.positions[self.rows]
         self.panel = None
 
     def get_obj_gui_panels(self, panel: wx.lib.scrolledpanel,
@@ -40,6 +42,12 @@ class MultiObjectsPanel:
         sizer.Add(z_pos, 0, wx.ALL, 5)
 
         panels = [title, x_pos, y_pos, z_pos]
+        if self.on_group is not None:
+            group_button = wx.Button(self.panel, wx.ID_ANY, "group")
+            group_button.Bind(wx.EVT_BUTTON,
+                              lambda event: self.on_group(self.objs))
+            sizer.Add(group_button, 0, wx.ALL | wx.EXPAND, 5)
+            panels.append(group_button)
         return panels
 
     def _get_pos_hbox(self, text: str, handler) -> wx.BoxSizer:
@@ -59,20 +67,15 @@ class MultiObjectsPanel:
         return hbox
 
     def _change_x_pos(self, event) -> None:
-        value = event.GetEventObject().Value
-        for loc_obj in self.objs:
-            obj = loc_obj.obj
-            obj.set_pos(loc_obj.start_pos[0] + value, obj.pos[1], obj.pos[2])
+        self._move_group(0, event.GetEventObject().Value)
 
     def _change_y_pos(self, event) -> None:
-        value = event.GetEventObject().Value
-        for loc_obj in self.objs:
-            obj = loc_obj.obj
-            obj.set_pos(obj.pos[0], loc_obj.start_pos[1] + value, obj.pos[2])
+        self._move_group(1, event.GetEventObject().Value)
 
     def _change_z_pos(self, event) -> None:
-        value = event.GetEventObject().Value
-        for loc_obj in self.objs:
-            obj = loc_obj.obj
-            obj.set_pos(obj.pos[0], obj.pos[1], loc_obj.start_pos[2] + value)
+        self._move_group(2, event.GetEventObject().Value)
 
+    def _move_group(self, axis: int, offset: float) -> None:
+        positions = BaseObject.transforms.positions[self.rows]
+        positions[:, axis] = self.start_positions[:, axis] + offset
+        BaseObject.set_group_positions(self.objs, positions)
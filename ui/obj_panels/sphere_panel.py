@@ -31,7 +31,8 @@ class SpherePanelsCreator(ObjectPanelsCreator):
                        handler, text: str) -> wx.BoxSizer:
         hbox = wx.BoxSizer(wx.HORIZONTAL)
         slider = wx.Slider(self.panel, wx.ID_ANY, default, min_, max_)
-        slider.Bind(wx.EVT_SCROLL_CHANGED, handler)
+        # regenerating is cheap enough to follow the slider while dragging
+        slider.Bind(wx.EVT_SCROLL, handler)
 
         text = wx.StaticText(self.panel, wx.ID_ANY, text)
         text.SetFont(self.font)
@@ -43,8 +44,7 @@ class SpherePanelsCreator(ObjectPanelsCreator):
         return hbox
 
     def _change_radius(self, event):
-        self.obj.radius = event.Int
-        self.obj.generate()
+        self.obj.set_radius(event.Int)
 
     def _change_sectors(self, event):
         self.obj.n_sectors = event.Int
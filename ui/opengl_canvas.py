@@ -1,8 +1,11 @@
 import sys
+import time
 import wx
 
 from wx import glcanvas
 from engine import RedactorEngine
+from utilities.mesh import Texture
+from pathlib import Path
 from OpenGL.GL import *
 
 
@@ -20,23 +23,55 @@ class OpenGLCanvas(glcanvas.GLCanvas):
         self.update_timer = wx.Timer(self)
         self.engine = engine
         self.last_mouse_pos = None
-
-        self.Bind(wx.EVT_TIMER, lambda _: self.Refresh(), self.update_timer)
+        # on_object_picked(object or None, add to selection) on left click
+        self.on_object_picked = None
+        # rolling profiler statistics, memory use of the objects and
+        # texture timings, toggled with F3, F4 exports the statistics
+        self.profiler_overlay = wx.StaticText(self, pos=(8, 8))
+        self.profiler_overlay.SetFont(wx.Font(9, wx.FONTFAMILY_TELETYPE,
+                                              wx.FONTSTYLE_NORMAL,
+                                              wx.FONTWEIGHT_NORMAL))
+        self.profiler_overlay.SetForegroundColour(wx.WHITE)
+        self.profiler_overlay.SetBackgroundColour(wx.BLACK)
+        self.profiler_overlay.Hide()
+        self._overlay_update_time = 0
+
+        self.Bind(wx.EVT_TIMER, self.on_timer, self.update_timer)
         self.Bind(wx.EVT_PAINT, self.on_paint)
         self.Bind(wx.EVT_SIZE, self.on_resize)
         self.Bind(wx.EVT_KEY_DOWN, self.on_key_down)
         self.Bind(wx.EVT_KEY_UP, self.on_key_up)
         self.Bind(wx.EVT_MOTION, self.on_mouse_move)
+        self.Bind(wx.EVT_LEFT_DOWN, self.on_mouse_left_down)
         self.Bind(wx.EVT_RIGHT_DOWN, self.on_mouse_right_down)
         self.Bind(wx.EVT_RIGHT_UP, self.on_mouse_right_up)
         self.Bind(wx.EVT_MOUSEWHEEL, self.on_mouse_wheel)
         self.Bind(wx.EVT_LEAVE_WINDOW, self.on_mouse_leave_window)
 
-        self.update_timer.Start(1000 / 144)
+        # the timer only runs while frames are needed, idle fps is zero
+        self.engine.changes.listeners.append(self.wake)
+        self.wake()
+
+    def set_max_fps(self, fps: float) -> None:
+        self.engine.max_fps = fps
+        if self.update_timer.IsRunning():
+            self.update_timer.Stop()
+            self.wake()
+
+    def wake(self) -> None:
+        if not self.update_timer.IsRunning():
+            self.update_timer.Start(max(1, int(1000 / self.engine.max_fps)))
+
+    def on_timer(self, event) -> None:
+        if self.engine.needs_redraw(self.active_keys):
+            self.Refresh()
+        else:
+            self.update_timer.Stop()
 
     def on_resize(self, event) -> None:
         size = self.GetClientSize()
         glViewport(0, 0, size.width, size.height)
+        self.wake()
 
     def on_paint(self, event) -> None:
         if not self.init:
@@ -49,12 +84,48 @@ class OpenGLCanvas(glcanvas.GLCanvas):
         self.engine.end_game_cycle()
 
     def on_draw(self) -> None:
+        profiler = self.engine.profiler
+        profiler.begin_frame()
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
 
         self.engine.on_tick(self.active_keys)
         self.engine.draw_scene()
 
-        self.SwapBuffers()
+        with profiler.section('swap_buffers'):
+            self.SwapBuffers()
+        profiler.end_frame()
+        self._update_profiler_overlay()
+
+    def toggle_profiler(self) -> None:
+        profiler = self.engine.profiler
+        profiler.enabled = not profiler.enabled
+        self.profiler_overlay.Show(profiler.enabled)
+        self.wake()
+
+    def export_profile(self, directory: Path = None) -> None:
+        directory = Path.cwd() if directory is None else Path(directory)
+        name = time.strftime('profile_%Y%m%d_%H%M%S')
+        self.engine.profiler.export_chrome_trace(directory / f'{name}.json')
+        self.engine.profiler.export_csv(directory / f'{name}.csv')
+
+    def _update_profiler_overlay(self) -> None:
+        # the text is only refreshed twice a second, it's costly to lay out
+        if not self.profiler_overlay.IsShown() or \
+                time.perf_counter() - self._overlay_update_time < 0.5:
+            return
+        self._overlay_update_time = time.perf_counter()
+        stats = self.engine.obj_handler.render_queue.stats
+        culler = self.engine.obj_handler.culler
+        shaders = self.engine.obj_handler.all_shaders
+        self.profiler_overlay.SetLabel(
+            self.engine.profiler.report() +
+            f'\ndraw calls {stats["draw_calls"]}  programs '
+            f'{stats["programs"]}  textures {stats["textures"]}'
+            f'\nuniforms uploaded {sum(s.uploads for s in shaders)}  '
+            f'skipped {sum(s.skipped for s in shaders)}'
+            f'\nmeshes drawn {culler.drawn}  culled {culler.culled}\n\n' +
+            self.engine.obj_handler.get_memory_report(max_lines=8) +
+            '\n\n' + Texture.decoder.report(max_lines=8))
 
     def init_gl(self) -> None:
         self.engine.init_gl()
@@ -70,6 +141,18 @@ class OpenGLCanvas(glcanvas.GLCanvas):
 
             self.WarpPointer(-self.last_mouse_pos[0], self.last_mouse_pos[1])
 
+    def on_mouse_left_down(self, event) -> None:
+        self.SetFocus()
+        if not self.init or self.on_object_picked is None:
+            return
+        # meshes without a BVH yet read their geometry back from the GPU
+        self.SetCurrent(self.context)
+        size = self.GetClientSize()
+        hit = self.engine.obj_handler.pick(event.x, event.y, size.width,
+                                           size.height)
+        self.on_object_picked(hit.obj if hit is not None else None,
+                              event.ControlDown())
+
     def on_mouse_right_down(self, event) -> None:
         self.last_mouse_pos = (-event.x, event.y)
         self.mouse_input = True
@@ -86,6 +169,11 @@ class OpenGLCanvas(glcanvas.GLCanvas):
 
     def on_key_down(self, event) -> None:
         self.active_keys[event.GetKeyCode() % 1024] = True
+        self.wake()
+        if event.GetKeyCode() == wx.WXK_F3:
+            self.toggle_profiler()
+        if event.GetKeyCode() == wx.WXK_F4:
+            self.export_profile()
         if event.GetKeyCode() == wx.WXK_ESCAPE:
             self.panel.Close()
             self.panel.Destroy()
@@ -93,6 +181,7 @@ class OpenGLCanvas(glcanvas.GLCanvas):
 
     def on_key_up(self, event) -> None:
         self.active_keys[event.KeyCode % 1024] = False
+        self.wake()
 
     def on_mouse_leave_window(self, event) -> None:
         self._show_mouse_cursor()
@@ -8,6 +8,7 @@ from wx.lib.scrolledpanel import ScrolledPanel
 from models_handler import ModelsHandler
 from ui.obj_panels.custom_obj_panel import NewObjectPanelsCreator
 from object.base_object import BaseObject
+from object.scene_node import SceneNode
 from ui.obj_panels.multi_objects_panel import MultiObjectsPanel
 
 
@@ -32,8 +33,13 @@ class ObjsListCtrl(wx.ListCtrl, listctrl.ListCtrlAutoWidthMixin):
     def add_object(self, name: str) -> None:
         self.Append([name])
 
+    def remove_object(self, idx: int) -> None:
+        self.DeleteItem(idx)
+        self.active_objects = deque(i - 1 if i > idx else i
+                                    for i in self.active_objects)
+
     def on_item_deselected(self, event):
-        if event.Index != 0:
+        if event.Index in self.active_objects:
             self.active_objects.remove(event.Index)
         self.panel.update_obj_settings()
 
@@ -80,6 +86,55 @@ class ObjSettingsPanel(wx.Panel):
         self.list_ctrl.Select(obj_idx)
         # self.list_ctrl.Focus(len(self.obj_to_scroll) - 1)
 
+    def remove_obj(self, obj: BaseObject) -> None:
+        idx = next(i for i, o in self.num_to_obj.items() if o is obj)
+        if idx in self.list_ctrl.active_objects:
+            self.list_ctrl.Select(idx, on=0)
+
+        objs = [o for o in self.num_to_obj.values() if o is not obj]
+        self.num_to_obj = {i + 1: o for i, o in enumerate(objs)}
+        self.list_ctrl.remove_object(idx)
+        self.update_obj_settings()
+
+    def select_obj(self, obj: BaseObject, add=False) -> None:
+        # obj: e.g. picked in the viewport, the listed object it belongs
+        # to is selected; None only clears the selection
+        listed = {id(o): i for i, o in self.num_to_obj.items()}
+        while obj is not None and id(obj) not in listed:
+            obj = getattr(obj, 'parent', None)
+        if not add:
+            for idx in list(self.list_ctrl.active_objects):
+                if obj is None or idx != listed[id(obj)]:
+                    self.list_ctrl.Select(idx, on=0)
+        if obj is not None:
+            self.list_ctrl.Select(listed[id(obj)])
+
+    def set_objs(self, objs: list) -> None:
+        # replaces the listed objects, e.g. after opening a project;
+        # the light stays
+        for obj in list(self.num_to_obj.values()):
+            if obj is not self.obj_handler.light:
+                self.remove_obj(obj)
+        for obj in objs:
+            self.add_obj(obj)
+
+    def on_obj_loaded(self, obj: BaseObject) -> None:
+        # called from the OpenGL paint cycle, widgets are updated later
+        wx.CallAfter(self._update_loaded_obj, obj)
+
+    def _update_loaded_obj(self, obj: BaseObject) -> None:
+        if all(o is not obj for o in self.num_to_obj.values()):
+            # removed meanwhile, e.g. by opening a project
+            return
+        if obj.state == 'cancelled':
+            self.remove_obj(obj)
+            return
+
+        idx = next(i for i, o in self.num_to_obj.items() if o is obj)
+        self.list_ctrl.SetItemText(idx, obj.get_obj_name())
+        if idx in self.list_ctrl.active_objects:
+            self.update_obj_settings()
+
     def update_obj_settings(self) -> None:
         self._hide_scrolls()
         self._show_actual_panels()
@@ -116,6 +171,11 @@ class ObjSettingsPanel(wx.Panel):
         new_scroll.SetSizer(new_sizer)
 
         _ = obj.get_settings_panels(new_scroll, new_sizer)
+        if type(obj) is SceneNode:
+            ungroup_button = wx.Button(new_scroll, wx.ID_ANY, "ungroup")
+            ungroup_button.Bind(wx.EVT_BUTTON,
+                                lambda event: self._ungroup(obj))
+            new_sizer.Add(ungroup_button, 0, wx.ALL | wx.EXPAND, 5)
         return new_scroll
 
     def _accept_multi_objects_panel(self) -> ScrolledPanel:
@@ -125,11 +185,28 @@ class ObjSettingsPanel(wx.Panel):
         new_sizer = wx.BoxSizer(wx.VERTICAL)
         new_scroll.SetSizer(new_sizer)
 
-        multi_objs = MultiObjectsPanel(self._get_active_objects())
+        multi_objs = MultiObjectsPanel(self._get_active_objects(),
+                                       self._group)
         _ = multi_objs.get_obj_gui_panels(new_scroll, new_sizer)
 
         return new_scroll
 
+    def _group(self, objs: list) -> None:
+        # the light isn't part of the scene graph
+        objs = [obj for obj in objs if obj is not self.obj_handler.light]
+        if not objs:
+            return
+        group = self.obj_handler.create_group(objs)
+        for obj in objs:
+            self.remove_obj(obj)
+        self.add_obj(group)
+
+    def _ungroup(self, group: SceneNode) -> None:
+        children = self.obj_handler.ungroup(group)
+        self.remove_obj(group)
+        for child in children:
+            self.add_obj(child)
+
     def _get_new_obj_panel(self) -> scrolledpanel.ScrolledPanel:
         scrollbar = scrolledpanel.ScrolledPanel(self.splitter, wx.ID_ANY,
                                                 style=wx.SIMPLE_BORDER)
@@ -0,0 +1,40 @@
+import numpy as np
+
+
+class Bounds:
+    '''
+    Axis aligned box and bounding sphere of a set of points in the
+    local space of a mesh, the sphere is centered on the box
+    '''
+    def __init__(self, minimum: np.ndarray, maximum: np.ndarray,
+                 radius: float = None):
+        self.min = np.asarray(minimum, dtype=np.float32)
+        self.max = np.asarray(maximum, dtype=np.float32)
+        # half of the box diagonal unless a tighter radius is known
+        self.radius = float(np.linalg.norm(self.max - self.min) / 2) \
+            if radius is None else radius
+
+    @classmethod
+    def from_points(cls, points: np.ndarray):
+        # points: (n, 3), None if there are no points
+        if len(points) == 0:
+            return None
+        minimum = points.min(axis=0)
+        maximum = points.max(axis=0)
+        center = (minimum + maximum) / 2
+        radius = float(np.sqrt(((points - center) ** 2).sum(axis=1).max()))
+        return cls(minimum, maximum, radius)
+
+    @property
+    def center(self) -> np.ndarray:
+        return (self.min + self.max) / 2
+
+    @property
+    def extent(self) -> np.ndarray:
+        return (self.max - self.min) / 2
+
+    def extend(self, points: np.ndarray) -> None:
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 3)
+        self.min = np.minimum(self.min, points.min(axis=0))
+        self.max = np.maximum(self.max, points.max(axis=0))
+        self.radius = float(np.linalg.norm(self.max - self.min) / 2)
@@ -0,0 +1,357 @@
+import numpy as np
+
+
+def _get_areas(minimums: np.ndarray, maximums: np.ndarray) -> np.ndarray:
+    # surface areas of (..., 3) boxes
+    d = maximums - minimums
+    return 2 * (d[..., 0] * d[..., 1] + d[..., 1] * d[..., 2] +
+                d[..., 2] * d[..., 0])
+
+
+def _get_ranges(firsts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    # concatenated arange(first, first + count) of every range
+    starts = np.cumsum(counts) - counts
+    return np.repeat(firsts - starts, counts) + np.arange(counts.sum())
+
+
+class BVH:
+    '''
+    Bounding volume hierarchy over the boxes of primitives, stored as
+    flat node arrays. It is built top-down one tree level at a time,
+    every node of a level is split at once with the surface area
+    heuristic evaluated over BINS centroid bins per axis.
+    The primitives of a leaf are order[first:first + count], the
+    children of an internal node are left and left + 1.
+    '''
+    BINS = 16
+    LEAF_SIZE = 4
+    # nodes with more primitives are split even if the SAH says not to
+    MAX_LEAF_SIZE = 32
+    # cost of visiting a node relative to testing a primitive
+    TRAVERSAL_COST = 1.0
+
+    def __init__(self, minimums: np.ndarray, maximums: np.ndarray):
+        minimums = np.asarray(minimums, dtype=np.float32).reshape(-1, 3)
+        maximums = np.asarray(maximums, dtype=np.float32).reshape(-1, 3)
+        self.order = np.arange(len(minimums))
+        # (nodes, 2, 3) min and max corners, node_min and node_max are
+        # views of it
+        self._boxes = np.empty((0, 2, 3), dtype=np.float32)
+        self.node_min = self._boxes[:, 0]
+        self.node_max = self._boxes[:, 1]
+        self.node_first = np.empty(0, dtype=np.int64)
+        self.node_count = np.empty(0, dtype=np.int64)
+        # -1 for leaves
+        self.node_left = np.empty(0, dtype=np.int64)
+        # [(first node, end node), ...] of every tree level
+        self.levels = []
+        if len(minimums):
+            self._build(minimums, maximums)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.order, self._boxes,
+                                      self.node_first,
+                                      self.node_count, self.node_left))
+
+    def refit(self, minimums: np.ndarray, maximums: np.ndarray) -> None:
+        '''
+        recomputes the node boxes for moved primitives, the tree itself
+        stays, so it's only as good as the primitives stay close to where
+        they were built
+        '''
+        if not len(self.order):
+            return
+        minimums = np.asarray(minimums, dtype=np.float32)[self.order]
+        maximums = np.asarray(maximums, dtype=np.float32)[self.order]
+        # leaves partition the order array
+        leaves = np.flatnonzero(self.node_left < 0)
+        leaves = leaves[np.argsort(self.node_first[leaves])]
+        self.node_min[leaves] = np.minimum.reduceat(
+            minimums, self.node_first[leaves])
+        self.node_max[leaves] = np.maximum.reduceat(
+            maximums, self.node_first[leaves])
+
+        for start, end in reversed(self.levels):
+            nodes = np.arange(start, end)
+            nodes = nodes[self.node_left[nodes] >= 0]
+            left = self.node_left[nodes]
+            self.node_min[nodes] = np.minimum(self.node_min[left],
+                                              self.node_min[left + 1])
+            self.node_max[nodes] = np.maximum(self.node_max[left],
+                                              self.node_max[left + 1])
+
+    def query_ray(self, origin, direction, max_distance=np.inf) -> tuple:
+        '''
+        primitives in the leaves hit by the ray and the distances where
+        the ray enters their leaves, in units of direction
+        '''
+        origin = np.asarray(origin, dtype=np.float32)
+        direction = np.asarray(direction, dtype=np.float32)
+        # no zero components, so there are no 0 * inf slab distances
+        direction = np.where(np.abs(direction) < 1e-12, 1e-12, direction)
+        inverse = 1 / direction
+
+        boxes = self._boxes
+        leaves, distances = [], []
+        nodes = np.zeros(min(len(self.node_left), 1), dtype=np.int64)
+        while len(nodes):
+            # slab distances (nodes, min / max corner, axis)
+            t = (boxes[nodes] - origin) * inverse
+            t_near = np.minimum(t[:, 0], t[:, 1])
+            t_far = np.maximum(t[:, 0], t[:, 1])
+            near = np.maximum.reduce(t_near, axis=1)
+            np.maximum(near, 0, out=near)
+            hit = near <= np.minimum(np.minimum.reduce(t_far, axis=1),
+                                     max_distance)
+            nodes, near = nodes[hit], near[hit]
+
+            left = self.node_left[nodes]
+            is_leaf = left < 0
+            leaves.append(nodes[is_leaf])
+            distances.append(near[is_leaf])
+            left = left[~is_leaf]
+            nodes = np.concatenate((left, left + 1))
+
+        leaves = np.concatenate(leaves) if leaves else nodes
+        counts = self.node_count[leaves]
+        return (self.order[_get_ranges(self.node_first[leaves], counts)],
+                np.repeat(np.concatenate(distances) if distances
+                          else np.empty(0, dtype=np.float32), counts))
+
+    def _build(self, minimums: np.ndarray, maximums: np.ndarray) -> None:
+        centroids = (minimums + maximums) / 2
+        node_min, node_max, firsts_list, counts_list, lefts = \
+            [], [], [], [], []
+        firsts = np.zeros(1, dtype=np.int64)
+        counts = np.array([len(minimums)], dtype=np.int64)
+        end = 1
+        while len(firsts):
+            self.levels.append((end - len(firsts), end))
+            ranges = _get_ranges(firsts, counts)
+            starts = np.cumsum(counts) - counts
+            primitives = self.order[ranges]
+            level_min = np.minimum.reduceat(minimums[primitives], starts)
+            level_max = np.maximum.reduceat(maximums[primitives], starts)
+            node_min.append(level_min)
+            node_max.append(level_max)
+            firsts_list.append(firsts)
+            counts_list.append(counts)
+
+            left = np.full(len(firsts), -1, dtype=np.int64)
+            split = counts > self.LEAF_SIZE
+            if split.any():
+                split_nodes = np.flatnonzero(split)
+                n_left = self._split(
+                    ranges[np.repeat(split, counts)], firsts[split],
+                    counts[split], _get_areas(level_min[split],
+                                              level_max[split]),
+                    minimums, maximums, centroids)
+                # nodes the SAH keeps as leaves
+                keep = n_left > 0
+                split_nodes, n_left = split_nodes[keep], n_left[keep]
+                left[split_nodes] = end + 2 * np.arange(len(split_nodes))
+                end += 2 * len(split_nodes)
+
+                split_firsts = firsts[split_nodes]
+                split_counts = counts[split_nodes]
+                firsts = np.stack((split_firsts, split_firsts + n_left),
+                                  axis=1).reshape(-1)
+                counts = np.stack((n_left, split_counts - n_left),
+                                  axis=1).reshape(-1)
+            else:
+                firsts = counts = np.empty(0, dtype=np.int64)
+            lefts.append(left)
+
+        self._boxes = np.stack((np.concatenate(node_min),
+                                np.concatenate(node_max)), axis=1)
+        self.node_min = self._boxes[:, 0]
+        self.node_max = self._boxes[:, 1]
+        self.node_first = np.concatenate(firsts_list)
+        self.node_count = np.concatenate(counts_list)
+        self.node_left = np.concatenate(lefts)
+        self.node_count[self.node_left >= 0] = 0
+
+    def _split(self, ranges: np.ndarray, firsts: np.ndarray,
+               counts: np.ndarray, areas: np.ndarray, minimums: np.ndarray,
+               maximums: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        '''
+        partitions the primitives of the nodes in self.order, returns the
+        primitive counts of the left children, 0 for nodes left as leaves
+        '''
+        n_nodes, bins = len(firsts), self.BINS
+        primitives = self.order[ranges]
+        starts = np.cumsum(counts) - counts
+        owners = np.repeat(np.arange(n_nodes), counts)
+        points = centroids[primitives]
+        points_min = np.minimum.reduceat(points, starts)
+        extents = np.maximum.reduceat(points, starts) - points_min
+        scales = np.divide(bins, extents, out=np.zeros_like(extents),
+                           where=extents > 0)
+        bin_ids = np.minimum(((points - points_min[owners]) *
+                              scales[owners]).astype(np.int64), bins - 1)
+
+        costs = np.empty((n_nodes, 3, bins - 1))
+        primitive_min = minimums[primitives].T.copy()
+        primitive_max = maximums[primitives].T.copy()
+        with np.errstate(invalid='ignore'):
+            for axis in range(3):
+                keys = owners * bins + bin_ids[:, axis]
+                bin_counts = np.bincount(keys, minlength=n_nodes * bins
+                                         ).reshape(n_nodes, bins)
+                bin_min = np.full((3, n_nodes * bins), np.inf,
+                                  dtype=np.float32)
+                bin_max = np.full((3, n_nodes * bins), -np.inf,
+                                  dtype=np.float32)
+                # one coordinate at a time, ufunc.at is only fast for
+                # 1d operands
+                for i in range(3):
+                    np.minimum.at(bin_min[i], keys, primitive_min[i])
+                    np.maximum.at(bin_max[i], keys, primitive_max[i])
+                bin_min = bin_min.T.reshape(n_nodes, bins, 3)
+                bin_max = bin_max.T.reshape(n_nodes, bins, 3)
+
+                # left: bins up to i, right: bins after i
+                left_areas = _get_areas(
+                    np.minimum.accumulate(bin_min, axis=1),
+                    np.maximum.accumulate(bin_max, axis=1))[:, :-1]
+                right_areas = _get_areas(
+                    np.minimum.accumulate(bin_min[:, ::-1], axis=1),
+                    np.maximum.accumulate(bin_max[:, ::-1], axis=1)
+                )[:, ::-1][:, 1:]
+                left_counts = np.cumsum(bin_counts, axis=1)[:, :-1]
+                right_counts = counts[:, None] - left_counts
+                cost = left_counts * left_areas + right_counts * right_areas
+                costs[:, axis] = np.where(
+                    (left_counts > 0) & (right_counts > 0), cost, np.inf)
+
+        best = costs.reshape(n_nodes, -1).argmin(axis=1)
+        best_costs = costs.reshape(n_nodes, -1)[np.arange(n_nodes), best]
+        axes, split_bins = np.divmod(best, bins - 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sah = self.TRAVERSAL_COST + best_costs / areas
+        use_sah = np.isfinite(best_costs) & \
+            ((sah < counts) | (counts > self.MAX_LEAF_SIZE))
+        # all centroids in one bin: halves in the current order
+        halve = ~np.isfinite(best_costs) & (counts > self.MAX_LEAF_SIZE)
+
+        right = bin_ids[np.arange(len(owners)), axes[owners]] > \
+            split_bins[owners]
+        local = np.arange(len(owners)) - starts[owners]
+        right = np.where(halve[owners], local >= counts[owners] // 2,
+                         right)
+        # stable, so the primitives stay in their node's range
+        self.order[ranges] = primitives[np.lexsort((right, owners))]
+
+        n_left = np.bincount(owners, weights=~right,
+                             minlength=n_nodes).astype(np.int64)
+        return np.where(use_sah | halve, n_left, 0)
+
+
+class TriangleBVH:
+    '''
+    BVH over the triangles of a mesh in its local space. The corners
+    are kept in leaf order, a ray query tests the triangles of all hit
+    leaves at once.
+    '''
+    def __init__(self, positions: np.ndarray, triangles: np.ndarray):
+        # positions: (n, 3), triangles: (m, 3) vertex indices
+        corners = np.asarray(positions, dtype=np.float32)[
+            np.asarray(triangles, dtype=np.int64).reshape(-1, 3)]
+        self.bvh = BVH(corners.min(axis=1), corners.max(axis=1))
+        # leaf order -> triangle index
+        self.triangles = self.bvh.order
+        self._corners = np.ascontiguousarray(corners[self.triangles])
+        # bvh.order indexes the sorted corners from now on
+        self.bvh.order = np.arange(len(self.triangles))
+
+    @classmethod
+    def from_ranges(cls, positions: np.ndarray, indices: np.ndarray,
+                    ranges: list) -> 'TriangleBVH':
+        '''
+        triangles of the (first, count) index ranges, e.g. the lod 0
+        ranges of the materials; ranges are in the vertices if indices
+        is None
+        '''
+        if indices is None:
+            indices = np.arange(len(positions))
+        triangles = [indices[first:first + count] for first, count in ranges]
+        return cls(positions, np.concatenate(triangles) if triangles
+                   else np.empty(0, dtype=np.int64))
+
+    def __len__(self) -> int:
+        return len(self.triangles)
+
+    @property
+    def nbytes(self) -> int:
+        return self.bvh.nbytes + self.triangles.nbytes + self._corners.nbytes
+
+    def intersect(self, origin, direction, max_distance=np.inf):
+        '''
+        closest hit as (triangle, distance in units of direction),
+        None if the ray misses; triangles are hit from both sides
+        '''
+        candidates, _ = self.bvh.query_ray(origin, direction, max_distance)
+        if len(candidates) == 0:
+            return None
+        corners = self._corners[candidates]
+        distances = intersect_triangles(origin, direction, corners[:, 0],
+                                        corners[:, 1], corners[:, 2])
+        best = distances.argmin()
+        # inf: the ray crosses the leaf boxes but none of the triangles
+        if not np.isfinite(distances[best]) or \
+                distances[best] > max_distance:
+            return None
+        return int(self.triangles[candidates[best]]), float(distances[best])
+
+
+def intersect_boxes(origin, direction, minimums: np.ndarray,
+                    maximums: np.ndarray) -> np.ndarray:
+    # distances where the ray enters the (n, 3) boxes, inf for misses
+    origin = np.asarray(origin, dtype=np.float32)
+    direction = np.asarray(direction, dtype=np.float32)
+    direction = np.where(np.abs(direction) < 1e-12, 1e-12, direction)
+    t1 = (minimums - origin) / direction
+    t2 = (maximums - origin) / direction
+    near = np.maximum(np.minimum(t1, t2).max(axis=1), 0)
+    far = np.maximum(t1, t2).min(axis=1)
+    return np.where(near <= far, near, np.inf)
+
+
+def intersect_triangles(origin, direction, v0: np.ndarray, v1: np.ndarray,
+                        v2: np.ndarray) -> np.ndarray:
+    '''
+    Möller–Trumbore for (n, 3) corners, distances along the ray,
+    inf for the triangles it misses
+    '''
+    origin = np.asarray(origin, dtype=np.float32)
+    direction = np.asarray(direction, dtype=np.float32)
+    edge1 = v1 - v0
+    edge2 = v2 - v0
+    p = _cross(direction, edge2)
+    determinant = (edge1 * p).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inverse = 1 / determinant
+        s = origin - v0
+        u = (s * p).sum(axis=1) * inverse
+        q = _cross(s, edge1)
+        v = (q * direction).sum(axis=1) * inverse
+        t = (q * edge2).sum(axis=1) * inverse
+        hit = (np.abs(determinant) > 1e-12) & (u >= 0) & (v >= 0) & \
+            (u + v <= 1) & (t >= 0)
+    return np.where(hit, t, np.inf)
+
+
+def _cross(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # np.cross of (n, 3) or (3,) operands without its axis handling,
+    # which dominates for the few triangles of a ray query
+    a = np.broadcast_to(a, np.broadcast_shapes(np.shape(a), np.shape(b)))
+    b = np.broadcast_to(b, a.shape)
+    result = np.empty(a.shape, dtype=np.result_type(a, b))
+    result[..., 0] = a[..., 1] * b[..., 2] - a[..., 2] * b[..., 1]
+    result[..., 1] = a[..., 2] * b[..., 0] - a[..., 0] * b[..., 2]
+    result[..., 2] = a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+    return result
@@ -0,0 +1,69 @@
+import numpy as np
+
+from OpenGL.GL import *
+
+
+class CameraBuffer:
+    '''
+    std140 uniform block shared by all programs:
+
+        layout (std140) uniform Camera
+        {
+            mat4 view;
+            mat4 projection;
+            mat4 viewProjection;
+            vec4 viewPos;
+        };
+
+    Matrices are stored like the other uniforms (row vectors, uploaded
+    without transposing), so shaders use viewProjection * model.
+    '''
+    BLOCK_NAME = 'Camera'
+    BINDING = 0
+    # 3 mat4 + vec4
+    SIZE = 3 * 64 + 16
+
+    def __init__(self):
+        self._data = np.zeros(self.SIZE // 4, dtype=np.float32)
+        self._state = None
+        self.updates = 0
+        self.view_projection = np.identity(4, dtype=np.float32)
+
+        # https://docs.gl/gl4/glBindBufferBase
+        self.buffer = glGenBuffers(1)
+        glBindBuffer(GL_UNIFORM_BUFFER, self.buffer)
+        glBufferData(GL_UNIFORM_BUFFER, self.SIZE, None, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_UNIFORM_BUFFER, 0)
+        glBindBufferBase(GL_UNIFORM_BUFFER, self.BINDING, self.buffer)
+
+    def attach(self, shader) -> None:
+        shader.bind_uniform_block(self.BLOCK_NAME, self.BINDING)
+
+    def update(self, camera, aspect_ratio: float) -> bool:
+        '''
+        uploads the camera matrices if the camera or the aspect ratio
+        changed since the last call, returns True if it did
+        '''
+        state = (camera.revision, aspect_ratio)
+        if state == self._state:
+            return False
+        self._state = state
+
+        view = camera.get_view_matrix()
+        projection = camera.get_projection(aspect_ratio)
+        self._data[0:16] = view.reshape(-1)
+        self._data[16:32] = projection.reshape(-1)
+        self.view_projection = view @ projection
+        self._data[32:48] = self.view_projection.reshape(-1)
+        self._data[48:51] = camera.pos
+        self._data[51] = 1
+
+        # https://docs.gl/gl4/glBufferSubData
+        glBindBuffer(GL_UNIFORM_BUFFER, self.buffer)
+        glBufferSubData(GL_UNIFORM_BUFFER, 0, self._data)
+        glBindBuffer(GL_UNIFORM_BUFFER, 0)
+        self.updates += 1
+        return True
+
+    def invalidate(self) -> None:
+        self._state = None
@@ -0,0 +1,99 @@
+import numpy as np
+
+
+def get_frustum_planes(view_projection: np.ndarray) -> np.ndarray:
+    '''
+    (6, 4) normalized planes (nx, ny, nz, d) of the frustum, a point p
+    is inside when p @ n + d >= 0 for all of them.
+    view_projection is view @ projection for row vectors, so the clip
+    coordinates are the columns (Gribb-Hartmann)
+    '''
+    m = np.asarray(view_projection, dtype=np.float64)
+    w = m[:, 3]
+    planes = np.array([w + m[:, 0], w - m[:, 0],
+                       w + m[:, 1], w - m[:, 1],
+                       w + m[:, 2], w - m[:, 2]])
+    return planes / np.linalg.norm(planes[:, :3], axis=1)[:, None]
+
+
+class FrustumCuller:
+    '''
+    Tests the bounds of every mesh of the given objects against the
+    frustum at once, meshes without bounds are always visible
+    '''
+    def __init__(self):
+        self.drawn = 0
+        self.culled = 0
+        self.culled_subtrees = 0
+
+    def collect(self, roots: list, view_projection: np.ndarray) -> list:
+        '''
+        SceneNodes of the trees below roots, parents first; subtrees
+        whose cached world bounds are outside of the frustum are skipped
+        '''
+        planes = get_frustum_planes(view_projection)
+        abs_normals = np.abs(planes[:, :3])
+        self.culled_subtrees = 0
+        nodes = []
+        stack = list(reversed(roots))
+        while stack:
+            node = stack.pop()
+            if node.children:
+                bounds = node.world_bounds
+                if bounds is not None and \
+                        (bounds.center @ planes[:, :3].T + planes[:, 3] +
+                         abs_normals @ bounds.extent < 0).any():
+                    self.culled_subtrees += 1
+                    continue
+                stack += reversed(node.children)
+            nodes.append(node)
+        return nodes
+
+    def cull(self, objects: list, view_projection: np.ndarray) -> list:
+        # returns [(object, visible meshes), ...] in the order of objects
+        planes = get_frustum_planes(view_projection)
+
+        owners, centers, extents, radii, transforms = [], [], [], [], []
+        for i, obj in enumerate(objects):
+            for mesh in obj.meshes:
+                if mesh.bounds is None:
+                    continue
+                owners.append(i)
+                centers.append(mesh.bounds.center)
+                extents.append(mesh.bounds.extent)
+                radii.append(mesh.bounds.radius)
+                transforms.append(obj.transform)
+
+        visible = np.ones(0, dtype=bool)
+        if owners:
+            visible = self._get_visible(planes, np.array(centers),
+                                        np.array(extents), np.array(radii),
+                                        np.array(transforms))
+
+        result = [(obj, []) for obj in objects]
+        bounded = iter(visible)
+        self.drawn = self.culled = 0
+        for obj, meshes in result:
+            for mesh in obj.meshes:
+                if mesh.bounds is None or next(bounded):
+                    meshes.append(mesh)
+                    self.drawn += 1
+                else:
+                    self.culled += 1
+        return result
+
+    @staticmethod
+    def _get_visible(planes, centers, extents, radii, transforms):
+        # row vectors: world = local @ rotation_scale + translation
+        rotation_scale = transforms[:, :3, :3]
+        world_centers = np.einsum('ni,nij->nj', centers, rotation_scale) + \
+            transforms[:, 3, :3]
+        world_extents = np.einsum('ni,nij->nj', extents,
+                                  np.abs(rotation_scale))
+        world_radii = radii * np.linalg.norm(rotation_scale, axis=2).max(1)
+
+        distances = world_centers @ planes[:, :3].T + planes[:, 3]
+        in_spheres = (distances >= -world_radii[:, None]).all(axis=1)
+        in_boxes = (distances + world_extents @ np.abs(planes[:, :3]).T
+                    >= 0).all(axis=1)
+        return in_spheres & in_boxes
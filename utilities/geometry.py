@@ -0,0 +1,92 @@
+import numpy as np
+
+# vertex layouts as structured dtypes, the field order is the order of
+# the attribute locations in the shaders
+LAYOUTS = {
+    'T2F_N3F_V3F': np.dtype([('uv', np.float32, 2),
+                             ('normal', np.float32, 3),
+                             ('position', np.float32, 3)]),
+    'C3F_N3F_V3F': np.dtype([('color', np.float32, 3),
+                             ('normal', np.float32, 3),
+                             ('position', np.float32, 3)]),
+    'V3F_C3F': np.dtype([('position', np.float32, 3),
+                         ('color', np.float32, 3)]),
+    'V3F': np.dtype([('position', np.float32, 3)]),
+}
+
+
+def get_layout(name: str) -> np.dtype:
+    layout = LAYOUTS.get(name)
+    if layout is None:
+        raise ValueError(f'Unknown vertex layout: {name}')
+    return layout
+
+
+class Geometry:
+    '''
+    Vertices as a structured array of one of LAYOUTS and optional
+    indices (uint16 or uint32 triangle or line list). The vertex array
+    is laid out exactly like the vertex buffer, so it is uploaded and
+    stored as is and fields like 'position' are strided views.
+    '''
+    def __init__(self, layout: str, vertices: np.ndarray,
+                 indices: np.ndarray = None):
+        self.layout = layout
+        self.vertices = vertices
+        self.indices = indices
+
+    def __len__(self) -> int:
+        return len(self.vertices)
+
+    @classmethod
+    def empty(cls, layout: str, count: int, indices=None) -> 'Geometry':
+        return cls(layout, np.zeros(count, dtype=get_layout(layout)),
+                   indices)
+
+    @classmethod
+    def from_floats(cls, layout: str, floats: np.ndarray,
+                    indices=None) -> 'Geometry':
+        '''
+        floats: float32 (n, floats per vertex) or flat, e.g. a mapped
+        cache file; viewed without copying when contiguous
+        '''
+        dtype = get_layout(layout)
+        floats = np.ascontiguousarray(floats, dtype=np.float32)
+        if floats.size == 0:
+            return cls.empty(layout, 0, indices)
+        return cls(layout, floats.reshape(-1).view(dtype), indices)
+
+    @classmethod
+    def concatenate(cls, geometries: list) -> 'Geometry':
+        # indices are offset by the vertices before them
+        layout = geometries[0].layout
+        vertices = np.concatenate([g.vertices for g in geometries])
+        if all(g.indices is None for g in geometries):
+            return cls(layout, vertices)
+
+        index_type = np.uint16 if len(vertices) <= 0xFFFF else np.uint32
+        offsets = np.cumsum([0] + [len(g) for g in geometries[:-1]])
+        indices = [(g.indices if g.indices is not None
+                    else np.arange(len(g))) + offset
+                   for g, offset in zip(geometries, offsets)]
+        return cls(layout, vertices,
+                   np.concatenate(indices).astype(index_type))
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.vertices.dtype
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self.vertices['position']
+
+    @property
+    def floats(self) -> np.ndarray:
+        # (n, floats per vertex) float32 view of the vertices
+        return self.vertices.view(np.float32).reshape(
+            len(self.vertices), -1)
+
+    @property
+    def nbytes(self) -> int:
+        return self.vertices.nbytes + \
+            (self.indices.nbytes if self.indices is not None else 0)
@@ -0,0 +1,37 @@
+class GeometryRegistry:
+    '''
+    Process-wide table of meshes shared between objects, keyed by
+    whatever describes the geometry (e.g. tessellation parameters and
+    vertex layout, or a model file). Entries are a mesh or a list of
+    meshes, released when the last user is gone.
+    '''
+    def __init__(self):
+        # key -> [mesh, reference count]
+        self._entries = {}
+        self.uploads = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def acquire(self, key, create):
+        # create() -> Mesh or [Mesh, ...], called only on the first acquire
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = [create(), 0]
+            self.uploads += 1
+        entry[1] += 1
+        return entry[0]
+
+    def release(self, key) -> None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self._entries[key]
+            meshes = entry[0] if isinstance(entry[0], list) else [entry[0]]
+            for mesh in meshes:
+                mesh.release()
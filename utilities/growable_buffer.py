@@ -0,0 +1,75 @@
+import numpy as np
+
+from OpenGL.GL import *
+
+
+class GrowableBuffer:
+    '''
+    Append-only array of fixed-width rows mirrored in an OpenGL buffer.
+    Capacity doubles when full, so appends are amortized O(1) and only
+    the rows added since the last sync are sent to the GPU.
+    '''
+    def __init__(self, target, dtype, width: int, capacity=64):
+        # target: GL_ARRAY_BUFFER or GL_ELEMENT_ARRAY_BUFFER
+        self.target = target
+        self.data = np.empty((capacity, width), dtype=dtype)
+        self.size = 0
+        # https://docs.gl/gl4/glGenBuffers
+        self.buffer = glGenBuffers(1)
+        self._gpu_capacity = 0
+        self._synced = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def capacity(self) -> int:
+        return len(self.data)
+
+    @property
+    def row_nbytes(self) -> int:
+        return self.data.itemsize * self.data.shape[1]
+
+    def view(self) -> np.ndarray:
+        return self.data[:self.size]
+
+    def append(self, rows) -> None:
+        rows = np.asarray(rows, dtype=self.data.dtype).reshape(
+            -1, self.data.shape[1])
+        end = self.size + len(rows)
+        if end > self.capacity:
+            self._grow(end)
+        self.data[self.size:end] = rows
+        self.size = end
+
+    def clear(self) -> None:
+        # keeps the capacity, the next sync uploads all rows again
+        self.size = 0
+        self._synced = 0
+
+    def sync(self) -> None:
+        '''
+        uploads pending rows, the buffer is left bound to its target;
+        element buffers have to be synced with their VAO bound
+        '''
+        glBindBuffer(self.target, self.buffer)
+        if self._gpu_capacity < self.capacity:
+            # https://docs.gl/gl4/glBufferData
+            glBufferData(self.target, self.capacity * self.row_nbytes,
+                         None, GL_DYNAMIC_DRAW)
+            self._gpu_capacity = self.capacity
+            self._synced = 0
+
+        if self._synced < self.size:
+            # https://docs.gl/gl4/glBufferSubData
+            glBufferSubData(self.target, self._synced * self.row_nbytes,
+                            self.data[self._synced:self.size])
+            self._synced = self.size
+
+    def _grow(self, min_capacity: int) -> None:
+        capacity = max(self.capacity, 1)
+        while capacity < min_capacity:
+            capacity *= 2
+        data = np.empty((capacity, self.data.shape[1]), dtype=self.data.dtype)
+        data[:self.size] = self.data[:self.size]
+        self.data = data
@@ -0,0 +1,35 @@
+import math
+import numpy as np
+
+# projected radius / half of the screen height below which the next
+# coarser level is used
+LOD_SCREEN_SIZES = (0.25, 0.1, 0.04)
+
+
+def get_screen_size(center: np.ndarray, radius: float, camera) -> float:
+    '''
+    fraction of the half screen height covered by a bounding sphere
+    seen from the camera
+    '''
+    distance = float(np.linalg.norm(center - camera.pos))
+    if distance <= radius:
+        return math.inf
+    return radius / (distance * math.tan(math.radians(camera.fov) / 2))
+
+
+def select_lod(current: int, screen_size: float, lod_count: int,
+               thresholds=LOD_SCREEN_SIZES, hysteresis=0.15) -> int:
+    '''
+    moves from the current level only once the size is past the
+    threshold by the hysteresis fraction, so objects near a threshold
+    don't switch levels every frame
+    '''
+    last = min(lod_count - 1, len(thresholds))
+    current = min(current, last)
+    while current < last and \
+            screen_size < thresholds[current] * (1 - hysteresis):
+        current += 1
+    while current > 0 and \
+            screen_size > thresholds[current - 1] * (1 + hysteresis):
+        current -= 1
+    return current
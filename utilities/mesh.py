@@ -1,17 +1,41 @@
-import pygame
+import time
+from functools import partial
 from utilities.shader import *
+from utilities.render_queue import DrawItem, RenderQueue
+from utilities.bounds import Bounds
+from utilities.texture_decoder import TextureDecoder, TextureData
+from utilities.texture_registry import TextureRegistry
+from utilities.growable_buffer import GrowableBuffer
+from utilities.geometry import Geometry
+from utilities.bvh import TriangleBVH
 
 
 class Texture:
-    def __init__(self, id_: int, texture_name: str, should_flip=False):
-        self.id = id_
+    registry = TextureRegistry()
+    decoder = TextureDecoder()
+
+    def __init__(self, texture_name: str, should_flip=False,
+                 texture_data: TextureData = None):
+        # texture_data: image decoded beforehand by Texture.decoder
         self.name = texture_name
+        self.should_flip = should_flip
         self.texture = None
         if texture_name != '' and texture_name is not None:
-            self.texture = self._load_texture(should_flip)
+            self.texture = self.registry.acquire(
+                texture_name, should_flip,
+                lambda: self._load_texture(should_flip, texture_data))
+
+    def release(self) -> None:
+        if self.texture is None:
+            return
+        self.registry.release(self.name, self.should_flip)
+        self.texture = None
 
-    def _load_texture(self, should_flip):
-        image, width, height = self._get_texture_data(self.name, should_flip)
+    def _load_texture(self, should_flip, texture_data: TextureData = None):
+        if texture_data is None:
+            texture_data = self.decoder.decode(self.name, should_flip)
+        start = time.perf_counter()
+        image_format = GL_RGBA if texture_data.channels == 4 else GL_RGB
         texture = glGenTextures(1)
 
         glBindTexture(GL_TEXTURE_2D, texture)
@@ -23,248 +47,397 @@ class Texture:
                         GL_LINEAR_MIPMAP_LINEAR)
         glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
 
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, width, height, 0, GL_RGB,
-                     GL_UNSIGNED_BYTE, image)
+        # rows of tightly packed RGB data are not 4-byte aligned
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        glTexImage2D(GL_TEXTURE_2D, 0, image_format,
+                     texture_data.width, texture_data.height, 0,
+                     image_format, GL_UNSIGNED_BYTE, texture_data.pixels)
 
         glGenerateMipmap(GL_TEXTURE_2D)
         glBindTexture(GL_TEXTURE_2D, 0)
 
+        self.decoder.record_upload(self.name, time.perf_counter() - start)
         return texture
 
-    @staticmethod
-    def _get_texture_data(path: str, should_flip=False):
-        texture_surface = pygame.image.load(path)
-        texture_data = pygame.image.tostring(texture_surface, "RGB",
-                                             should_flip)
-        return (texture_data,
-                texture_surface.get_width(),
-                texture_surface.get_height()
-                )
-
     def activate(self, shader: Shader, texture_var_name: str):
         if self.name == '' or self.texture is None:
             return
-        glActiveTexture(GL_TEXTURE0 + self.id)
+        glActiveTexture(GL_TEXTURE0 +
+                        shader.get_texture_unit(texture_var_name))
         glBindTexture(GL_TEXTURE_2D, self.texture)
-        glUniform1i(glGetUniformLocation(shader.program, texture_var_name),
-                    self.id)
 
 
 class Material:
-    def __init__(self, vertices: list,
-                 model_idx: int, texture_name='', flip_texture=False,
-                 texture=None):
-
-        self.vertices = vertices
+    def __init__(self, model_idx: int, texture_name='', flip_texture=False,
+                 texture=None, index_range=None, texture_data=None,
+                 lods=None):
+        # index_range: (first, count) in the mesh indices, or in the
+        # vertices for meshes without indices
+        # lods: [(first, count), ...] of the simplified levels after it
+        # texture: shared Texture, owned and released by the caller
+        self.index_range = index_range
+        self.lods = lods or []
         self.model_idx = model_idx
-        if texture is not None and texture.__class__ is Texture:
+        self._owns_texture = not isinstance(texture, Texture)
+        if not self._owns_texture:
             self.texture = texture
         else:
-            self.texture = Texture(model_idx, texture_name, flip_texture)
+            self.texture = Texture(texture_name, flip_texture, texture_data)
+
+    def get_index_range(self, lod=0) -> tuple:
+        # the coarsest level available is used for higher lod
+        if lod == 0 or not self.lods:
+            return self.index_range
+        return self.lods[min(lod, len(self.lods)) - 1]
 
     def activate_texture(self, shader: Shader, texture_var_name='mainTexture'):
         self.texture.activate(shader, texture_var_name)
 
+    def release(self) -> None:
+        if self._owns_texture:
+            self.texture.release()
+
 
 class Mesh:
-    def __init__(self, materials: list, indices: np.ndarray):
-        self.indices = indices
+    # vertex layout of the geometry, see utilities.geometry.LAYOUTS
+    LAYOUT = 'T2F_N3F_V3F'
+    PRIMITIVE = GL_TRIANGLES
+    # meshes edited after the upload keep their geometry in host memory,
+    # the others read it back from the GPU when needed
+    KEEP_HOST_COPY = False
+    # hit by ray queries, see get_bvh
+    PICKABLE = True
+
+    def __init__(self, materials: list, geometry: Geometry,
+                 bvh: TriangleBVH = None):
+        # bvh: of the lod 0 triangles if built beforehand, e.g. on import
+        if geometry.layout != self.LAYOUT:
+            raise ValueError(f'{type(self).__name__} takes {self.LAYOUT} '
+                             f'geometry, not {geometry.layout}')
+        self.geometry = geometry
         self.VAO = self.VBO = self.EBO = None
         self.materials = materials
+        self._dtype = geometry.dtype
+        self._index_dtype = None
+        self._index_type = None
+        if geometry.indices is not None:
+            self._index_dtype = geometry.indices.dtype
+            self._index_type = {np.dtype(np.uint16): GL_UNSIGNED_SHORT,
+                                np.dtype(np.uint32): GL_UNSIGNED_INT
+                                }.get(self._index_dtype)
+        # local space Bounds of the vertices, None while there are none
+        self.bounds = None
+        # lod -> cached draw table, see _build_draw_table
+        self._draw_tables = {}
+        # host memory of the geometry given to the mesh
+        self.uploaded_nbytes = geometry.nbytes
+
         self._init_buffers()
+        self._upload()
+        self._bvh = bvh
+        if not self.KEEP_HOST_COPY:
+            self.geometry = None
 
     def _init_buffers(self):
-        '''
-        vertices: format 'T2F_N3F_V3F'
-        '''
         # https://docs.gl/gl4/glGenVertexArrays
         self.VAO = glGenVertexArrays(1)
         # https://docs.gl/gl4/glGenBuffers
         self.VBO = glGenBuffers(1)
-        self.EBO = glGenBuffers(1)
-
-        vertices = self._get_all_vertices()
+        if self._index_type is not None:
+            self.EBO = glGenBuffers(1)
 
         # https://docs.gl/gl3/glBindVertexArray
         glBindVertexArray(self.VAO)
         glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
-
-        glBufferData(GL_ARRAY_BUFFER, vertices, GL_STATIC_DRAW)
-
-        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.EBO)
-        glBufferData(GL_ELEMENT_ARRAY_BUFFER, self.indices, GL_STATIC_DRAW)
-
-        glVertexAttribPointer(0, 2, GL_FLOAT, GL_FALSE, 8 * vertices.itemsize,
-                              ctypes.c_void_p(0))
-
-        glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, 8 * vertices.itemsize,
-                              ctypes.c_void_p(2 * vertices.itemsize))
-
-        glVertexAttribPointer(2, 3, GL_FLOAT, GL_FALSE, 8 * vertices.itemsize,
-                              ctypes.c_void_p(5 * vertices.itemsize))
-
-        # https://docs.gl/gl4/glEnableVertexAttribArray
-        glEnableVertexAttribArray(0)
-        glEnableVertexAttribArray(1)
-        glEnableVertexAttribArray(2)
-
+        self._set_attribute_pointers(self._dtype)
+        if self.EBO is not None:
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.EBO)
         glBindVertexArray(0)
 
-    def _get_all_vertices(self) -> np.ndarray:
-        vertices = []
-        for material in self.materials:
-            vertices += material.vertices
-
-        return np.array(vertices, dtype=np.float32)
-
-    def draw(self, shader: Shader):
-        shader.use()
-
+    @staticmethod
+    def _set_attribute_pointers(dtype: np.dtype) -> None:
+        # one attribute per field of the layout, in field order
+        for location, name in enumerate(dtype.names):
+            field, offset = dtype.fields[name][:2]
+            # https://docs.gl/gl4/glVertexAttribPointer
+            glVertexAttribPointer(location, field.shape[0], GL_FLOAT,
+                                  GL_FALSE, dtype.itemsize,
+                                  ctypes.c_void_p(offset))
+            # https://docs.gl/gl4/glEnableVertexAttribArray
+            glEnableVertexAttribArray(location)
+
+    def _upload(self) -> None:
+        geometry = self.geometry
         glBindVertexArray(self.VAO)
-
-        current_idx = 0
-
-        for material in self.materials:
-            material.activate_texture(shader)
-            step = len(material.vertices) // 8
-            glDrawArrays(GL_TRIANGLES,
-                         current_idx,
-                         current_idx + step)
-            current_idx += step
-
-        glBindTexture(GL_TEXTURE_2D, 0)
+        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+        # the float view has the same bytes, PyOpenGL has no GL type for
+        # structured arrays
+        glBufferData(GL_ARRAY_BUFFER, geometry.floats, GL_STATIC_DRAW)
+        if self.EBO is not None:
+            glBufferData(GL_ELEMENT_ARRAY_BUFFER, geometry.indices,
+                         GL_STATIC_DRAW)
         glBindVertexArray(0)
 
+        self._draw_tables = {}
+        self._bvh = None
+        self.gpu_nbytes = self._get_gpu_nbytes()
+        self.bounds = Bounds.from_points(geometry.positions)
+
+    def release(self) -> None:
+        # https://docs.gl/gl4/glDeleteBuffers
+        buffers = [b for b in (self.VBO, self.EBO) if b is not None]
+        if buffers:
+            glDeleteBuffers(len(buffers), buffers)
+        if self.VAO is not None:
+            glDeleteVertexArrays(1, [self.VAO])
+        self.VAO = self.VBO = self.EBO = None
+        for material in self.materials:
+            material.release()
 
-class MeshCustomObject(Mesh):
-    def __init__(self, material):
-        super(MeshCustomObject, self).__init__([material], np.array([]))
-
-    def _init_buffers(self):
-        self.VAO = glGenVertexArrays(1)
-        self.VBO = glGenBuffers(1)
-        self.EBO = glGenBuffers(1)
-
-    def update_buffers(self):
-        # vertices: format 'C3F_N3F_V3F'
-
-        vertices = self._get_all_vertices()
+    @property
+    def host_nbytes(self) -> int:
+        # memory taken by the host copy of the geometry and the BVH
+        nbytes = self.geometry.nbytes if self.geometry is not None else 0
+        return nbytes + (self._bvh.nbytes if self._bvh is not None else 0)
 
-        glBindVertexArray(self.VAO)
-        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+    def get_bvh(self) -> TriangleBVH:
+        '''
+        BVH of the lod 0 triangles in local space, built from the geometry
+        on first use if it wasn't given; None for meshes that aren't picked
+        '''
+        if self._bvh is None and self.PICKABLE:
+            geometry = self.get_geometry()
+            self._bvh = TriangleBVH.from_ranges(
+                geometry.positions, geometry.indices,
+                [m.index_range for m in self.materials])
+        return self._bvh
+
+    def get_geometry(self) -> Geometry:
+        # read back from the GPU if there's no host copy
+        if self.geometry is not None:
+            return self.geometry
+        vertices = self._read_buffer(self.VBO, self._vertex_nbytes).view(
+            self._dtype)
+        indices = None
+        if self._index_type is not None:
+            indices = self._read_buffer(self.EBO, self._index_nbytes).view(
+                self._index_dtype)
+        return Geometry(self.LAYOUT, vertices, indices)
+
+    def _get_gpu_nbytes(self) -> int:
+        # sizes of the buffers, kept for reading them back
+        self._vertex_nbytes = self.geometry.vertices.nbytes
+        self._index_nbytes = self.geometry.indices.nbytes \
+            if self._index_type is not None else 0
+        return self._vertex_nbytes + self._index_nbytes
 
-        glBufferData(GL_ARRAY_BUFFER, vertices, GL_STATIC_DRAW)
+    @staticmethod
+    def _read_buffer(buffer, nbytes: int) -> np.ndarray:
+        data = np.empty(nbytes, dtype=np.uint8)
+        if nbytes == 0 or buffer is None:
+            return data
+        # the copy target doesn't change any VAO state
+        # https://docs.gl/gl4/glGetBufferSubData
+        glBindBuffer(GL_COPY_READ_BUFFER, buffer)
+        glGetBufferSubData(GL_COPY_READ_BUFFER, 0, nbytes, data)
+        glBindBuffer(GL_COPY_READ_BUFFER, 0)
+        return data
+
+    @property
+    def lod_count(self) -> int:
+        return 1 + max((len(m.lods) for m in self.materials), default=0)
+
+    def submit(self, queue: RenderQueue, shader: Shader, wireframe=False,
+               uniforms=None, texture: Texture = None, transform=None,
+               lod=0) -> None:
+        # texture: used instead of the textures of the materials
+        # transform: model matrix, items of the same mesh, texture group
+        # and lod can be drawn instanced if they don't have other uniforms
+        table = self._draw_tables.get(lod)
+        if table is None:
+            table = self._draw_tables[lod] = self._build_draw_table(lod)
+
+        for i, (group_texture, draw, draw_instanced) in enumerate(table):
+            textures = self._get_textures(texture or group_texture)
+            batch_key = None
+            if draw_instanced is not None:
+                batch_key = (id(self), lod, i)
+            queue.add(DrawItem(shader, self.VAO, draw, textures, wireframe,
+                               uniforms, transform, batch_key,
+                               draw_instanced))
+
+    def _get_textures(self, texture: Texture) -> tuple:
+        return ('mainTexture', texture.texture or 0),
+
+    def _build_draw_table(self, lod: int) -> list:
+        '''
+        [(texture, draw(), draw_instanced(count) or None), ...] with one
+        entry per distinct texture, drawing all of its materials at once
+        '''
+        ranges = self._get_draw_ranges(lod)
+        handles = np.array([m.texture.texture or 0 for m in self.materials])
+        _, first_material, groups = np.unique(handles, return_index=True,
+                                              return_inverse=True)
+        groups = groups.reshape(-1)
+
+        table = []
+        for group in np.argsort(first_material):
+            group_ranges = ranges[(groups == group) & (ranges[:, 1] > 0)]
+            if len(group_ranges) == 0:
+                continue
+            texture = self.materials[first_material[group]].texture
+            table.append((texture,) + self._get_range_draws(group_ranges))
+        return table
+
+    def _get_draw_ranges(self, lod: int) -> np.ndarray:
+        # (materials, 2) array of (first, count) in indices or vertices
+        return np.array([m.get_index_range(lod) for m in self.materials],
+                        dtype=np.int64).reshape(-1, 2)
+
+    def _get_range_draws(self, ranges: np.ndarray) -> tuple:
+        firsts = ranges[:, 0]
+        counts = ranges[:, 1].astype(np.int32)
+        if self._index_type is None:
+            # https://docs.gl/gl4/glMultiDrawArrays
+            if len(ranges) == 1:
+                return partial(glDrawArrays, self.PRIMITIVE, int(firsts[0]),
+                               int(counts[0])), None
+            return partial(glMultiDrawArrays, self.PRIMITIVE,
+                           firsts.astype(np.int32), counts,
+                           len(ranges)), None
+
+        offsets = (firsts * self._index_dtype.itemsize).tolist()
+        draw_instanced = partial(self._draw_elements_instanced,
+                                 counts.tolist(), offsets)
+        # https://docs.gl/gl4/glMultiDrawElements
+        if len(ranges) == 1:
+            return partial(glDrawElements, self.PRIMITIVE, int(counts[0]),
+                           self._index_type,
+                           ctypes.c_void_p(offsets[0])), draw_instanced
+        return partial(glMultiDrawElements, self.PRIMITIVE, counts,
+                       self._index_type,
+                       (ctypes.c_void_p * len(offsets))(*offsets),
+                       len(offsets)), draw_instanced
+
+    def _draw_elements_instanced(self, counts: list, offsets: list,
+                                 instance_count: int) -> None:
+        # GL 3.3 has no instanced multi-draw, one call per range
+        # https://docs.gl/gl4/glDrawElementsInstanced
+        for count, offset in zip(counts, offsets):
+            glDrawElementsInstanced(self.PRIMITIVE, count, self._index_type,
+                                    ctypes.c_void_p(offset), instance_count)
 
-        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 9 * vertices.itemsize,
-                              ctypes.c_void_p(0))
 
-        glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, 9 * vertices.itemsize,
-                              ctypes.c_void_p(3 * vertices.itemsize))
+class MeshCustomObject(Mesh):
+    LAYOUT = 'C3F_N3F_V3F'
+    KEEP_HOST_COPY = True
 
-        glVertexAttribPointer(2, 3, GL_FLOAT, GL_FALSE, 9 * vertices.itemsize,
-                              ctypes.c_void_p(6 * vertices.itemsize))
+    def __init__(self, material: Material, geometry: Geometry):
+        super(MeshCustomObject, self).__init__([material], geometry)
 
-        glEnableVertexAttribArray(0)
-        glEnableVertexAttribArray(1)
-        glEnableVertexAttribArray(2)
+    def _get_textures(self, texture: Texture) -> tuple:
+        return ()
 
-        glBindVertexArray(0)
+    def update_buffers(self):
+        # uploads the host copy again after it was edited
+        self._upload()
 
 
-class MeshLine(Mesh):
-    def __init__(self, materials: list):
-        super().__init__(materials, np.ndarray([]))
+class MeshGrowingObject(MeshCustomObject):
+    '''
+    Custom object mesh built vertex by vertex, every new vertex forms
+    a triangle with the two previous ones (like a triangle strip)
+    '''
+    def __init__(self, material: Material):
+        super().__init__(material, Geometry.empty(
+            self.LAYOUT, 0, np.empty(0, dtype=np.uint32)))
+        # the stores are the host copy, see get_geometry
+        self.geometry = None
 
     def _init_buffers(self):
-        '''
-        vertices: format 'V3F_C3F'
-        '''
-        # https://docs.gl/gl4/glGenVertexArrays
+        # float rows with the bytes of the layout's vertices
         self.VAO = glGenVertexArrays(1)
-        # https://docs.gl/gl4/glGenBuffers
-        self.VBO = glGenBuffers(1)
-
-        vertices = self._get_all_vertices()
-
-        # https://docs.gl/gl3/glBindVertexArray
+        self._vertex_store = GrowableBuffer(GL_ARRAY_BUFFER, np.float32,
+                                            self._dtype.itemsize // 4)
+        self._index_store = GrowableBuffer(GL_ELEMENT_ARRAY_BUFFER,
+                                           np.uint32, 3)
+        self.VBO = self._vertex_store.buffer
+        self.EBO = self._index_store.buffer
+
+        # the attribute pointers reference the buffer object, so they
+        # stay valid when the buffer storage is reallocated
         glBindVertexArray(self.VAO)
         glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
-
-        glBufferData(GL_ARRAY_BUFFER, vertices, GL_STATIC_DRAW)
-
-        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 6 * vertices.itemsize,
-                              ctypes.c_void_p(0))
-
-        glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, 6 * vertices.itemsize,
-                              ctypes.c_void_p(3 * vertices.itemsize))
-
-        # https://docs.gl/gl4/glEnableVertexAttribArray
-        glEnableVertexAttribArray(0)
-        glEnableVertexAttribArray(1)
-
-        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self._set_attribute_pointers(self._dtype)
         glBindVertexArray(0)
 
-    def draw(self, shader: Shader):
-        shader.use()
+    @property
+    def n_vertices(self) -> int:
+        return len(self._vertex_store)
+
+    def get_geometry(self) -> Geometry:
+        # views into the stores, valid until the next add_vertices
+        return Geometry.from_floats(self.LAYOUT, self._vertex_store.view(),
+                                    self._index_store.view().reshape(-1))
+
+    def add_vertices(self, geometry: Geometry) -> None:
+        # appends the vertices, each forming a triangle with the two
+        # before it
+        if geometry.layout != self.LAYOUT:
+            raise ValueError(f'Expected {self.LAYOUT} geometry, '
+                             f'not {geometry.layout}')
+        if len(geometry) == 0:
+            return
+        first = self.n_vertices
+        self._vertex_store.append(geometry.floats)
+        if self.bounds is None:
+            self.bounds = Bounds.from_points(geometry.positions)
+        else:
+            self.bounds.extend(geometry.positions)
+        last = np.arange(max(first, 2), self.n_vertices)
+        self._index_store.append(np.stack([last - 2, last - 1, last],
+                                          axis=1))
+
+    @property
+    def host_nbytes(self) -> int:
+        # the stores are the host copy, get_geometry views them
+        return self._vertex_store.data.nbytes + \
+            self._index_store.data.nbytes + \
+            (self._bvh.nbytes if self._bvh is not None else 0)
+
+    def _upload(self) -> None:
         glBindVertexArray(self.VAO)
-
-        glDrawArrays(GL_LINES, 0, 2)
-        '''
-        current_idx = 0
-
-        for material in self.materials:
-            step = len(material.vertices) // 6
-            glDrawArrays(GL_LINES,
-                         current_idx,
-                         current_idx + step)
-            current_idx += step
-        '''
-
+        self._vertex_store.sync()
+        self._index_store.sync()
         glBindVertexArray(0)
 
+        self.materials[0].index_range = (0, len(self._index_store) * 3)
+        self._draw_tables = {}
+        self._bvh = None
+        self.gpu_nbytes = self._get_gpu_nbytes()
 
-class MeshLightObject(Mesh):
-    def __init__(self, materials: list, indices: np.ndarray):
-        super().__init__(materials, indices)
-
-    def _init_buffers(self):
-        self.VAO = glGenVertexArrays(1)
-        self.VBO = glGenBuffers(1)
-        self.EBO = glGenBuffers(1)
+    def _get_gpu_nbytes(self) -> int:
+        return (self._vertex_store.capacity * self._vertex_store.row_nbytes +
+                self._index_store.capacity * self._index_store.row_nbytes)
 
-        vertices = self._get_all_vertices()
 
-        # https://docs.gl/gl3/glBindVertexArray
-        glBindVertexArray(self.VAO)
-        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
-
-        glBufferData(GL_ARRAY_BUFFER, vertices, GL_STATIC_DRAW)
-
-        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.EBO)
-        glBufferData(GL_ELEMENT_ARRAY_BUFFER, self.indices, GL_STATIC_DRAW)
-
-        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 3 * vertices.itemsize,
-                              ctypes.c_void_p(0))
+class MeshLine(Mesh):
+    LAYOUT = 'V3F_C3F'
+    PRIMITIVE = GL_LINES
+    PICKABLE = False
 
-        glEnableVertexAttribArray(0)
+    def __init__(self, materials: list, geometry: Geometry):
+        super().__init__(materials, geometry)
 
-        glBindVertexArray(0)
+    def _get_textures(self, texture: Texture) -> tuple:
+        return ()
 
-    def draw(self, shader: Shader):
-        shader.use()
 
-        glBindVertexArray(self.VAO)
-
-        current_idx = 0
+class MeshLightObject(Mesh):
+    LAYOUT = 'V3F'
 
-        for material in self.materials:
-            material.activate_texture(shader)
-            step = len(material.vertices) // 3
-            glDrawArrays(GL_TRIANGLES,
-                         current_idx,
-                         current_idx + step)
-            current_idx += step
+    def __init__(self, materials: list, geometry: Geometry):
+        super().__init__(materials, geometry)
 
-        glBindTexture(GL_TEXTURE_2D, 0)
-        glBindVertexArray(0)
+    def _get_textures(self, texture: Texture) -> tuple:
+        return ()
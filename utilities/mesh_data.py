@@ -0,0 +1,158 @@
+import numpy as np
+
+from utilities.bvh import TriangleBVH
+
+# odd 64-bit multipliers for hashing the 8 float words of a vertex
+_HASH_MULTIPLIERS = np.array([
+    0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9,
+    0xD6E8FEB86659FD93, 0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53,
+    0x94D049BB133111EB, 0xBF58476D1CE4E5B9], dtype=np.uint64)
+
+
+# cells along the longest side of the mesh for every generated LOD
+LOD_CELLS = (48, 20, 8)
+
+
+class MaterialData:
+    def __init__(self, name: str, texture: str, first: int, count: int,
+                 lods: list = None):
+        # texture: file name relative to the model directory, '' if none
+        # first, count: range in MeshData.indices, or in MeshData.vertices
+        # while the mesh is not welded
+        # lods: [(first, count), ...] ranges of the simplified levels
+        self.name = name
+        self.texture = texture
+        self.first = first
+        self.count = count
+        self.lods = lods or []
+
+
+class MeshData:
+    def __init__(self, vertices: np.ndarray, materials: list,
+                 indices: np.ndarray = None):
+        '''
+        vertices: float32 array (n, 8), format 'T2F_N3F_V3F'
+        indices: uint16 or uint32 triangle list, None for expanded vertices
+        '''
+        self.vertices = vertices
+        self.materials = materials
+        self.indices = indices
+        # TriangleBVH for picking, built by build_bvh, not cached
+        self.bvh = None
+
+    def weld(self) -> 'MeshData':
+        '''
+        Merges identical (uv, normal, position) vertices and returns
+        an indexed copy of the mesh. Material ranges stay the same,
+        they just refer to indices afterwards.
+        '''
+        if self.indices is not None:
+            return self
+
+        # + 0.0 turns -0.0 into 0.0, so both get the same bytes
+        vertices = np.ascontiguousarray(self.vertices + np.float32(0.0),
+                                        dtype=np.float32)
+        hashes = (vertices.view(np.uint32).astype(np.uint64) *
+                  _HASH_MULTIPLIERS).sum(axis=1)
+        _, first, inverse = np.unique(hashes, return_index=True,
+                                      return_inverse=True)
+        inverse = inverse.reshape(-1)
+        if not np.array_equal(vertices[first][inverse], vertices):
+            # hash collision, fall back to comparing the raw bytes
+            keys = vertices.view(np.dtype((np.void, vertices.strides[0])))
+            _, first, inverse = np.unique(keys.reshape(-1),
+                                          return_index=True,
+                                          return_inverse=True)
+            inverse = inverse.reshape(-1)
+
+        # keep the order of first appearance for vertex cache locality
+        order = np.argsort(first)
+        remap = np.empty_like(order)
+        remap[order] = np.arange(len(order))
+
+        index_type = np.uint16 if len(first) <= 0xFFFF else np.uint32
+        return MeshData(vertices[first[order]], self.materials,
+                        remap[inverse].astype(index_type))
+
+    def build_lods(self, cells=LOD_CELLS) -> 'MeshData':
+        '''
+        Appends simplified versions of every material to the indices,
+        made by vertex clustering on grids getting coarser. Clusters are
+        represented by one of their existing vertices, so all the levels
+        share the vertex buffer and only differ by index ranges.
+        '''
+        if self.indices is None or len(self.vertices) == 0:
+            return self
+
+        positions = np.asarray(self.vertices[:, 5:8], dtype=np.float32)
+        minimum = positions.min(axis=0)
+        longest = float((positions.max(axis=0) - minimum).max())
+        if longest == 0:
+            return self
+
+        parts = [self.indices]
+        offset = len(self.indices)
+        materials = []
+        for material in self.materials:
+            triangles = self.indices[material.first:
+                                     material.first + material.count]
+            lods = []
+            previous = len(triangles)
+            for n_cells in cells:
+                simplified = _cluster(positions, minimum, longest / n_cells,
+                                      triangles)
+                # stop once a level doesn't remove anything
+                if len(simplified) == 0 or len(simplified) >= previous:
+                    break
+                parts.append(simplified.astype(self.indices.dtype))
+                lods.append((offset, len(simplified)))
+                offset += len(simplified)
+                previous = len(simplified)
+            materials.append(MaterialData(material.name, material.texture,
+                                          material.first, material.count,
+                                          lods))
+
+        return MeshData(self.vertices, materials, np.concatenate(parts))
+
+    def build_bvh(self) -> 'MeshData':
+        # BVH of the triangles of the materials, without their LODs
+        self.bvh = TriangleBVH.from_ranges(
+            self.vertices[:, 5:8], self.indices,
+            [(m.first, m.count) for m in self.materials])
+        return self
+
+
+def _cluster(positions: np.ndarray, minimum: np.ndarray, cell: float,
+             triangles: np.ndarray) -> np.ndarray:
+    '''
+    Snaps the vertices used by triangles to the vertex nearest to the
+    centroid of their grid cell and returns the remaining triangles
+    '''
+    used, local = np.unique(triangles, return_inverse=True)
+    points = positions[used]
+    cells = np.floor((points - minimum) / cell).astype(np.int64)
+    size = cells.max(axis=0) + 1
+    keys = (cells[:, 0] * size[1] + cells[:, 1]) * size[2] + cells[:, 2]
+    _, cluster = np.unique(keys, return_inverse=True)
+    cluster = cluster.reshape(-1)
+
+    counts = np.bincount(cluster)
+    centroids = np.stack([np.bincount(cluster, points[:, i]) / counts
+                          for i in range(3)], axis=1)
+    distances = ((points - centroids[cluster]) ** 2).sum(axis=1)
+    # nearest vertex of every cluster comes first for its cluster
+    order = np.lexsort((distances, cluster))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = cluster[order][1:] != cluster[order][:-1]
+    representative = np.empty(len(counts), dtype=np.int64)
+    representative[cluster[order][first]] = used[order][first]
+
+    result = representative[cluster[local.reshape(-1)]].reshape(-1, 3)
+    result = result[(result[:, 0] != result[:, 1]) &
+                    (result[:, 1] != result[:, 2]) &
+                    (result[:, 0] != result[:, 2])]
+
+    # the same triangle may come from several cells, keep its first copy
+    _, unique = np.unique(np.sort(result, axis=1), axis=0,
+                          return_index=True)
+    return result[np.sort(unique)].reshape(-1)
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import numpy as np
+
+from pathlib import Path
+from utilities.mesh_data import MaterialData, MeshData
+
+
+class ModelCache:
+    '''
+    Content-addressed on-disk cache of parsed OBJ geometry.
+    Every entry is a directory with 'meta.json' and the arrays stored
+    as .npy files, so a hit is memory-mapped instead of parsed again.
+    variant: e.g. the loader, which gives its own material and texture
+    names, the entries of one variant are never served for another
+    '''
+    VERSION = 3
+    DEFAULT_LOCATION = Path.home() / '.cache' / 'py3DEditor' / 'models'
+    _MTLLIB_PATTERN = re.compile(rb'^mtllib[ \t]+(.+?)[ \t]*\r?$',
+                                 re.MULTILINE)
+
+    def __init__(self, location: Path = DEFAULT_LOCATION,
+                 max_size=1024 * 1024 * 1024, max_entries=64):
+        self.location = Path(location)
+        self.max_size = max_size
+        self.max_entries = max_entries
+
+    def load(self, path: Path, variant=''):
+        entry = self.location / self._get_key(path, variant)
+        try:
+            with open(entry / 'meta.json', mode='r',
+                      encoding='UTF-8') as meta_file:
+                meta = json.load(meta_file)
+            vertices = np.asarray(np.load(entry / 'vertices.npy',
+                                          mmap_mode='r'))
+            indices = np.asarray(np.load(entry / 'indices.npy',
+                                         mmap_mode='r'))
+        except (OSError, ValueError):
+            return None
+
+        # mtime of 'meta.json' is the last access time for eviction
+        os.utime(entry / 'meta.json')
+        return self._meshes_from_meta(meta, vertices, indices)
+
+    def store(self, path: Path, meshes: list, variant='') -> None:
+        entry = self.location / self._get_key(path, variant)
+        if entry.exists():
+            return
+        self.location.mkdir(parents=True, exist_ok=True)
+
+        meta = {'version': self.VERSION, 'source': str(path),
+                'variant': variant, 'meshes': []}
+        vertex_offset = index_offset = 0
+        for mesh in meshes:
+            meta['meshes'].append({
+                'first_vertex': vertex_offset,
+                'vertex_count': len(mesh.vertices),
+                'first_index': index_offset,
+                'index_count': len(mesh.indices),
+                'index_type': mesh.indices.dtype.name,
+                'materials': [{'name': m.name, 'texture': m.texture,
+                               'first': m.first, 'count': m.count,
+                               'lods': m.lods}
+                              for m in mesh.materials]
+            })
+            vertex_offset += len(mesh.vertices)
+            index_offset += len(mesh.indices)
+
+        vertices = np.concatenate(
+            [m.vertices for m in meshes] +
+            [np.empty((0, 8), dtype=np.float32)]).astype(np.float32)
+        # indices are stored as uint32 and narrowed back per mesh on load
+        indices = np.concatenate(
+            [m.indices for m in meshes] +
+            [np.empty(0, dtype=np.uint32)]).astype(np.uint32)
+
+        # entry is written in a temporary directory and renamed at once,
+        # so a concurrent reader never sees a half-written entry
+        tmp = Path(tempfile.mkdtemp(dir=self.location))
+        try:
+            np.save(tmp / 'vertices.npy', vertices)
+            np.save(tmp / 'indices.npy', indices)
+            with open(tmp / 'meta.json', mode='w',
+                      encoding='UTF-8') as meta_file:
+                json.dump(meta, meta_file)
+            os.replace(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+
+        self._evict()
+
+    def clear(self) -> None:
+        shutil.rmtree(self.location, ignore_errors=True)
+
+    def _get_key(self, path: Path, variant: str) -> str:
+        path = Path(path)
+        with open(path, mode='rb') as obj_file:
+            content = obj_file.read()
+
+        digest = hashlib.sha1(content)
+        digest.update(f'{self.VERSION}:{variant}:'
+                      f'{path.stat().st_mtime_ns}'.encode())
+        for name in self._MTLLIB_PATTERN.findall(content):
+            mtl_path = path.parent / name.decode('UTF-8', 'replace')
+            mtime = mtl_path.stat().st_mtime_ns if mtl_path.exists() else 0
+            digest.update(f'{mtl_path.name}:{mtime}'.encode())
+        return digest.hexdigest()
+
+    def _evict(self) -> None:
+        entries = []
+        for entry in self.location.iterdir():
+            meta = entry / 'meta.json'
+            if not entry.is_dir() or not meta.exists():
+                continue
+            size = sum(f.stat().st_size for f in entry.iterdir())
+            entries.append((meta.stat().st_mtime, size, entry))
+
+        entries.sort(key=lambda e: e[0])
+        total_size = sum(e[1] for e in entries)
+        while entries and (total_size > self.max_size or
+                           len(entries) > self.max_entries):
+            _, size, entry = entries.pop(0)
+            shutil.rmtree(entry, ignore_errors=True)
+            total_size -= size
+
+    @staticmethod
+    def _meshes_from_meta(meta: dict, vertices: np.ndarray,
+                          indices: np.ndarray) -> list:
+        meshes = []
+        for mesh in meta['meshes']:
+            first_vertex = mesh['first_vertex']
+            first_index = mesh['first_index']
+            materials = [MaterialData(m['name'], m['texture'],
+                                      m['first'], m['count'],
+                                      [tuple(lod) for lod in m['lods']])
+                         for m in mesh['materials']]
+            mesh_indices = indices[first_index:
+                                   first_index + mesh['index_count']]
+            meshes.append(MeshData(
+                vertices[first_vertex:first_vertex + mesh['vertex_count']],
+                materials,
+                mesh_indices.astype(mesh['index_type'], copy=False)))
+        return meshes
@@ -0,0 +1,62 @@
+import queue
+import traceback
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ImportCancelled(Exception):
+    pass
+
+
+class ModelImporter:
+    '''
+    Reads models in a worker pool and hands the results over to the
+    thread owning the OpenGL context, which uploads them
+    in process_ready().
+    '''
+    def __init__(self, max_workers=2):
+        self._executor = ThreadPoolExecutor(max_workers,
+                                            thread_name_prefix='import')
+        self._ready = queue.Queue()
+        self._callbacks = {}
+
+    @property
+    def pending(self) -> int:
+        return len(self._callbacks)
+
+    def submit(self, model, on_finished=None) -> None:
+        # model must provide read() -> data, upload(data), fail(error)
+        self._callbacks[model] = on_finished
+        future = self._executor.submit(model.read)
+        future.add_done_callback(
+            lambda f: self._ready.put((model, f)))
+
+    def cancel_all(self) -> None:
+        # the models still finish in process_ready(), as cancelled
+        for model in self._callbacks:
+            model.cancel_loading()
+
+    def process_ready(self, max_uploads=1) -> list:
+        finished = []
+        while len(finished) < max_uploads:
+            try:
+                model, future = self._ready.get_nowait()
+            except queue.Empty:
+                break
+
+            try:
+                model.upload(future.result())
+            except ImportCancelled as error:
+                model.fail(error)
+            except Exception as error:
+                traceback.print_exc()
+                model.fail(error)
+
+            finished.append(model)
+            callback = self._callbacks.pop(model, None)
+            if callback is not None:
+                callback(model)
+        return finished
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
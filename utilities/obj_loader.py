@@ -0,0 +1,275 @@
+import re
+import numpy as np
+
+from pathlib import Path, PureWindowsPath
+from utilities.mesh_data import MaterialData, MeshData
+
+# lines which change the current mesh or material split the file into
+# chunks, every chunk is then parsed with a few bulk numpy calls.
+# Patterns start with a literal '\n' so re can skip ahead with a fast
+# prefix search instead of trying every position of a multi-megabyte file
+_DIRECTIVE_PATTERN = re.compile(
+    rb'\n(o|usemtl|mtllib)(?:[ \t]+([^\r\n]*?))?[ \t]*(?=\r?\n)')
+_POSITION_PATTERN = re.compile(rb'\nv[ \t]+([^\n]*)')
+_TEXTURE_PATTERN = re.compile(rb'\nvt[ \t]+([^\n]*)')
+_NORMAL_PATTERN = re.compile(rb'\nvn[ \t]+([^\n]*)')
+_FACE_PATTERN = re.compile(rb'\nf[ \t]+([^\n]*)')
+_ANY_FACE_PATTERN = re.compile(rb'\nf[ \t]')
+_ANY_VERTEX_PATTERN = re.compile(rb'\nv[nt]?[ \t]')
+
+_BLANKS = np.zeros(256, dtype=bool)
+_BLANKS[list(b' \t\r\n')] = True
+
+
+class _Corners:
+    # triangulated face corners: indices into position, uv and normal
+    # pools, -1 for corners without uv or normal
+    def __init__(self, positions, uvs, normals):
+        self.positions = positions
+        self.uvs = uvs
+        self.normals = normals
+
+
+def load_obj(path: Path) -> list:
+    '''
+    Vectorized OBJ parser, returns a list of MeshData
+    with vertices in format 'T2F_N3F_V3F'.
+    Polygons are triangulated as a fan, negative indices are
+    resolved relative to the vertices declared before the face.
+    '''
+    path = Path(path)
+    with open(path, mode='rb') as obj_file:
+        content = b'\n' + obj_file.read() + b'\n'
+
+    pools = {'v': [], 'vt': [], 'vn': []}
+    counts = {'v': 0, 'vt': 0, 'vn': 0}
+    textures = {}
+    meshes = []
+    mesh = {}
+    material = 'default'
+
+    parts = _DIRECTIVE_PATTERN.split(content)
+    for i in range(0, len(parts), 3):
+        if i > 0:
+            kind = parts[i - 2]
+            value = (parts[i - 1] or b'').decode('UTF-8', 'replace')
+            if kind == b'o':
+                mesh = {}
+                meshes.append(mesh)
+            elif kind == b'usemtl':
+                material = value
+            else:
+                textures.update(_load_mtl(path.parent / value))
+
+        for chunk in _split_at_vertices(parts[i]):
+            for kind, pattern, size in (('v', _POSITION_PATTERN, 3),
+                                        ('vt', _TEXTURE_PATTERN, 2),
+                                        ('vn', _NORMAL_PATTERN, 3)):
+                values = _parse_floats(pattern.findall(chunk), size)
+                if len(values) > 0:
+                    pools[kind].append(values)
+                    counts[kind] += len(values)
+
+            corners = _parse_faces(_FACE_PATTERN.findall(chunk), counts)
+            if corners is None:
+                continue
+            if not meshes:
+                meshes.append(mesh)
+            mesh.setdefault(material, []).append(corners)
+
+    positions = _concatenate(pools['v'], 3)
+    uvs = _concatenate(pools['vt'], 2)
+    normals = _concatenate(pools['vn'], 3)
+
+    return [_build_mesh(mesh, positions, uvs, normals, textures)
+            for mesh in meshes if mesh]
+
+
+def _split_at_vertices(chunk: bytes) -> list:
+    # vertices after a face start a new chunk, so the faces
+    # before them do not see them as negative indices
+    chunks = []
+    start = 0
+    while True:
+        face = _ANY_FACE_PATTERN.search(chunk, start)
+        vertex = face and _ANY_VERTEX_PATTERN.search(chunk, face.end())
+        if not vertex:
+            chunks.append(chunk[start:])
+            return chunks
+        chunks.append(chunk[start:vertex.start()])
+        start = vertex.start()
+
+
+def _get_tokens(text: bytes) -> tuple:
+    '''
+    offsets of the whitespace separated tokens of text
+    and the line each of them is on
+    '''
+    chars = np.frombuffer(text, dtype=np.uint8)
+    blank = _BLANKS[chars]
+    starts = ~blank
+    starts[1:] &= blank[:-1]
+    starts = np.flatnonzero(starts)
+    lines = np.searchsorted(np.flatnonzero(chars == ord('\n')), starts)
+    return starts, lines
+
+
+def _parse_floats(lines: list, size: int) -> np.ndarray:
+    if not lines:
+        return np.empty((0, size), dtype=np.float32)
+    text = b'\n'.join(lines)
+    values = np.fromstring(text, dtype=np.float32, sep=' ')
+    # 'v' may carry w or vertex colours, 'vt' may have only u or carry w,
+    # so every line is read with its own width
+    widths = np.bincount(_get_tokens(text)[1], minlength=len(lines))
+    if (widths == size).all():
+        return values.reshape(-1, size)
+    first = np.cumsum(widths) - widths
+    columns = np.arange(size)
+    present = columns < widths[:, None]
+    result = np.zeros((len(lines), size), dtype=np.float32)
+    result[present] = values[(first[:, None] + columns)[present]]
+    return result
+
+
+def _parse_faces(lines: list, counts: dict):
+    if not lines:
+        return None
+
+    # the format of each corner is read from its own slashes, so
+    # 'v', 'v/vt', 'v//vn' and 'v/vt/vn' may be mixed
+    text = b'\n'.join(lines)
+    starts, token_lines = _get_tokens(text)
+    n_corners = np.bincount(token_lines, minlength=len(lines))
+
+    chars = np.frombuffer(text, dtype=np.uint8)
+    slashes = np.flatnonzero(chars == ord('/'))
+    slash_tokens = np.searchsorted(starts, slashes, side='right') - 1
+    n_slashes = np.bincount(slash_tokens, minlength=len(starts))
+    double = np.zeros(len(starts), dtype=bool)
+    double[slash_tokens[:-1][np.diff(slashes) == 1]] = True
+    has_uv = (n_slashes >= 1) & ~double
+    has_normal = n_slashes == 2
+
+    values = np.fromstring(text.replace(b'/', b' '), dtype=np.int64,
+                           sep=' ')
+    n_values = 1 + has_uv + has_normal
+    first_value = np.cumsum(n_values) - n_values
+    # 0 marks a missing uv or normal, obj indices are never 0
+    positions = values[first_value]
+    uvs = np.zeros(len(starts), dtype=np.int64)
+    uvs[has_uv] = values[first_value[has_uv] + 1]
+    normals = np.zeros(len(starts), dtype=np.int64)
+    normals[has_normal] = values[first_value[has_normal] + n_values[
+        has_normal] - 1]
+
+    first_corner = np.concatenate(([0], np.cumsum(n_corners)[:-1]))
+
+    # fan triangulation in the same order as pywavefront:
+    # (c0, c1, c2), then (c[k + 1], c0, c[k]) for k in 2..n-2
+    n_triangles = np.maximum(n_corners - 2, 0)
+    face_idx = np.repeat(np.arange(len(n_corners)), n_triangles)
+    triangle_start = np.concatenate(([0], np.cumsum(n_triangles)[:-1]))
+    k = np.arange(len(face_idx)) - triangle_start[face_idx] + 1
+    base = first_corner[face_idx]
+    corners = np.where((k == 1)[:, None],
+                       np.stack((base, base + 1, base + 2), axis=1),
+                       np.stack((base + k + 1, base, base + k), axis=1))
+    corners = corners.reshape(-1)
+
+    return _Corners(_resolve(positions[corners], counts['v']),
+                    _resolve(uvs[corners], counts['vt']),
+                    _resolve(normals[corners], counts['vn']))
+
+
+def _resolve(indices: np.ndarray, count: int) -> np.ndarray:
+    # missing (0) becomes -1
+    return np.where(indices < 0, indices + count, indices - 1)
+
+
+def _concatenate(arrays: list, size: int) -> np.ndarray:
+    if not arrays:
+        return np.empty((0, size), dtype=np.float32)
+    return np.concatenate(arrays)
+
+
+def _build_mesh(mesh: dict, positions, uvs, normals,
+                textures: dict) -> MeshData:
+    vertices = []
+    materials = []
+    first = 0
+    for name, corners_list in mesh.items():
+        pos_idx = np.concatenate([c.positions for c in corners_list])
+        vertex_positions = positions[pos_idx]
+
+        material_vertices = np.zeros((len(pos_idx), 8), dtype=np.float32)
+        _gather(material_vertices[:, 0:2], uvs,
+                np.concatenate([c.uvs for c in corners_list]))
+        has_normal = _gather(
+            material_vertices[:, 2:5], normals,
+            np.concatenate([c.normals for c in corners_list]))
+        if not has_normal.all():
+            material_vertices[~has_normal, 2:5] = _get_flat_normals(
+                vertex_positions)[~has_normal]
+        material_vertices[:, 5:8] = vertex_positions
+
+        vertices.append(material_vertices)
+        materials.append(MaterialData(name, textures.get(name, ''),
+                                      first, len(pos_idx)))
+        first += len(pos_idx)
+
+    return MeshData(np.concatenate(vertices), materials)
+
+
+def _gather(target: np.ndarray, pool: np.ndarray,
+            indices: np.ndarray) -> np.ndarray:
+    # fills the rows with an index, returns which rows had one
+    present = indices >= 0
+    if present.all():
+        target[:] = pool[indices]
+    else:
+        target[present] = pool[indices[present]]
+    return present
+
+
+def _get_flat_normals(positions: np.ndarray) -> np.ndarray:
+    triangles = positions.reshape(-1, 3, 3)
+    normals = np.cross(triangles[:, 1] - triangles[:, 0],
+                       triangles[:, 2] - triangles[:, 0])
+    length = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals /= np.where(length == 0, 1, length)
+    return np.repeat(normals, 3, axis=0)
+
+
+def _load_mtl(path: Path) -> dict:
+    '''
+    Returns material name -> texture file name relative to the obj
+    directory. Textures missing on disk are skipped.
+    '''
+    textures = {}
+    try:
+        with open(path, mode='r', encoding='UTF-8',
+                  errors='replace') as mtl_file:
+            lines = mtl_file.read().splitlines()
+    except OSError:
+        return textures
+
+    material = None
+    for line in lines:
+        values = line.split()
+        if not values:
+            continue
+        if values[0] == 'newmtl':
+            material = ' '.join(values[1:])
+        elif values[0] == 'map_Kd' and material is not None:
+            name = ' '.join(values[1:])
+            if name.startswith('-'):
+                # options go before the texture name
+                name = values[-1]
+            if ':' in name or '\\' in name:
+                name = PureWindowsPath(name).name
+            else:
+                name = Path(name).name
+            if (path.parent / name).exists():
+                textures[material] = name
+    return textures
@@ -0,0 +1,139 @@
+import numpy as np
+
+from utilities.bvh import BVH, intersect_boxes
+
+
+class RayHit:
+    def __init__(self, obj, mesh, triangle: int, point: np.ndarray,
+                 distance: float):
+        # triangle: index in the lod 0 triangles of the mesh
+        # point: world space, distance: from the origin of the ray
+        self.obj = obj
+        self.mesh = mesh
+        self.triangle = triangle
+        self.point = point
+        self.distance = distance
+
+
+class ScenePicker:
+    '''
+    Ray queries against scene graphs. The world boxes of the nodes with
+    meshes are kept in a BVH that is refit when nodes move and only
+    rebuilt when nodes are added or removed. Triangles are tested in
+    the local space of their mesh with its TriangleBVH, so moving an
+    object never touches them.
+    '''
+    def __init__(self):
+        self._nodes = []
+        # per node what its box was computed from, see _get_key
+        self._keys = []
+        self._minimums = np.empty((0, 3), dtype=np.float32)
+        self._maximums = np.empty((0, 3), dtype=np.float32)
+        self._bvh = BVH(self._minimums, self._maximums)
+        # roots and scene revision the boxes are up to date with
+        self._roots = ()
+        self._revision = None
+        # for profiling
+        self.rebuilds = 0
+        self.refits = 0
+
+    def cast(self, roots: list, origin, direction, max_distance=np.inf,
+             revision=None):
+        '''
+        closest RayHit of the ray with the trees below roots, None if it
+        misses; direction has to be normalized for world distances
+        revision: e.g. SceneTracker.revision, the nodes are only checked
+        for changes when it differs from the previous query
+        '''
+        roots = tuple(roots)
+        if revision is None or revision != self._revision or \
+                not self._is_same_key(roots, self._roots):
+            self._update(roots)
+        self._roots, self._revision = roots, revision
+        origin = np.asarray(origin, dtype=np.float32)
+        direction = np.asarray(direction, dtype=np.float32)
+        candidates, _ = self._bvh.query_ray(origin, direction, max_distance)
+        # leaves hold a few nodes, only the boxes the ray enters count
+        distances = intersect_boxes(origin, direction,
+                                    self._minimums[candidates],
+                                    self._maximums[candidates])
+        best = None
+        # nearest boxes first, the rest is skipped once a hit is closer
+        for i in np.argsort(distances, kind='stable'):
+            if distances[i] > max_distance:
+                break
+            hit = self._cast_node(self._nodes[candidates[i]], origin,
+                                  direction, max_distance)
+            if hit is not None:
+                best, max_distance = hit, hit.distance
+        return best
+
+    def _update(self, roots: tuple) -> None:
+        nodes = [node for root in roots for node in root.iter_subtree()
+                 if any(mesh.PICKABLE and mesh.bounds is not None
+                        for mesh in node.meshes)]
+        keys = [self._get_key(node) for node in nodes]
+        if len(nodes) != len(self._nodes) or \
+                any(a is not b for a, b in zip(nodes, self._nodes)):
+            self._minimums = np.empty((len(nodes), 3), dtype=np.float32)
+            self._maximums = np.empty((len(nodes), 3), dtype=np.float32)
+            for i, node in enumerate(nodes):
+                self._set_box(i, node)
+            self._bvh = BVH(self._minimums, self._maximums)
+            self.rebuilds += 1
+        else:
+            changed = [i for i, (key, old) in enumerate(zip(keys, self._keys))
+                       if not self._is_same_key(key, old)]
+            for i in changed:
+                self._set_box(i, nodes[i])
+            if changed:
+                self._bvh.refit(self._minimums, self._maximums)
+                self.refits += 1
+        self._nodes, self._keys = nodes, keys
+
+    def _set_box(self, i: int, node) -> None:
+        bounds = node.get_mesh_bounds()
+        self._minimums[i] = bounds.min
+        self._maximums[i] = bounds.max
+
+    @staticmethod
+    def _get_key(node) -> tuple:
+        # the cached world matrix and bounds are replaced, not changed
+        # in place, so comparing identities finds the moved nodes
+        key = [node.transform]
+        for mesh in node.meshes:
+            key.append(mesh)
+            if mesh.bounds is not None:
+                key += [mesh.bounds.min, mesh.bounds.max]
+        return tuple(key)
+
+    @staticmethod
+    def _is_same_key(key: tuple, old: tuple) -> bool:
+        return len(key) == len(old) and \
+            all(a is b for a, b in zip(key, old))
+
+    @staticmethod
+    def _cast_node(node, origin: np.ndarray, direction: np.ndarray,
+                   max_distance: float):
+        # the ray in the local space of the node, the distances along
+        # it stay the same
+        try:
+            inverse = np.linalg.inv(node.transform)
+        except np.linalg.LinAlgError:
+            # scaled to nothing
+            return None
+        local_origin = (np.append(origin, 1) @ inverse)[:3]
+        local_direction = direction @ inverse[:3, :3]
+
+        best = None
+        for mesh in node.meshes:
+            bvh = mesh.get_bvh() if mesh.PICKABLE else None
+            if bvh is None:
+                continue
+            hit = bvh.intersect(local_origin, local_direction, max_distance)
+            if hit is not None:
+                triangle, max_distance = hit
+                best = RayHit(node, mesh, triangle,
+                              origin + direction * max_distance,
+                              max_distance)
+        return best
@@ -0,0 +1,168 @@
+import csv
+import json
+import time
+import numpy as np
+
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from OpenGL.GL import *
+
+
+class Profiler:
+    '''
+    Records CPU time of named sections and GPU time of passes
+    (GL_TIME_ELAPSED queries) for every frame while enabled.
+    GPU results are read a few frames later, when they are available,
+    so the queries never stall the pipeline.
+    '''
+    def __init__(self, history=600):
+        self.enabled = False
+        # {'index', 'start', 'duration', 'cpu': [(name, start, duration,
+        # depth), ...], 'gpu': {name: duration}}, times in seconds
+        self.frames = deque(maxlen=history)
+        self._origin = time.perf_counter()
+        self._frame = None
+        self._frame_index = 0
+        self._depth = 0
+        self._free_queries = []
+        # (frame, pass name, query) waiting for their results
+        self._pending_queries = deque()
+
+    def begin_frame(self) -> None:
+        if not self.enabled:
+            return
+        self._collect_gpu_results()
+        self._frame = {'index': self._frame_index,
+                       'start': time.perf_counter() - self._origin,
+                       'duration': 0, 'cpu': [], 'gpu': {}}
+        self._frame_index += 1
+
+    def end_frame(self) -> None:
+        if self._frame is None:
+            return
+        self._frame['duration'] = time.perf_counter() - self._origin - \
+            self._frame['start']
+        self.frames.append(self._frame)
+        self._frame = None
+
+    @contextmanager
+    def section(self, name: str):
+        if self._frame is None:
+            yield
+            return
+        frame = self._frame
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._depth -= 1
+            frame['cpu'].append((name, start - self._origin, end - start,
+                                 self._depth))
+
+    @contextmanager
+    def gpu_section(self, name: str):
+        # passes can't be nested, GL has one active GL_TIME_ELAPSED query
+        if self._frame is None:
+            yield
+            return
+        query = self._free_queries.pop() if self._free_queries \
+            else glGenQueries(1)
+        # https://docs.gl/gl4/glBeginQuery
+        glBeginQuery(GL_TIME_ELAPSED, query)
+        try:
+            yield
+        finally:
+            glEndQuery(GL_TIME_ELAPSED)
+            self._pending_queries.append((self._frame, name, query))
+
+    def get_stats(self, window=120) -> dict:
+        '''
+        name -> (mean, p95, max) in milliseconds over the last frames,
+        GPU passes are prefixed with 'gpu '
+        '''
+        samples = {'frame': []}
+        for frame in list(self.frames)[-window:]:
+            samples['frame'].append(frame['duration'])
+            for name, _, duration, _ in frame['cpu']:
+                samples.setdefault(name, []).append(duration)
+            for name, duration in frame['gpu'].items():
+                samples.setdefault('gpu ' + name, []).append(duration)
+
+        stats = {}
+        for name, values in samples.items():
+            if values:
+                values = np.array(values) * 1000
+                stats[name] = (values.mean(), np.percentile(values, 95),
+                               values.max())
+        return stats
+
+    def report(self, window=120, max_lines=16) -> str:
+        stats = self.get_stats(window)
+        frame = stats.pop('frame', None)
+        lines = []
+        if frame is not None:
+            lines.append(f'frame {frame[0]:6.2f} ms  p95 {frame[1]:6.2f}  '
+                         f'({1000 / frame[0] if frame[0] else 0:.0f} fps)')
+        ordered = sorted(stats.items(), key=lambda item: -item[1][0])
+        for name, (mean, p95, maximum) in ordered[:max_lines]:
+            lines.append(f'{name[:28]:<28} {mean:6.2f} {p95:6.2f} '
+                         f'{maximum:6.2f}')
+        return '\n'.join(lines)
+
+    def export_chrome_trace(self, path: Path) -> None:
+        # chrome://tracing / Perfetto format, GPU passes on their own row
+        # placed at the start of the frame, only their duration is known
+        events = []
+        for frame in self.frames:
+            events.append(self._trace_event(f'frame {frame["index"]}',
+                                            frame['start'],
+                                            frame['duration'], 0))
+            for name, start, duration, _ in frame['cpu']:
+                events.append(self._trace_event(name, start, duration, 0))
+            gpu_start = frame['start']
+            for name, duration in frame['gpu'].items():
+                events.append(self._trace_event(name, gpu_start, duration,
+                                                1))
+                gpu_start += duration
+
+        with open(path, mode='w', encoding='UTF-8') as trace_file:
+            json.dump({'traceEvents': events,
+                       'displayTimeUnit': 'ms'}, trace_file)
+
+    def export_csv(self, path: Path) -> None:
+        with open(path, mode='w', encoding='UTF-8',
+                  newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(['frame', 'kind', 'section', 'depth',
+                             'start_ms', 'duration_ms'])
+            for frame in self.frames:
+                writer.writerow([frame['index'], 'frame', 'frame', 0,
+                                 frame['start'] * 1000,
+                                 frame['duration'] * 1000])
+                for name, start, duration, depth in frame['cpu']:
+                    writer.writerow([frame['index'], 'cpu', name, depth,
+                                     start * 1000, duration * 1000])
+                for name, duration in frame['gpu'].items():
+                    writer.writerow([frame['index'], 'gpu', name, 0, '',
+                                     duration * 1000])
+
+    def _collect_gpu_results(self) -> None:
+        while self._pending_queries:
+            frame, name, query = self._pending_queries[0]
+            # https://docs.gl/gl4/glGetQueryObject
+            if not glGetQueryObjectiv(query, GL_QUERY_RESULT_AVAILABLE):
+                break
+            nanoseconds = glGetQueryObjectui64v(query, GL_QUERY_RESULT)
+            frame['gpu'][name] = frame['gpu'].get(name, 0) + \
+                nanoseconds / 1e9
+            self._free_queries.append(query)
+            self._pending_queries.popleft()
+
+    @staticmethod
+    def _trace_event(name: str, start: float, duration: float,
+                     thread: int) -> dict:
+        return {'name': name, 'ph': 'X', 'pid': 0, 'tid': thread,
+                'ts': start * 1e6, 'dur': duration * 1e6}
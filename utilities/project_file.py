@@ -0,0 +1,108 @@
+import json
+import os
+import struct
+import tempfile
+import numpy as np
+
+from pathlib import Path
+
+
+class ProjectFile:
+    '''
+    Project saved as a single file: a header, a JSON manifest and the
+    arrays (geometry, encoded texture files) as raw blobs. Every blob starts at a
+    64-byte aligned offset, so an opened project memory-maps the file and
+    the blobs are arrays that can be uploaded without being copied.
+
+    header: MAGIC, VERSION (uint32), manifest size (uint64), little endian
+    '''
+    MAGIC = b'PY3DPROJ'
+    VERSION = 2
+    ALIGNMENT = 64
+    EXTENSION = '.p3d'
+    _HEADER = struct.Struct('<8sIQ')
+
+    def __init__(self, manifest: dict = None):
+        self.manifest = manifest if manifest is not None else {}
+        # [(offset in the blob section, dtype name, shape), ...]
+        self._blob_entries = []
+        # arrays added by add_blob, written by save()
+        self._arrays = []
+        # the mapped file of an opened project
+        self._data = None
+        self._blobs_start = 0
+
+    def add_blob(self, array: np.ndarray) -> int:
+        # returns the index the array is stored under in the manifest
+        array = np.ascontiguousarray(array)
+        offset = 0
+        if self._blob_entries:
+            last_offset, dtype, shape = self._blob_entries[-1]
+            offset = self._align(last_offset + int(np.prod(shape)) *
+                                 np.dtype(dtype).itemsize)
+        self._blob_entries.append((offset, array.dtype.str,
+                                   list(array.shape)))
+        self._arrays.append(array)
+        return len(self._blob_entries) - 1
+
+    def get_blob(self, index: int) -> np.ndarray:
+        # read-only view into the mapped file
+        offset, dtype, shape = self._blob_entries[index]
+        start = self._blobs_start + offset
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        return np.asarray(self._data[start:start + nbytes]).view(
+            dtype).reshape(shape)
+
+    def save(self, path: Path) -> None:
+        manifest = dict(self.manifest, blobs=self._blob_entries)
+        manifest_data = json.dumps(manifest).encode('UTF-8')
+        blobs_start = self._align(self._HEADER.size + len(manifest_data))
+
+        # written next to the target and renamed at once, a failed save
+        # keeps the previous version of the project
+        path = Path(path)
+        handle, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(handle, mode='wb') as project_file:
+                project_file.write(self._HEADER.pack(
+                    self.MAGIC, self.VERSION, len(manifest_data)))
+                project_file.write(manifest_data)
+                for (offset, _, _), array in zip(self._blob_entries,
+                                                 self._arrays):
+                    project_file.seek(blobs_start + offset)
+                    project_file.write(array.data)
+            # mkstemp creates the file readable by the owner only
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp, 0o666 & ~umask)
+            os.replace(tmp, path)
+        except OSError:
+            os.unlink(tmp)
+            raise
+
+    @classmethod
+    def open(cls, path: Path) -> 'ProjectFile':
+        with open(path, mode='rb') as project_file:
+            header = project_file.read(cls._HEADER.size)
+            if len(header) < cls._HEADER.size:
+                raise ValueError(f'Not a project file: {path}')
+            magic, version, manifest_size = cls._HEADER.unpack(header)
+            if magic != cls.MAGIC:
+                raise ValueError(f'Not a project file: {path}')
+            if version != cls.VERSION:
+                raise ValueError(f'Unsupported project version {version}: '
+                                 f'{path}')
+            manifest = json.loads(project_file.read(manifest_size))
+
+        project = cls(manifest)
+        project._blob_entries = [(offset, dtype, tuple(shape))
+                                 for offset, dtype, shape
+                                 in manifest.pop('blobs')]
+        project._blobs_start = cls._align(cls._HEADER.size + manifest_size)
+        if project._blob_entries:
+            project._data = np.memmap(path, dtype=np.uint8, mode='r')
+        return project
+
+    @classmethod
+    def _align(cls, offset: int) -> int:
+        return -(-offset // cls.ALIGNMENT) * cls.ALIGNMENT
@@ -0,0 +1,191 @@
+import numpy as np
+
+from OpenGL.GL import *
+from utilities.growable_buffer import GrowableBuffer
+
+
+class DrawItem:
+    def __init__(self, shader, vao: int, draw, textures=(), wireframe=None,
+                 uniforms=None, transform=None, batch_key=None,
+                 draw_instanced=None):
+        # textures: ((sampler name, texture handle), ...), handle 0 unbinds
+        # wireframe: polygon mode, None if the item doesn't depend on it
+        # draw(): issues the draw call with the state already bound
+        # transform: model matrix of the item
+        # batch_key: equal for items drawing the same geometry range,
+        # they are drawn at once by draw_instanced(instance count)
+        self.shader = shader
+        self.vao = vao
+        self.draw = draw
+        self.textures = tuple(textures)
+        self.wireframe = wireframe
+        self.uniforms = uniforms or {}
+        self.transform = transform
+        self.batch_key = batch_key
+        self.draw_instanced = draw_instanced
+
+
+class RenderQueue:
+    '''
+    Collects draw items for a frame and issues them sorted by program,
+    polygon mode, textures and VAO, so every piece of state is only
+    changed when it differs from the previous item.
+    Items sharing geometry are merged into one instanced draw, their
+    model and normal matrices are streamed through an instance buffer.
+    '''
+    # attribute locations of 'instanceModel' and 'instanceNormModel'
+    INSTANCE_MODEL_LOCATION = 3
+    INSTANCE_NORM_LOCATION = 7
+
+    def __init__(self):
+        self.items = []
+        self._instances = None
+        # counters of the last flushed frame
+        self.stats = self._new_stats()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def add(self, item: DrawItem) -> None:
+        self.items.append(item)
+
+    def flush(self) -> dict:
+        stats = self._new_stats()
+        stats['items'] = len(self.items)
+        batches = self._get_batches(sorted(self.items,
+                                           key=self._get_sort_key()))
+        offsets = self._upload_instances(batches)
+
+        shader = wireframe = vao = None
+        # texture unit -> bound handle
+        bound_textures = {}
+        for batch, offset in zip(batches, offsets):
+            item = batch[0]
+            if item.shader is not shader:
+                shader = item.shader
+                shader.use()
+                stats['programs'] += 1
+
+            if item.wireframe is not None and item.wireframe != wireframe:
+                wireframe = item.wireframe
+                if wireframe:
+                    shader.enable_wireframe()
+                else:
+                    shader.disable_wireframe()
+                stats['polygon_modes'] += 1
+
+            for sampler, texture in item.textures:
+                unit = shader.get_texture_unit(sampler)
+                if bound_textures.get(unit) != texture:
+                    # https://docs.gl/gl4/glBindTexture
+                    glActiveTexture(GL_TEXTURE0 + unit)
+                    glBindTexture(GL_TEXTURE_2D, texture)
+                    bound_textures[unit] = texture
+                    stats['textures'] += 1
+
+            if item.vao != vao:
+                vao = item.vao
+                glBindVertexArray(vao)
+                stats['vaos'] += 1
+
+            if offset is None:
+                if item.transform is not None:
+                    shader.set_uniforms(model=item.transform,
+                                        instanced=False)
+                if item.uniforms:
+                    shader.set_uniforms(**item.uniforms)
+                item.draw()
+            else:
+                self._bind_instances(offset)
+                shader.set_uniforms(instanced=True)
+                item.draw_instanced(len(batch))
+                stats['instanced_draws'] += 1
+            stats['draw_calls'] += 1
+            stats['instances'] += len(batch)
+
+        glBindVertexArray(0)
+        self.items = []
+        self.stats = stats
+        return stats
+
+    def _get_batches(self, items: list) -> list:
+        # [[item, ...], ...] in the order of the first item of every batch
+        batches = []
+        by_key = {}
+        for item in items:
+            if item.batch_key is None or item.uniforms or \
+                    item.transform is None or not item.shader.instancing:
+                batches.append([item])
+                continue
+            key = (item.batch_key, id(item.shader), item.textures,
+                   item.wireframe)
+            batch = by_key.get(key)
+            if batch is None:
+                batch = by_key[key] = []
+                batches.append(batch)
+            batch.append(item)
+        return batches
+
+    def _upload_instances(self, batches: list) -> list:
+        # writes the matrices of all instanced batches at once, returns
+        # the first row of every batch in the buffer, None if not instanced
+        offsets = []
+        transforms = []
+        size = 0
+        for batch in batches:
+            if len(batch) < 2:
+                offsets.append(None)
+                continue
+            offsets.append(size)
+            transforms += [item.transform for item in batch]
+            size += len(batch)
+        if not transforms:
+            return offsets
+
+        models = np.array(transforms, dtype=np.float32)
+        norm_models = np.linalg.inv(models).transpose(0, 2, 1)
+        if self._instances is None:
+            self._instances = GrowableBuffer(GL_ARRAY_BUFFER, np.float32, 32)
+        # everything is rewritten each frame
+        self._instances.clear()
+        self._instances.append(np.concatenate(
+            [models.reshape(-1, 16), norm_models.reshape(-1, 16)], axis=1))
+        self._instances.sync()
+        return offsets
+
+    def _bind_instances(self, first: int) -> None:
+        # GL 3.3 has no base instance, so the attributes of the bound VAO
+        # are pointed at the batch instead
+        stride = self._instances.row_nbytes
+        glBindBuffer(GL_ARRAY_BUFFER, self._instances.buffer)
+        for matrix, location in enumerate((self.INSTANCE_MODEL_LOCATION,
+                                           self.INSTANCE_NORM_LOCATION)):
+            for column in range(4):
+                offset = first * stride + (matrix * 4 + column) * 16
+                # https://docs.gl/gl4/glVertexAttribDivisor
+                glVertexAttribPointer(location + column, 4, GL_FLOAT,
+                                      GL_FALSE, stride,
+                                      ctypes.c_void_p(offset))
+                glVertexAttribDivisor(location + column, 1)
+                glEnableVertexAttribArray(location + column)
+
+    def _get_sort_key(self):
+        # packs the state of every item into a single integer:
+        # program | polygon mode | texture set | VAO
+        texture_ids = {}
+        for item in self.items:
+            texture_ids.setdefault(item.textures, len(texture_ids))
+
+        def key(item: DrawItem) -> int:
+            return (int(item.shader.program) << 48) | \
+                   ((1 if item.wireframe else 0) << 47) | \
+                   (texture_ids[item.textures] << 24) | \
+                   int(item.vao)
+
+        return key
+
+    @staticmethod
+    def _new_stats() -> dict:
+        return {'items': 0, 'draw_calls': 0, 'instanced_draws': 0,
+                'instances': 0, 'programs': 0, 'polygon_modes': 0,
+                'textures': 0, 'vaos': 0}
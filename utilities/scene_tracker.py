@@ -0,0 +1,14 @@
+class SceneTracker:
+    '''
+    Counts changes of anything visible in the scene, so frames are
+    only drawn after something changed. Listeners are called on every
+    change, e.g. to wake up the render loop.
+    '''
+    def __init__(self):
+        self.revision = 0
+        self.listeners = []
+
+    def mark(self) -> None:
+        self.revision += 1
+        for listener in self.listeners:
+            listener()
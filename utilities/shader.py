@@ -16,72 +16,116 @@ class ShaderException(Exception):
         glDeleteShader(shader)
 
 
+def _matrix_setter(location, value):
+    glUniformMatrix4fv(location, 1, GL_FALSE, concatenate(value))
+
+
+# GL uniform type -> (numpy dtype of the shadow copy, setter(location, value))
+# https://docs.gl/gl4/glUniform
+_UNIFORM_SETTERS = {
+    GL_FLOAT: (np.float32, lambda loc, v: glUniform1f(loc, v)),
+    GL_FLOAT_VEC2: (np.float32, lambda loc, v: glUniform2f(loc, v[0], v[1])),
+    GL_FLOAT_VEC3: (np.float32,
+                    lambda loc, v: glUniform3f(loc, v[0], v[1], v[2])),
+    GL_FLOAT_VEC4: (np.float32,
+                    lambda loc, v: glUniform4f(loc, v[0], v[1], v[2], v[3])),
+    GL_FLOAT_MAT4: (np.float32, _matrix_setter),
+    GL_INT: (np.int32, lambda loc, v: glUniform1i(loc, v)),
+    GL_BOOL: (np.int32, lambda loc, v: glUniform1i(loc, v)),
+    GL_SAMPLER_2D: (np.int32, lambda loc, v: glUniform1i(loc, v)),
+}
+
+
+class _Uniform:
+    def __init__(self, location: int, gl_type):
+        self.location = location
+        self.dtype, self.setter = _UNIFORM_SETTERS[gl_type]
+        # last uploaded value as it was passed, lists as tuples and
+        # arrays copied; uniforms keep their values per program
+        self.value = None
+
+    def is_uploaded(self, value) -> bool:
+        last = self.value
+        if isinstance(value, np.ndarray):
+            return isinstance(last, np.ndarray) and \
+                np.array_equal(last, value)
+        if isinstance(value, list):
+            value = tuple(value)
+        return type(last) is type(value) and last == value
+
+
 class Shader:
+    # program bound by the last glUseProgram call
+    _current_program = None
+
     def __init__(self, vertex_path, fragment_path):
         self.program = self._load_program(vertex_path, fragment_path)
-        self._uniform_to_location = self._get_uniforms_locations()
+        self._uniforms = self._get_active_uniforms()
+        # https://docs.gl/gl4/glGetAttribLocation
+        # per-instance model matrices, see RenderQueue
+        self.instancing = glGetAttribLocation(self.program,
+                                              'instanceModel') != -1
+        self._sampler_to_unit = {}
+        # uniform uploads and skipped ones since reset_counters()
+        self.uploads = 0
+        self.skipped = 0
 
         self.use()
 
     def use(self):
-        glUseProgram(self.program)
+        if Shader._current_program != self.program:
+            glUseProgram(self.program)
+            Shader._current_program = self.program
+
+    def get_texture_unit(self, sampler_name: str) -> int:
+        # every sampler of the program gets its own texture unit once
+        unit = self._sampler_to_unit.get(sampler_name)
+        if unit is None:
+            unit = len(self._sampler_to_unit)
+            self._sampler_to_unit[sampler_name] = unit
+            self._set_uniform(sampler_name, unit)
+        return unit
+
+    def bind_uniform_block(self, block_name: str, binding: int) -> bool:
+        # https://docs.gl/gl4/glUniformBlockBinding
+        index = glGetUniformBlockIndex(self.program, block_name)
+        if index == GL_INVALID_INDEX:
+            return False
+        glUniformBlockBinding(self.program, index, binding)
+        return True
 
     def set_uniforms(self, **kwargs):
         """
         'time' - current_time
         'resolution' - resolution of window
         'model' - object's world position\n
-        'projection' - camera FOV: perspective or orthographic\n
-        'view' - view_matrix
+        any other active uniform of the program can be passed by name,
+        values equal to the last uploaded ones are skipped
         """
-        glUseProgram(self.program)
-
-        if 'time' in kwargs.keys() and \
-                self._uniform_to_location['time'] != -1:
-            glUniform1f(self._uniform_to_location['time'],
-                        kwargs['time'])
-
-        if 'resolution' in kwargs.keys() and \
-                self._uniform_to_location['resolution'] != -1:
-            glUniform2f(self._uniform_to_location['resolution'],
-                        kwargs['resolution'][0], kwargs['resolution'][1])
-
-        if 'projection' in kwargs.keys() and \
-                self._uniform_to_location['projection'] != -1:
-            glUniformMatrix4fv(self._uniform_to_location['projection'], 1,
-                               GL_FALSE, concatenate(kwargs['projection']))
-
-        if 'model' in kwargs.keys() and \
-                self._uniform_to_location['model'] != -1:
-            glUniformMatrix4fv(self._uniform_to_location['model'], 1,
-                               GL_FALSE, concatenate(kwargs['model']))
-            if self._uniform_to_location['normModel'] != -1:
-                norm_matrix = np.linalg.inv(kwargs['model']).transpose()
-                glUniformMatrix4fv(self._uniform_to_location['normModel'], 1,
-                                   GL_FALSE, concatenate(norm_matrix))
-
-        if 'view' in kwargs.keys() and \
-                self._uniform_to_location['view'] != -1:
-            glUniformMatrix4fv(self._uniform_to_location['view'], 1,
-                               GL_FALSE, concatenate(kwargs['view']))
-
-        if 'lightColor' in kwargs.keys() and \
-                self._uniform_to_location['lightColor'] != -1:
-            color = kwargs['lightColor']
-            glUniform3f(self._uniform_to_location['lightColor'],
-                        color[0], color[1], color[2])
-
-        if 'lightPos' in kwargs.keys() and \
-                self._uniform_to_location['lightPos'] != -1:
-            color = kwargs['lightPos']
-            glUniform3f(self._uniform_to_location['lightPos'],
-                        color[0], color[1], color[2])
-
-        if 'viewPos' in kwargs.keys() and \
-                self._uniform_to_location['viewPos'] != -1:
-            view_pos = kwargs['viewPos']
-            glUniform3f(self._uniform_to_location['viewPos'],
-                        view_pos[0], view_pos[1], view_pos[2])
+        for name, value in kwargs.items():
+            changed = self._set_uniform(name, value)
+            if name == 'model' and changed and 'normModel' in self._uniforms:
+                self._set_uniform('normModel',
+                                  np.linalg.inv(value).transpose())
+
+    def reset_counters(self) -> None:
+        self.uploads = self.skipped = 0
+
+    def _set_uniform(self, name: str, value) -> bool:
+        uniform = self._uniforms.get(name)
+        if uniform is None:
+            return False
+
+        if uniform.is_uploaded(value):
+            self.skipped += 1
+            return False
+
+        self.use()
+        uniform.setter(uniform.location, np.array(value, dtype=uniform.dtype))
+        uniform.value = value.copy() if isinstance(value, np.ndarray) \
+            else tuple(value) if isinstance(value, list) else value
+        self.uploads += 1
+        return True
 
     @staticmethod
     def _load_program(vertex_path: str, fragment_path: str):
@@ -114,30 +158,21 @@ class Shader:
 
         return program
 
-    # https://docs.gl/gl4/glGetUniformLocation
-    def _get_uniforms_locations(self) -> dict:
-        form2pos = {
-            'time': glGetUniformLocation(self.program,
-                                         'time'),
-            'resolution': glGetUniformLocation(self.program,
-                                               'resolution'),
-            'view': glGetUniformLocation(self.program,
-                                         'view'),
-            'model': glGetUniformLocation(self.program,
-                                          'model'),
-            'projection': glGetUniformLocation(self.program,
-                                               'projection'),
-            'lightColor': glGetUniformLocation(self.program,
-                                               'lightColor'),
-            'lightPos': glGetUniformLocation(self.program,
-                                             'lightPos'),
-            'normModel': glGetUniformLocation(self.program,
-                                              'normModel'),
-            'viewPos': glGetUniformLocation(self.program,
-                                            'viewPos')
-        }
-
-        return form2pos
+    # https://docs.gl/gl4/glGetActiveUniform
+    def _get_active_uniforms(self) -> dict:
+        uniforms = {}
+        for i in range(glGetProgramiv(self.program, GL_ACTIVE_UNIFORMS)):
+            name, size, gl_type = glGetActiveUniform(self.program, i)
+            name = name.decode() if isinstance(name, bytes) else name
+            # arrays are reported as 'name[0]'
+            name = name.split('[', 1)[0]
+            if gl_type not in _UNIFORM_SETTERS:
+                continue
+            location = glGetUniformLocation(self.program, name)
+            if location != -1:
+                uniforms[name] = _Uniform(location, gl_type)
+
+        return uniforms
 
     @staticmethod
     def enable_wireframe():
@@ -1,5 +1,7 @@
 import numpy as np
 
+from utilities.geometry import Geometry
+
 cube = np.array([
     -0.5, -0.5, -0.5, 0.0, 0.0,
     0.5, -0.5, -0.5, 1.0, 0.0,
@@ -76,3 +78,49 @@ rect_indices = np.array([
     0, 1, 3,
     1, 2, 3
 ], dtype=np.uint32)
+
+
+def get_sphere(n_sectors: int, n_stacks: int, radius=1.0,
+               layout='T2F_N3F_V3F', color=(0, 0, 0)) -> Geometry:
+    '''
+    UV sphere with poles on the z axis.
+    layout: 'T2F_N3F_V3F', 'C3F_N3F_V3F' or 'V3F', with uint32 indices
+    '''
+    sector_angles = np.linspace(0, 2 * np.pi, n_sectors + 1,
+                                dtype=np.float32)
+    stack_angles = np.pi / 2 - np.linspace(0, np.pi, n_stacks + 1,
+                                           dtype=np.float32)
+
+    # k1 - current stack, k2 - next stack; the first and the last stacks
+    # have a single triangle per sector
+    stack, sector = np.meshgrid(np.arange(n_stacks), np.arange(n_sectors),
+                                indexing='ij')
+    k1 = stack * (n_sectors + 1) + sector
+    k2 = k1 + n_sectors + 1
+    upper = np.stack((k1, k2, k1 + 1), axis=-1)[1:]
+    lower = np.stack((k1 + 1, k2, k2 + 1), axis=-1)[:-1]
+    indices = np.concatenate((upper.reshape(-1), lower.reshape(-1)))
+
+    geometry = Geometry.empty(layout, (n_stacks + 1) * (n_sectors + 1),
+                              indices.astype(np.uint32))
+    vertices = geometry.vertices
+    fields = vertices.dtype.names
+
+    # grid (stack, sector) -> unit normal
+    xy = np.cos(stack_angles)[:, None]
+    normals = np.empty((n_stacks + 1, n_sectors + 1, 3), dtype=np.float32)
+    normals[..., 0] = xy * np.cos(sector_angles)
+    normals[..., 1] = xy * np.sin(sector_angles)
+    normals[..., 2] = np.sin(stack_angles)[:, None]
+    normals = normals.reshape(-1, 3)
+
+    vertices['position'] = normals * radius
+    if 'normal' in fields:
+        vertices['normal'] = normals
+    if 'uv' in fields:
+        vertices['uv'] = np.stack(np.meshgrid(
+            np.arange(n_sectors + 1) / n_sectors,
+            np.arange(n_stacks + 1) / n_stacks), axis=-1).reshape(-1, 2)
+    if 'color' in fields:
+        vertices['color'] = color
+    return geometry
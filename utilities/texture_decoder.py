@@ -0,0 +1,105 @@
+import io
+import os
+import time
+import pygame
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+class TextureData:
+    def __init__(self, pixels: np.ndarray, decode_time=0.0):
+        # pixels: contiguous uint8 array (height, width, 3 or 4)
+        self.pixels = pixels
+        self.decode_time = decode_time
+
+    @property
+    def width(self) -> int:
+        return self.pixels.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.pixels.shape[0]
+
+    @property
+    def channels(self) -> int:
+        return self.pixels.shape[2]
+
+
+class TextureDecoder:
+    '''
+    Decodes images in a thread pool into numpy buffers which can be
+    passed to glTexImage2D as is, and keeps per-texture timings.
+    '''
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = None
+        # resolved path -> {'size', 'channels', 'decode', 'upload'}
+        self.timings = {}
+
+    def set_max_workers(self, max_workers: int) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self.max_workers = max(1, max_workers)
+
+    def decode(self, path, should_flip=False, encoded=None) -> TextureData:
+        # encoded: contents of the image file, read instead of path,
+        # whose extension still tells the format
+        start = time.perf_counter()
+        if encoded is None:
+            surface = pygame.image.load(str(path))
+        else:
+            surface = pygame.image.load(io.BytesIO(encoded), Path(path).name)
+        image_format = 'RGBA' if surface.get_flags() & pygame.SRCALPHA \
+            else 'RGB'
+        # tostring converts and flips in a single copy, the array below
+        # is only a view over its result
+        raw = pygame.image.tostring(surface, image_format, should_flip)
+        pixels = np.frombuffer(raw, dtype=np.uint8).reshape(
+            surface.get_height(), surface.get_width(), len(image_format))
+
+        data = TextureData(pixels, time.perf_counter() - start)
+        self._record(path, data)
+        return data
+
+    def decode_all(self, paths: list, should_flip=False,
+                   encoded: dict = None) -> dict:
+        # encoded: path -> file contents, see decode()
+        encoded = encoded or {}
+        if len(paths) <= 1 or self.max_workers == 1:
+            return {path: self.decode(path, should_flip, encoded.get(path))
+                    for path in paths}
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self.max_workers, thread_name_prefix='texture-decode')
+        decoded = self._executor.map(
+            lambda path: self.decode(path, should_flip, encoded.get(path)),
+            paths)
+        return dict(zip(paths, decoded))
+
+    def record_upload(self, path, seconds: float) -> None:
+        self.timings.setdefault(self._get_key(path), {})['upload'] = seconds
+
+    def report(self, max_lines=None) -> str:
+        # the textures after max_lines are left out
+        lines = [f'{"texture":<40}{"size":>12}{"decode ms":>12}'
+                 f'{"upload ms":>12}']
+        for path, timing in list(self.timings.items())[:max_lines]:
+            size = 'x'.join(str(i) for i in timing.get('size', ()))
+            lines.append(f'{Path(path).name[:39]:<40}{size:>12}'
+                         f'{timing.get("decode", 0) * 1000:>12.1f}'
+                         f'{timing.get("upload", 0) * 1000:>12.1f}')
+        return '\n'.join(lines)
+
+    def _record(self, path, data: TextureData) -> None:
+        timing = self.timings.setdefault(self._get_key(path), {})
+        timing['size'] = (data.width, data.height)
+        timing['channels'] = data.channels
+        timing['decode'] = data.decode_time
+
+    @staticmethod
+    def _get_key(path) -> str:
+        return str(Path(path).resolve())
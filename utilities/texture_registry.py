@@ -0,0 +1,43 @@
+from OpenGL.GL import *
+from pathlib import Path
+
+
+class TextureRegistry:
+    '''
+    Process-wide table of OpenGL textures keyed by resolved file path
+    and flip flag, so every image is decoded and uploaded only once
+    while something references it.
+    '''
+    def __init__(self):
+        # key -> [texture handle, reference count]
+        self._entries = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def get_key(path, should_flip: bool) -> tuple:
+        return str(Path(path).resolve()), bool(should_flip)
+
+    def contains(self, path, should_flip: bool) -> bool:
+        return self.get_key(path, should_flip) in self._entries
+
+    def acquire(self, path, should_flip: bool, create) -> int:
+        # create() -> texture handle, called only on the first acquire
+        key = self.get_key(path, should_flip)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = [create(), 0]
+        entry[1] += 1
+        return entry[0]
+
+    def release(self, path, should_flip: bool) -> None:
+        key = self.get_key(path, should_flip)
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self._entries[key]
+            # https://docs.gl/gl4/glDeleteTextures
+            glDeleteTextures(1, [entry[0]])
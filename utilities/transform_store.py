@@ -0,0 +1,123 @@
+import numpy as np
+
+
+class TransformStore:
+    '''
+    Positions, rotations and scales of all objects as contiguous arrays,
+    one row per object. Setters only mark rows dirty, the model matrices
+    of every dirty row are composed together the next time any of them
+    is read, so moving a group of objects costs a few array operations
+    instead of one matrix product chain per object.
+    '''
+    def __init__(self, capacity=64):
+        self.positions = np.zeros((capacity, 3), dtype=np.float32)
+        # degrees around x, y and z: the yaw, pitch and roll of objects
+        self.angles = np.zeros((capacity, 3), dtype=np.float32)
+        self.scales = np.ones(capacity, dtype=np.float32)
+        # scale of the geometry itself, e.g. the radius of unit spheres
+        self.base_scales = np.ones(capacity, dtype=np.float32)
+        self.transforms = np.tile(np.eye(4, dtype=np.float32),
+                                  (capacity, 1, 1))
+        self.dirty = np.zeros(capacity, dtype=bool)
+        self._free_rows = list(range(capacity - 1, -1, -1))
+        # composed matrices, for profiling
+        self.composed = 0
+
+    def __len__(self) -> int:
+        return self.capacity - len(self._free_rows)
+
+    @property
+    def capacity(self) -> int:
+        return len(self.positions)
+
+    def allocate(self, pos, angles=(0, 0, 0), scale=1) -> int:
+        # returns the row of the new object
+        if not self._free_rows:
+            self._grow()
+        row = self._free_rows.pop()
+        self.positions[row] = pos
+        self.angles[row] = angles
+        self.scales[row] = scale
+        self.base_scales[row] = 1
+        self.dirty[row] = True
+        return row
+
+    def free(self, row: int) -> None:
+        self.dirty[row] = False
+        self._free_rows.append(row)
+
+    def set_positions(self, rows, positions) -> None:
+        # rows: indices or a boolean mask, positions: (n, 3) or (3,)
+        self.positions[rows] = positions
+        self.dirty[rows] = True
+
+    def translate(self, rows, offsets) -> None:
+        self.positions[rows] += np.asarray(offsets, dtype=np.float32)
+        self.dirty[rows] = True
+
+    def get_transform(self, row: int) -> np.ndarray:
+        # the returned matrix is a view, valid until the row changes
+        if self.dirty[row]:
+            self.update()
+        return self.transforms[row]
+
+    def update(self) -> None:
+        rows = np.flatnonzero(self.dirty)
+        if len(rows) == 0:
+            return
+        self.transforms[rows] = compose(self.positions[rows],
+                                        self.angles[rows],
+                                        self.scales[rows] *
+                                        self.base_scales[rows])
+        self.dirty[rows] = False
+        self.composed += len(rows)
+
+    def _grow(self) -> None:
+        capacity = self.capacity
+        self.positions = np.concatenate([self.positions,
+                                         np.zeros((capacity, 3),
+                                                  dtype=np.float32)])
+        self.angles = np.concatenate([self.angles,
+                                      np.zeros((capacity, 3),
+                                               dtype=np.float32)])
+        self.scales = np.concatenate([self.scales,
+                                      np.ones(capacity, dtype=np.float32)])
+        self.base_scales = np.concatenate([self.base_scales,
+                                           np.ones(capacity,
+                                                   dtype=np.float32)])
+        self.transforms = np.concatenate([self.transforms,
+                                          np.tile(np.eye(4, dtype=np.float32),
+                                                  (capacity, 1, 1))])
+        self.dirty = np.concatenate([self.dirty,
+                                     np.zeros(capacity, dtype=bool)])
+        self._free_rows += range(2 * capacity - 1, capacity - 1, -1)
+
+
+def compose(positions: np.ndarray, angles: np.ndarray,
+            scales: np.ndarray) -> np.ndarray:
+    '''
+    (n, 4, 4) model matrices equal to
+    scale @ rotate_z @ rotate_y @ rotate_x @ translate
+    of matrix_functions for every row
+    '''
+    radians = np.radians(angles)
+    cos, sin = np.cos(radians), np.sin(radians)
+    cx, cy, cz = cos[:, 0], cos[:, 1], cos[:, 2]
+    sx, sy, sz = sin[:, 0], sin[:, 1], sin[:, 2]
+
+    result = np.zeros((len(positions), 4, 4), dtype=np.float32)
+    # rotate_z @ rotate_y @ rotate_x written out
+    result[:, 0, 0] = cz * cy
+    result[:, 0, 1] = -sz * cx + cz * sy * sx
+    result[:, 0, 2] = sz * sx + cz * sy * cx
+    result[:, 1, 0] = sz * cy
+    result[:, 1, 1] = cz * cx + sz * sy * sx
+    result[:, 1, 2] = -cz * sx + sz * sy * cx
+    result[:, 2, 0] = -sy
+    result[:, 2, 1] = cy * sx
+    result[:, 2, 2] = cy * cx
+    # uniform scale in front, translation in the last row
+    result[:, :3, :3] *= scales[:, None, None]
+    result[:, 3, :3] = positions
+    result[:, 3, 3] = 1
+    return result